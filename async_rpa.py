@@ -0,0 +1,118 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from rpa import RPA, RPAResult
+
+
+class AsyncRPA:
+    """
+    Fachada asyncio do RPA: capturas, buscas de template e ações rodam numa thread dedicada.
+
+    O RPA não é thread-safe (pyautogui, última posição clicada, buffer reaproveitado da captura),
+    então tudo que toca a tela passa pela mesma thread, em ordem. As esperas dormem no event
+    loop entre uma verificação e outra, de modo que o mesmo processo pode mover arquivos,
+    calcular hashes ou enviar logs enquanto a interface é aguardada.
+
+    Exemplo:
+        arpa = AsyncRPA(rpa)
+        resultado = await arpa.wait_for("modal_sucesso.png", "modais")
+        await arpa.run(rpa.download_files)
+    """
+
+    def __init__(self, rpa: RPA):
+        self.rpa = rpa
+        self._gui = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rpa-gui")
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """Executa um método bloqueante do RPA (ex: rpa.search) na thread da interface"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._gui, functools.partial(func, *args, **kwargs))
+
+    def _existing_images(self, image_filenames: List[str], alias: str) -> List[Tuple[str, str]]:
+        paths = [(filename, self.rpa._get_image_path(alias, filename)) for filename in image_filenames]
+        return [(filename, path) for filename, path in paths if self.rpa._validate_image_file(path)]
+
+    async def find_any(self, image_filenames: List[str], alias: str = "", confidence: float = None) -> Optional[str]:
+        """
+        Procura as imagens numa única captura, sem esperar.
+
+        Returns:
+            Primeira imagem visível na ordem informada, ou None
+        """
+        existing = self._existing_images(image_filenames, alias)
+        if not existing:
+            return None
+
+        paths = [path for _, path in existing]
+        conf = confidence if confidence is not None else min(self.rpa._template_confidence(path) for path in paths)
+        matches_by_path = await self.run(self.rpa._find_many_image_matches, paths, conf)
+        return next((filename for filename, path in existing if any(
+            match.score >= (confidence if confidence is not None else self.rpa._template_confidence(path))
+            for match in matches_by_path[path]
+        )), None)
+
+    async def wait_for_any(self, image_filenames: List[str], alias: str = "", timeout: int = 30,
+                           check_interval: float = None) -> Tuple[RPAResult, Optional[str]]:
+        """
+        Equivalente assíncrono de RPA._wait_for_any_image (mesmo fallback de confidence,
+        timeouts calibrados e métricas).
+
+        Returns:
+            (RPAResult, nome da primeira imagem encontrada na ordem informada ou None)
+        """
+        rpa = self.rpa
+        existing = self._existing_images(image_filenames, alias)
+
+        if not existing:
+            print(f"✗ Nenhum arquivo de imagem encontrado: {', '.join(image_filenames)}")
+            return RPAResult.FILE_NOT_EXISTS, None
+
+        keys = [rpa._wait_key(alias, filename) for filename in image_filenames]
+        wait_key = "|".join(keys)
+        timeout, check_interval = rpa._wait_settings(wait_key, timeout, check_interval)
+        started = time.perf_counter()
+        tried_lower_confidence = False
+        rpa._governed_wait(timeout)
+
+        while time.perf_counter() - started < timeout:
+            poll_interval, reduction = rpa._governed_poll(check_interval)
+            allow_fallback = time.perf_counter() - started > timeout / 2 and not tried_lower_confidence
+
+            try:
+                matches_by_path = await self.run(
+                    rpa._find_many_image_matches, [path for _, path in existing],
+                    rpa._search_confidence([path for _, path in existing]), reduction=reduction
+                )
+            except Exception:
+                matches_by_path = {}
+
+            for filename, path in existing:
+                locations, used_fallback = rpa._apply_confidence(matches_by_path.get(path, []), allow_fallback=allow_fallback,
+                                                                 image_path=path)
+                tried_lower_confidence = tried_lower_confidence or used_fallback
+                if locations:
+                    rpa._observe_wait(keys, time.perf_counter() - started, found_key=rpa._wait_key(alias, filename))
+                    rpa._record_wait(wait_key, time.perf_counter() - started, True)
+                    rpa._governed_wait()
+                    return RPAResult.SUCCESS, filename
+
+            await asyncio.sleep(poll_interval)
+
+        rpa._governed_wait()
+        rpa._observe_wait(keys, time.perf_counter() - started)
+        rpa._record_wait(wait_key, time.perf_counter() - started, False)
+        print(f"✗ Timeout: Nenhuma das imagens {', '.join(image_filenames)} foi encontrada em {timeout:.1f} segundos")
+        return RPAResult.IMAGE_NOT_FOUND, None
+
+    async def wait_for(self, image_filename: str, alias: str = "", timeout: int = 30,
+                       check_interval: float = None) -> RPAResult:
+        """Equivalente assíncrono de RPA._wait_for_image"""
+        result, _ = await self.wait_for_any([image_filename], alias, timeout, check_interval)
+        return result
+
+    def close(self) -> None:
+        """Encerra a thread da interface (espera a ação em andamento terminar)"""
+        self._gui.shutdown(wait=True)
@@ -0,0 +1,393 @@
+import argparse
+import functools
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import fields, replace
+from typing import Dict, List, Optional
+
+# Variantes comparadas quando nenhuma é informada: campos de RPAConfig sobrescritos em cada uma
+DEFAULT_VARIANTS = [
+    {"nome": "padrao"},
+    {"nome": "poll_0.25s", "poll_interval": 0.25},
+    {"nome": "motor_auto", "matching_engine": "auto"},
+    {"nome": "pool_2_workers", "matching_workers": 2},
+]
+
+STAGES = ("init", "trocar_perfil", "pesquisa", "selecao", "download", "mover_arquivos", "fechar", "empresa")
+
+
+def _cnpj_digit(digits: List[int]) -> int:
+    weights = [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2][-len(digits):]
+    rest = sum(digit * weight for digit, weight in zip(digits, weights)) % 11
+    return 0 if rest < 2 else 11 - rest
+
+
+def generate_cnpj(rng: random.Random) -> str:
+    """CNPJ sintético com dígitos verificadores válidos"""
+    digits = [rng.randint(0, 9) for _ in range(8)] + [0, 0, 0, 1]
+    digits.append(_cnpj_digit(digits))
+    digits.append(_cnpj_digit(digits))
+    return "".join(map(str, digits))
+
+
+def generate_dataset(folder: str, companies: int, seed: int = 0) -> str:
+    """Gera empresas.csv (separado por ';', como o dataset do hobots) com `companies` empresas"""
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, "empresas.csv")
+
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        file.write("cnpj;nome\n")
+        for index in range(companies):
+            file.write(f"{generate_cnpj(rng)};EMPRESA SINTETICA {index + 1:05d}\n")
+
+    return path
+
+
+def write_configs(folder: str, source_folder: str, destination_folder: str, types: Dict[str, bool],
+                  start_date: str, end_date: str, certificado: str) -> None:
+    """settings.json e params.json do benchmark, lidos pelo JSONManager via RPA_CONFIG_DIR"""
+    os.makedirs(folder, exist_ok=True)
+    settings = {
+        "certificado": certificado,
+        "arquivos": {
+            "caminho": os.path.join(destination_folder, "{{nome}}", "{{tipo}}"),
+            "origem": source_folder,
+        },
+    }
+    params = {"types": types, "period": {"start_date": start_date, "end_date": end_date}, "cnpj": ""}
+
+    for filename, content in (("settings.json", settings), ("params.json", params)):
+        with open(os.path.join(folder, filename), "w", encoding="utf-8") as file:
+            json.dump(content, file, ensure_ascii=False, indent=2)
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"n": 0}
+    return {
+        "n": len(values),
+        "media": round(sum(values) / len(values), 3),
+        "p50": round(_percentile(values, 0.5), 3),
+        "p90": round(_percentile(values, 0.9), 3),
+        "p99": round(_percentile(values, 0.99), 3),
+        "max": round(max(values), 3),
+    }
+
+
+class StageTimer:
+    """Mede a duração de métodos do pipeline substituindo-os por versões cronometradas"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self.files_moved = 0
+        self._originals = []
+
+    def wrap(self, owner, attribute: str, stage: str) -> None:
+        original = getattr(owner, attribute)
+        samples = self.samples.setdefault(stage, [])
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - started)
+
+        self._originals.append((owner, attribute, original))
+        setattr(owner, attribute, timed)
+
+    def count_moved_files(self, files_manager_class) -> None:
+        original = files_manager_class.move_files
+
+        @functools.wraps(original)
+        def counted(manager, *args, **kwargs):
+            result = original(manager, *args, **kwargs)
+            self.files_moved += len(result.get("files_moved", []))
+            return result
+
+        self._originals.append((files_manager_class, "move_files", original))
+        files_manager_class.move_files = counted
+
+    def restore(self) -> None:
+        for owner, attribute, original in reversed(self._originals):
+            setattr(owner, attribute, original)
+        self._originals.clear()
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        # Windows: sem resource (o pico do Python fica com --memoria-python)
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def run_variant(variant: Dict, trace_memory: bool = False) -> Dict:
+    """
+    Executa o pipeline completo (ler_arquivo_csv -> for_each -> executar_receitanetbx -> move_files)
+    com a variante de RPAConfig informada, no processo atual.
+
+    Espera RPA_DATASETS_DIR e RPA_CONFIG_DIR já apontando para o dataset e as configurações.
+
+    Args:
+        trace_memory: Passada só de memória: liga o tracemalloc (que deixa o Python bem mais
+            lento) e devolve apenas o pico; os tempos vêm de uma passada sem ele
+    """
+    from csv_manager import ler_arquivo_csv
+    from files_manager import FilesManager
+    from receitanetbx_bot import executar_receitanetbx
+    from rpa import RPA, RPAConfig
+    from utils import for_each
+
+    known = {field.name for field in fields(RPAConfig)}
+    base_config = RPAConfig(confidence=0.9, preview_mode=False, images_folder="images", window_title="ReceitanetBX")
+    base_config = replace(base_config, **{key: value for key, value in variant.items() if key in known})
+
+    timer = StageTimer()
+    for attribute, stage in (("init", "init"), ("trocarPerfil", "trocar_perfil"), ("search", "pesquisa"),
+                             ("select_dates", "selecao"), ("download_files", "download"), ("close", "fechar")):
+        timer.wrap(RPA, attribute, stage)
+    timer.wrap(FilesManager, "move_files", "mover_arquivos")
+    timer.count_moved_files(FilesManager)
+
+    empresas = ler_arquivo_csv("empresas")["dados"]
+    company_times = timer.samples["empresa"]
+    outcomes = {"sucesso": 0, "pulada": 0, "falha": 0}
+
+    def process(empresa, first_time):
+        started = time.perf_counter()
+        try:
+            # Uma configuração nova por empresa: o RPA altera o confidence durante o fluxo
+            result = executar_receitanetbx(empresa, first_time, rpa_config=replace(base_config))
+        except Exception as e:
+            # "Unfinish:" é a empresa pulada de propósito pelo fluxo (ex: sem procuração), não uma falha
+            outcomes["pulada" if str(e).startswith("Unfinish:") else "falha"] += 1
+            raise
+        else:
+            outcomes["pulada" if result == "Unfinish" else "sucesso"] += 1
+            return result
+        finally:
+            company_times.append(time.perf_counter() - started)
+
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        for_each(items=empresas, process_func=process, max_retries=0, retry_delay=2,
+                 item_name_func=lambda empresa: empresa["nome"])
+    finally:
+        elapsed = time.perf_counter() - started
+        if trace_memory:
+            _, peak_traced = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        timer.restore()
+
+    if trace_memory:
+        return {"variante": variant.get("nome", "sem_nome"), "pico_python_mb": round(peak_traced / 1024 / 1024, 1)}
+
+    hours = elapsed / 3600
+    return {
+        "variante": variant.get("nome", "sem_nome"),
+        "empresas": len(empresas),
+        "concluidas": outcomes["sucesso"],
+        "puladas": outcomes["pulada"],
+        "falhas": outcomes["falha"],
+        "segundos": round(elapsed, 1),
+        "empresas_por_hora": round(outcomes["sucesso"] / hours, 1) if hours else 0.0,
+        "arquivos": timer.files_moved,
+        "arquivos_por_hora": round(timer.files_moved / hours, 1) if hours else 0.0,
+        "etapas": {stage: summarize(values) for stage, values in timer.samples.items() if values},
+        "pico_python_mb": None,
+        "pico_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _start_xvfb(display: str, resolution: str) -> subprocess.Popen:
+    process = subprocess.Popen(["Xvfb", display, "-screen", "0", f"{resolution}x24", "-nolisten", "tcp"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(1)
+    return process
+
+
+def _start_standin(workdir: str, source_folder: str, standin_config: Dict, env: Dict) -> subprocess.Popen:
+    config_path = os.path.join(workdir, "standin.json")
+    with open(config_path, "w", encoding="utf-8") as file:
+        json.dump({**standin_config, "pasta_origem": source_folder,
+                   "log_eventos": os.path.join(workdir, "eventos_standin.jsonl")}, file)
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "receitanetbx_standin.py")
+    process = subprocess.Popen([sys.executable, script, "--config", config_path], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    time.sleep(2)
+    return process
+
+
+def _run_variant_process(variant: Dict, companies: int, standin_config: Dict, types: Dict[str, bool],
+                         start_date: str, end_date: str, certificate: str, env: Dict, project_root: str,
+                         keep_workdir: bool, trace_memory: bool = False) -> Dict:
+    """Uma passada da variante num processo filho, com dataset e ReceitanetBX simulado novos"""
+    workdir = tempfile.mkdtemp(prefix=f"benchmark_{variant.get('nome', 'variante')}_")
+    source_folder = os.path.join(workdir, "origem")
+    os.makedirs(source_folder)
+
+    generate_dataset(os.path.join(workdir, "datasets"), companies)
+    write_configs(os.path.join(workdir, "config"), source_folder, os.path.join(workdir, "destino"),
+                  types, start_date, end_date, certificate)
+
+    variant_env = dict(env, RPA_DATASETS_DIR=os.path.join(workdir, "datasets"),
+                       RPA_CONFIG_DIR=os.path.join(workdir, "config"))
+    command = [sys.executable, os.path.abspath(__file__), "--executar-variante", json.dumps(variant)]
+    if trace_memory:
+        command.append("--medir-memoria")
+
+    standin = _start_standin(workdir, source_folder, standin_config, variant_env)
+    try:
+        output = subprocess.run(command, cwd=project_root, env=variant_env, capture_output=True, text=True)
+    finally:
+        standin.terminate()
+        standin.wait()
+
+    result = None
+    for line in reversed(output.stdout.splitlines()):
+        if line.startswith("{"):
+            result = json.loads(line)
+            break
+
+    if result is None:
+        print(f"❌ Variante {variant.get('nome')} falhou:\n{output.stderr[-2000:]}")
+        result = {"variante": variant.get("nome"), "erro": output.stderr[-500:]}
+
+    if not keep_workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def run_benchmark(companies: int, variants: List[Dict], standin_config: Dict, types: Dict[str, bool],
+                  start_date: str, end_date: str, use_xvfb: bool = False, resolution: str = "1920x1080",
+                  keep_workdir: bool = False, trace_memory: bool = False) -> List[Dict]:
+    """
+    Roda cada variante em um processo separado, contra uma instância nova do ReceitanetBX simulado.
+
+    Processos separados isolam o pico de memória e os pools de cada variante. Com trace_memory
+    cada variante roda de novo, com tracemalloc, só para medir o pico de memória do Python.
+    """
+    project_root = os.path.dirname(os.path.abspath(__file__))
+    certificates = sorted(name[:-4] for name in os.listdir(os.path.join(project_root, "images", "certificados"))
+                          if name.lower().endswith(".png"))
+    certificate = certificates[0] if certificates else ""
+    results = []
+    xvfb = None
+    env = dict(os.environ)
+
+    if use_xvfb:
+        env["DISPLAY"] = ":99"
+        xvfb = _start_xvfb(":99", resolution)
+
+    try:
+        for variant in variants:
+            print(f"\n⏱ Variante {variant.get('nome')}: {companies} empresas")
+            result = _run_variant_process(variant, companies, standin_config, types, start_date, end_date,
+                                          certificate, env, project_root, keep_workdir)
+
+            if trace_memory and "erro" not in result:
+                print(f"  🧠 Passada de memória (tracemalloc) da variante {variant.get('nome')}")
+                memory = _run_variant_process(variant, companies, standin_config, types, start_date, end_date,
+                                              certificate, env, project_root, keep_workdir, trace_memory=True)
+                result["pico_python_mb"] = memory.get("pico_python_mb")
+            results.append(result)
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+
+    return results
+
+
+def print_comparison(results: List[Dict]) -> None:
+    print("\n📊 Resultado do benchmark")
+    print(f"{'variante':<18}{'empresas/h':>12}{'arquivos/h':>12}{'puladas':>9}{'falhas':>8}{'empresa p50':>13}{'p90':>9}"
+          f"{'pico py MB':>12}{'pico RSS MB':>13}")
+
+    for result in results:
+        if "erro" in result:
+            print(f"{result['variante']:<18}{'erro':>12}")
+            continue
+        company = result["etapas"].get("empresa", {})
+        print(f"{result['variante']:<18}{result['empresas_por_hora']:>12}{result['arquivos_por_hora']:>12}"
+              f"{result['puladas']:>9}{result['falhas']:>8}{company.get('p50', '-'):>13}{company.get('p90', '-'):>9}"
+              f"{str(result['pico_python_mb'] or '-'):>12}{str(result['pico_rss_mb']):>13}")
+
+    for result in results:
+        if "erro" in result:
+            continue
+        print(f"\n  {result['variante']} - latência por etapa (s)")
+        for stage, stats in result["etapas"].items():
+            print(f"    {stage:<16} n={stats['n']:<5} p50={stats['p50']:<8} p90={stats['p90']:<8} "
+                  f"p99={stats['p99']:<8} max={stats['max']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ponta a ponta do bot contra o ReceitanetBX simulado")
+    parser.add_argument("--empresas", type=int, default=10, help="Tamanho do dataset sintético")
+    parser.add_argument("--variantes", help="JSON com a lista de variantes (campos de RPAConfig + 'nome')")
+    parser.add_argument("--standin", help="JSON com a StandInConfig do ReceitanetBX simulado")
+    parser.add_argument("--tipos", default="sped_contribuicoes", help="Tipos habilitados, separados por vírgula")
+    parser.add_argument("--inicio", default="2023-01-01")
+    parser.add_argument("--fim", default="2023-12-31")
+    parser.add_argument("--xvfb", action="store_true", help="Inicia um Xvfb próprio em :99")
+    parser.add_argument("--resolucao", default="1920x1080")
+    parser.add_argument("--saida", help="Arquivo JSON para gravar os resultados")
+    parser.add_argument("--manter", action="store_true", help="Não apaga as pastas temporárias")
+    parser.add_argument("--memoria-python", action="store_true",
+                        help="Roda cada variante mais uma vez com tracemalloc para medir o pico do Python")
+    parser.add_argument("--executar-variante", help=argparse.SUPPRESS)
+    parser.add_argument("--medir-memoria", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executar_variante:
+        # Processo filho: roda uma variante e devolve o resultado como JSON na última linha
+        print(json.dumps(run_variant(json.loads(args.executar_variante), trace_memory=args.medir_memoria),
+                         ensure_ascii=False))
+        return
+
+    variants = DEFAULT_VARIANTS
+    if args.variantes:
+        with open(args.variantes, "r", encoding="utf-8") as file:
+            variants = json.load(file)
+
+    standin_config = {}
+    if args.standin:
+        with open(args.standin, "r", encoding="utf-8") as file:
+            standin_config = json.load(file)
+
+    enabled = set(args.tipos.split(","))
+    types = {tipo: tipo in enabled for tipo in ("sped_contribuicoes", "sped_fiscal", "sped_ecf", "sped_contabil")}
+
+    results = run_benchmark(args.empresas, variants, standin_config, types, args.inicio, args.fim,
+                            use_xvfb=args.xvfb, resolution=args.resolucao, keep_workdir=args.manter,
+                            trace_memory=args.memoria_python)
+    print_comparison(results)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+        print(f"\n✅ Resultados gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+import argparse
+import glob
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from csv_manager import ler_arquivo_csv
+from json_manager import JSONManager
+from output_packer import wait_for_packing
+from receitanetbx_bot import executar_receitanetbx
+from rpa import RPA, RPAConfig
+from text_formatter import TextFormatter
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+END_EVENT = "fim"
+
+
+class _JobOutput:
+    """
+    Substitui sys.stdout: repassa tudo ao terminal e, para o que for escrito pela thread
+    de execução, também envia cada linha como evento "log" ao cliente do job em andamento.
+    """
+
+    def __init__(self, original, daemon: "BotDaemon"):
+        self.original = original
+        self.daemon = daemon
+        self._buffer = ""
+
+    def write(self, text: str) -> int:
+        self.original.write(text)
+        if threading.current_thread() is self.daemon.worker and self.daemon.current_job is not None:
+            self._buffer += text
+            while "\n" in self._buffer:
+                line, self._buffer = self._buffer.split("\n", 1)
+                if line.strip():
+                    self.daemon.current_job.emit("log", mensagem=line)
+        return len(text)
+
+    def flush(self) -> None:
+        self.original.flush()
+
+
+class Job:
+    def __init__(self, cnpjs: List[str], params: Dict):
+        self.id = uuid.uuid4().hex[:8]
+        self.cnpjs = cnpjs
+        self.params = params
+        self.events: "queue.Queue[Dict]" = queue.Queue()
+
+    def emit(self, event: str, **content) -> None:
+        self.events.put({"evento": event, "job": self.id, "t": time.time(), **content})
+
+
+class BotDaemon:
+    """
+    Processo de longa duração que mantém aquecidos configurações, dataset, templates,
+    pool de matching e a própria sessão do ReceitanetBX entre jobs.
+
+    Jobs (lista de CNPJs, tipos e período) chegam por socket local em JSON por linha e são
+    executados em fila, um por vez, numa única thread (há uma só tela). O progresso volta
+    ao cliente como eventos JSON, inclusive as mensagens impressas pelo bot.
+
+    settings.json -> "daemon": {"porta": 8765, "fechar_apos_ocioso": 600}
+    """
+
+    def __init__(self, config: RPAConfig = None, host: str = DEFAULT_HOST, port: int = None):
+        self.json_manager = JSONManager()
+        self.settings = self.json_manager.get_settings() or {}
+        daemon_settings = self.settings.get("daemon", {})
+
+        self.host = host
+        self.port = port or daemon_settings.get("porta", DEFAULT_PORT)
+        self.idle_close = daemon_settings.get("fechar_apos_ocioso", 600)
+        self.config = config or RPAConfig(
+            confidence=0.9,
+            preview_mode=False,
+            images_folder="images",
+            window_title="ReceitanetBX"
+        )
+        self.text_formatter = TextFormatter()
+
+        self.jobs: "queue.Queue[Optional[Job]]" = queue.Queue()
+        self.current_job: Optional[Job] = None
+        self.completed = 0
+        self.started_at = time.time()
+        self.worker = threading.Thread(target=self._work, name="daemon-worker", daemon=True)
+        self.server = None
+
+        self.reload()
+        self.rpa = RPA(self.config)
+        self._warm_templates()
+
+    def reload(self) -> None:
+        """Relê params.json e o dataset de empresas"""
+        self.params = self.json_manager.get_params()
+        empresas_result = ler_arquivo_csv("empresas", mostrar_info=False) or {}
+        self.companies = {
+            self.text_formatter.getOnlyNumbers(empresa["cnpj"]): empresa
+            for empresa in empresas_result.get("dados", [])
+        }
+        print(f"✅ Daemon: {len(self.companies)} empresas no dataset")
+
+    def _warm_templates(self) -> None:
+        paths = glob.glob(os.path.join(self.config.images_folder, "**", "*.png"), recursive=True)
+        started = time.perf_counter()
+        for path in paths:
+            try:
+                self.rpa.matcher.load_template(path)
+            except Exception:
+                pass
+        print(f"✅ Daemon: {len(paths)} templates carregados em {time.perf_counter() - started:.2f}s")
+
+    def _job_params(self, request: Dict) -> Dict:
+        params = dict(self.params)
+        tipos = request.get("tipos")
+        if isinstance(tipos, list):
+            tipos = {tipo: True for tipo in tipos}
+        if tipos:
+            params["types"] = tipos
+        if request.get("periodo"):
+            params["period"] = request["periodo"]
+        return params
+
+    def submit(self, request: Dict) -> Job:
+        cnpjs = [self.text_formatter.getOnlyNumbers(cnpj) for cnpj in request.get("cnpjs", [])]
+        job = Job(cnpjs, self._job_params(request))
+        job.emit("aceito", posicao=self.jobs.qsize() + 1, empresas=len(cnpjs))
+        self.jobs.put(job)
+        return job
+
+    def status(self) -> Dict:
+        return {
+            "pid": os.getpid(),
+            "ativo_ha": time.time() - self.started_at,
+            "fila": self.jobs.qsize(),
+            "job_atual": self.current_job.id if self.current_job else None,
+            "jobs_concluidos": self.completed,
+            "aplicacao_aberta": self.rpa.application_open,
+            "empresas_no_dataset": len(self.companies),
+        }
+
+    def _work(self) -> None:
+        while True:
+            try:
+                job = self.jobs.get(timeout=self.idle_close) if self.idle_close else self.jobs.get()
+            except queue.Empty:
+                if self.rpa.application_open:
+                    print("⏱ Daemon ocioso: fechando o ReceitanetBX")
+                    self.rpa.close()
+                    self.rpa.application_open = False
+                continue
+
+            if job is None:
+                break
+
+            self.current_job = job
+            try:
+                self._run_job(job)
+            finally:
+                self.current_job = None
+                self.completed += 1
+
+    def _run_job(self, job: Job) -> None:
+        summary = {"concluida": 0, "pulada": 0, "falha": 0}
+
+        for index, cnpj in enumerate(job.cnpjs):
+            empresa = self.companies.get(cnpj) or {"cnpj": cnpj, "nome": cnpj}
+            job.emit("empresa_inicio", cnpj=cnpj, nome=empresa.get("nome"), indice=index, total=len(job.cnpjs))
+            started = time.perf_counter()
+
+            try:
+                result = executar_receitanetbx(empresa, True, rpa=self.rpa, params=job.params, keep_open=True)
+                outcome, error = ("pulada" if result == "Unfinish" else "concluida"), None
+            except Exception as e:
+                outcome, error = "falha", str(e)
+                if error.startswith("Unfinish:"):
+                    outcome = "pulada"
+
+            summary[outcome] += 1
+            job.emit("empresa_fim", cnpj=cnpj, resultado=outcome, erro=error,
+                     segundos=round(time.perf_counter() - started, 2))
+
+        job.emit(END_EVENT, resumo=summary)
+
+    def serve_forever(self) -> None:
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                line = self.rfile.readline()
+                if not line:
+                    return
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as e:
+                    self._send({"evento": "erro", "mensagem": f"JSON inválido: {e}"})
+                    return
+
+                command = request.get("comando", "job")
+                if command == "status":
+                    self._send({"evento": "status", **daemon.status()})
+                elif command == "recarregar":
+                    daemon.reload()
+                    self._send({"evento": "recarregado", "empresas": len(daemon.companies)})
+                elif command == "encerrar":
+                    self._send({"evento": "encerrando"})
+                    threading.Thread(target=daemon.shutdown, daemon=True).start()
+                elif command == "job":
+                    self._stream(daemon.submit(request))
+                else:
+                    self._send({"evento": "erro", "mensagem": f"Comando desconhecido: {command}"})
+
+            def _stream(self, job: Job):
+                while True:
+                    event = job.events.get()
+                    try:
+                        self._send(event)
+                    except OSError:
+                        # Cliente desconectou: o job continua, só deixa de receber eventos
+                        return
+                    if event["evento"] == END_EVENT:
+                        return
+
+            def _send(self, event: Dict):
+                self.wfile.write((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+                self.wfile.flush()
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self.server = socketserver.ThreadingTCPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+
+        sys.stdout = _JobOutput(sys.stdout, self)
+        self.worker.start()
+        print(f"🎯 Daemon aguardando jobs em {self.host}:{self.port}")
+
+        try:
+            self.server.serve_forever()
+        finally:
+            sys.stdout = sys.stdout.original if isinstance(sys.stdout, _JobOutput) else sys.stdout
+
+    def shutdown(self) -> None:
+        self.jobs.put(None)
+        self.worker.join()
+        wait_for_packing()
+        if self.rpa.application_open:
+            self.rpa.close()
+        self.rpa.stop_recording()
+        if self.server is not None:
+            self.server.shutdown()
+
+
+def send_request(request: Dict, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, on_event=None) -> List[Dict]:
+    """Envia um pedido ao daemon e devolve (e repassa a on_event) os eventos até o fim da resposta"""
+    events = []
+    with socket.create_connection((host, port)) as connection:
+        connection.sendall((json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8"))
+        with connection.makefile("r", encoding="utf-8") as stream:
+            for line in stream:
+                event = json.loads(line)
+                events.append(event)
+                if on_event:
+                    on_event(event)
+                if request.get("comando", "job") != "job" or event["evento"] in (END_EVENT, "erro"):
+                    break
+    return events
+
+
+def _print_event(event: Dict) -> None:
+    kind = event["evento"]
+    if kind == "log":
+        print(f"  {event['mensagem']}")
+    elif kind == "aceito":
+        print(f"📥 Job {event['job']} aceito ({event['empresas']} empresas, posição {event['posicao']} na fila)")
+    elif kind == "empresa_inicio":
+        print(f"▶ [{event['indice'] + 1}/{event['total']}] {event['nome']} - CNPJ: {event['cnpj']}")
+    elif kind == "empresa_fim":
+        icon = {"concluida": "✅", "pulada": "⏭️", "falha": "❌"}[event["resultado"]]
+        detail = f": {event['erro']}" if event.get("erro") else ""
+        print(f"{icon} {event['cnpj']} {event['resultado']} em {event['segundos']:.1f}s{detail}")
+    elif kind == END_EVENT:
+        print(f"🎉 Job {event['job']} concluído: {event['resumo']}")
+    else:
+        print(json.dumps(event, ensure_ascii=False, indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Daemon do bot ReceitanetBX e cliente de jobs")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--porta", type=int, default=None)
+    commands = parser.add_subparsers(dest="comando", required=True)
+
+    commands.add_parser("servir", help="Inicia o daemon")
+    job = commands.add_parser("enviar", help="Envia um job e acompanha o progresso")
+    job.add_argument("--cnpj", action="append", required=True, help="CNPJ a processar (repita para vários)")
+    job.add_argument("--tipos", nargs="+", help="Tipos a baixar (padrão: os habilitados em params.json)")
+    job.add_argument("--inicio", help="Data inicial AAAA-MM-DD")
+    job.add_argument("--fim", help="Data final AAAA-MM-DD")
+    for command in ("status", "recarregar", "encerrar"):
+        commands.add_parser(command)
+
+    args = parser.parse_args()
+
+    if args.comando == "servir":
+        BotDaemon(host=args.host, port=args.porta).serve_forever()
+        return
+
+    request = {"comando": "job" if args.comando == "enviar" else args.comando}
+    if args.comando == "enviar":
+        request["cnpjs"] = args.cnpj
+        if args.tipos:
+            request["tipos"] = args.tipos
+        if args.inicio and args.fim:
+            request["periodo"] = {"start_date": args.inicio, "end_date": args.fim}
+
+    try:
+        send_request(request, args.host, args.porta or DEFAULT_PORT, on_event=_print_event)
+    except ConnectionRefusedError:
+        print(f"❌ Daemon não encontrado em {args.host}:{args.porta or DEFAULT_PORT} (python bot_daemon.py servir)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from bot_daemon import DEFAULT_HOST, send_request
+from json_manager import JSONManager
+from output_packer import wait_for_packing
+from receitanetbx_bot import executar_receitanetbx
+from rpa import RPA, RPAConfig
+
+DEFAULT_PORT = 8766
+
+STATUS_PENDING = "pendente"
+STATUS_LEASED = "em_andamento"
+FINAL_STATUSES = ("concluida", "pulada", "falha")
+
+
+class Coordinator:
+    """
+    Distribui as empresas do dataset entre várias máquinas com o bot (workers), por TCP.
+
+    Cada empresa é um job emprestado (lease) a um worker por alguns segundos; o worker renova
+    o lease com heartbeats enquanto executa e devolve o resultado com o manifesto dos arquivos
+    movidos. Se o worker cai, o lease expira e a empresa volta para a fila, para outro worker.
+    Falhas também voltam à fila até max_tentativas. O estado fica em um arquivo JSON, e um
+    coordenador reiniciado não repete as empresas já concluídas.
+
+    settings.json -> "coordenador": {"porta": 8766, "lease": 120, "max_tentativas": 2, "arquivo": "coordenacao.json"}
+    """
+
+    def __init__(self, empresas: List[Dict], params: Dict, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 lease_seconds: float = 120, max_attempts: int = 2, state_path: str = "coordenacao.json"):
+        self.params = params
+        self.host = host
+        self.port = port
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.state_path = state_path
+        self.workers: Dict[str, float] = {}  # Último contato de cada worker
+        self.server = None
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+
+        self.jobs: Dict[str, Dict] = {
+            empresa["cnpj"]: {
+                "cnpj": empresa["cnpj"],
+                "empresa": empresa,
+                "status": STATUS_PENDING,
+                "tentativas": 0,
+                "worker": None,
+                "lease": None,
+                "lease_ate": None,
+                "resultado": None,
+                "erro": None,
+                "segundos": None,
+                "manifesto": [],
+            }
+            for empresa in empresas
+        }
+        self._resume()
+
+    def _resume(self) -> None:
+        """Mantém o que já terminou numa execução anterior do coordenador com o mesmo arquivo de estado"""
+        if not os.path.exists(self.state_path):
+            return
+
+        with open(self.state_path, "r", encoding="utf-8") as file:
+            previous = json.load(file).get("jobs", {})
+
+        resumed = 0
+        for cnpj, job in previous.items():
+            if cnpj in self.jobs and job["status"] in ("concluida", "pulada"):
+                self.jobs[cnpj] = job
+                resumed += 1
+        if resumed:
+            print(f"↩ {resumed} empresas já concluídas em {self.state_path}")
+
+    def save(self) -> None:
+        temporary_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump({"jobs": self.jobs, "workers": self.workers}, file, ensure_ascii=False, indent=2)
+        os.replace(temporary_path, self.state_path)
+
+    def _expire_leases(self) -> None:
+        now = time.time()
+        for job in self.jobs.values():
+            if job["status"] != STATUS_LEASED or job["lease_ate"] > now:
+                continue
+            print(f"⌛ Lease de {job['cnpj']} expirou ({job['worker']} sem heartbeat)")
+            job["erro"] = f"lease expirado em {job['worker']}"
+            job["status"] = "falha" if job["tentativas"] >= self.max_attempts else STATUS_PENDING
+            job["worker"] = job["lease"] = job["lease_ate"] = None
+
+    def lease(self, worker: str) -> Dict:
+        with self._lock:
+            self.workers[worker] = time.time()
+            self._expire_leases()
+
+            job = next((job for job in self.jobs.values() if job["status"] == STATUS_PENDING), None)
+            if job is None:
+                if self.done():
+                    return {"evento": "fim"}
+                # Há empresas com outros workers, que podem voltar para a fila se o lease expirar
+                return {"evento": "aguarde", "segundos": min(self.lease_seconds / 4, 30)}
+
+            job.update(status=STATUS_LEASED, worker=worker, lease=uuid.uuid4().hex[:12],
+                       lease_ate=time.time() + self.lease_seconds, tentativas=job["tentativas"] + 1)
+            self.save()
+            print(f"▶ {job['empresa'].get('nome', job['cnpj'])} - CNPJ: {job['cnpj']} → {worker} "
+                  f"(tentativa {job['tentativas']})")
+            return {"evento": "job", "lease": job["lease"], "lease_segundos": self.lease_seconds,
+                    "tentativa": job["tentativas"], "empresa": job["empresa"], "params": self.params}
+
+    def heartbeat(self, worker: str, cnpj: str, lease: str) -> Dict:
+        with self._lock:
+            self.workers[worker] = time.time()
+            job = self.jobs.get(cnpj)
+            if job is None or job["lease"] != lease:
+                return {"evento": "perdido"}
+            job["lease_ate"] = time.time() + self.lease_seconds
+            return {"evento": "ok"}
+
+    def report(self, worker: str, cnpj: str, lease: str, outcome: str, error: Optional[str],
+               manifest: List[Dict], seconds: float) -> Dict:
+        with self._lock:
+            self.workers[worker] = time.time()
+            job = self.jobs.get(cnpj)
+
+            # Resultado tardio de um lease expirado ainda vale se ninguém pegou a empresa de novo
+            if job is None or job["status"] in FINAL_STATUSES or (job["lease"] != lease and job["status"] == STATUS_LEASED):
+                return {"evento": "ignorado"}
+
+            retry = outcome == "falha" and job["tentativas"] < self.max_attempts
+            job.update(status=STATUS_PENDING if retry else outcome, worker=None if retry else worker,
+                       lease=None, lease_ate=None, resultado=outcome, erro=error, segundos=seconds)
+            job["manifesto"].extend(manifest)
+            self.save()
+
+            icon = {"concluida": "✅", "pulada": "⏭️", "falha": "❌"}[outcome]
+            detail = f": {error}" if error else ""
+            print(f"{icon} {cnpj} {outcome} em {worker} ({seconds:.1f}s, {len(manifest)} arquivos){detail}"
+                  f"{' - volta para a fila' if retry else ''}")
+
+            if self.done():
+                self._finished.set()
+            return {"evento": "registrado"}
+
+    def done(self) -> bool:
+        return all(job["status"] in FINAL_STATUSES for job in self.jobs.values())
+
+    def status(self) -> Dict:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self.jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return {
+                "empresas": len(self.jobs),
+                "por_status": counts,
+                "em_andamento": {job["cnpj"]: job["worker"] for job in self.jobs.values() if job["status"] == STATUS_LEASED},
+                "workers": {worker: round(time.time() - seen, 1) for worker, seen in self.workers.items()},
+                "arquivos": sum(len(job["manifesto"]) for job in self.jobs.values()),
+            }
+
+    def _reap(self) -> None:
+        """Devolve à fila os jobs de workers que pararam de mandar heartbeat, mesmo sem pedidos novos"""
+        while not self._finished.wait(max(1.0, self.lease_seconds / 4)):
+            with self._lock:
+                before = [job["status"] for job in self.jobs.values()]
+                self._expire_leases()
+                if before != [job["status"] for job in self.jobs.values()]:
+                    self.save()
+                    if self.done():
+                        self._finished.set()
+
+    def serve_forever(self) -> None:
+        coordinator = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                line = self.rfile.readline()
+                if not line:
+                    return
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as e:
+                    self._send({"evento": "erro", "mensagem": f"JSON inválido: {e}"})
+                    return
+
+                command = request.get("comando")
+                worker = request.get("worker", "?")
+                if command == "pedir":
+                    self._send(coordinator.lease(worker))
+                elif command == "heartbeat":
+                    self._send(coordinator.heartbeat(worker, request["cnpj"], request["lease"]))
+                elif command == "resultado":
+                    self._send(coordinator.report(worker, request["cnpj"], request["lease"], request["resultado"],
+                                                  request.get("erro"), request.get("manifesto", []),
+                                                  request.get("segundos", 0.0)))
+                elif command == "status":
+                    self._send({"evento": "status", **coordinator.status()})
+                elif command == "encerrar":
+                    self._send({"evento": "encerrando"})
+                    coordinator._finished.set()
+                else:
+                    self._send({"evento": "erro", "mensagem": f"Comando desconhecido: {command}"})
+
+            def _send(self, event: Dict):
+                self.wfile.write((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+                self.wfile.flush()
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self.server = socketserver.ThreadingTCPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="coordinator-server", daemon=True).start()
+        print(f"🎯 Coordenador em {self.host}:{self.port}: {len(self.jobs)} empresas, lease de {self.lease_seconds:.0f}s")
+
+        if self.done():
+            self._finished.set()
+        self._reap()
+
+        # Dá tempo aos workers de receberem "fim" antes de fechar o socket
+        time.sleep(1)
+        self.server.shutdown()
+        self.save()
+        self.print_summary()
+
+    def print_summary(self) -> None:
+        summary = self.status()
+        print(f"\n🎉 Coordenação concluída: {summary['por_status']}, {summary['arquivos']} arquivos movidos")
+        for job in self.jobs.values():
+            if job["status"] == "falha":
+                print(f"  ❌ {job['cnpj']}: {job['erro']}")
+        print(f"  Estado e manifestos em {self.state_path}")
+
+
+class _Heartbeat:
+    """Renova o lease do job em andamento a cada 1/3 do lease, numa thread"""
+
+    def __init__(self, worker: "CoordinatorWorker", job: Dict):
+        self.worker = worker
+        self.job = job
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="heartbeat", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.job["lease_segundos"] / 3):
+            try:
+                reply = self.worker.request({"comando": "heartbeat", "cnpj": self.job["empresa"]["cnpj"],
+                                             "lease": self.job["lease"]})
+            except OSError as e:
+                print(f"⚠ Heartbeat falhou: {e}")
+                continue
+            if reply["evento"] == "perdido":
+                print(f"⚠ Lease de {self.job['empresa']['cnpj']} perdido: o coordenador repassou a empresa")
+                return
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+class CoordinatorWorker:
+    """
+    Pede empresas ao coordenador e as executa com executar_receitanetbx, reaproveitando a
+    mesma sessão do RPA (e o ReceitanetBX aberto) entre empresas, como o daemon.
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, name: str = None,
+                 config: RPAConfig = None, process_func: Callable = None):
+        """
+        Args:
+            name: Identificação do worker nos logs do coordenador (padrão: <hostname>-<pid>)
+            process_func: Substitui executar_receitanetbx (ex: simulação); recebe os mesmos argumentos
+        """
+        self.host = host
+        self.port = port
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.config = config or RPAConfig(
+            confidence=0.9,
+            preview_mode=False,
+            images_folder="images",
+            window_title="ReceitanetBX"
+        )
+        self.process_func = process_func or executar_receitanetbx
+        self.rpa = None
+
+    def request(self, request: Dict) -> Dict:
+        return send_request({**request, "worker": self.name}, self.host, self.port)[0]
+
+    def run(self) -> None:
+        processed = 0
+        connected = False
+        try:
+            while True:
+                try:
+                    reply = self.request({"comando": "pedir"})
+                except OSError:
+                    # Coordenador encerrado depois de distribuir tudo
+                    if connected:
+                        break
+                    raise
+                connected = True
+
+                if reply["evento"] == "fim":
+                    break
+                if reply["evento"] == "aguarde":
+                    time.sleep(reply["segundos"])
+                    continue
+
+                self._run_job(reply)
+                processed += 1
+        finally:
+            wait_for_packing()
+            if self.rpa is not None:
+                if self.rpa.application_open:
+                    self.rpa.close()
+                self.rpa.stop_recording()
+
+        print(f"\n🎉 Worker {self.name}: {processed} empresas processadas")
+
+    def _run_job(self, job: Dict) -> None:
+        empresa = job["empresa"]
+        print(f"\n▶ {empresa.get('nome', empresa['cnpj'])} - CNPJ: {empresa['cnpj']} (tentativa {job['tentativa']})")
+
+        if self.rpa is None and self.process_func is executar_receitanetbx:
+            self.rpa = RPA(self.config)
+
+        manifest: List[Dict] = []
+        heartbeat = _Heartbeat(self, job)
+        started = time.perf_counter()
+
+        try:
+            result = self.process_func(empresa, job["tentativa"] == 1, rpa=self.rpa, params=job["params"],
+                                       keep_open=True, manifesto=manifest)
+            outcome, error = ("pulada" if result == "Unfinish" else "concluida"), None
+        except Exception as e:
+            outcome, error = "falha", str(e)
+            if error.startswith("Unfinish:"):
+                outcome = "pulada"
+        finally:
+            heartbeat.stop()
+
+        reply = self.request({"comando": "resultado", "cnpj": empresa["cnpj"], "lease": job["lease"],
+                              "resultado": outcome, "erro": error, "manifesto": manifest,
+                              "segundos": round(time.perf_counter() - started, 2)})
+        if reply["evento"] == "ignorado":
+            print(f"⚠ Resultado de {empresa['cnpj']} ignorado: a empresa já foi repassada a outro worker")
+
+
+def _simulated(seconds: float) -> Callable:
+    """Executa um job sem a aplicação, só esperando: para testar a distribuição com processos locais"""
+    def process(empresa, first_time, rpa=None, params=None, keep_open=False, manifesto=None):
+        time.sleep(seconds)
+        return "Success"
+    return process
+
+
+def main() -> None:
+    from main import carregar_empresas
+
+    settings = (JSONManager().get_settings() or {}).get("coordenador", {})
+
+    parser = argparse.ArgumentParser(description="Distribui as empresas do dataset entre várias máquinas com o bot")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Endereço do coordenador (0.0.0.0 para aceitar outras máquinas)")
+    parser.add_argument("--porta", type=int, default=settings.get("porta", DEFAULT_PORT))
+    commands = parser.add_subparsers(dest="comando", required=True)
+
+    coordinate = commands.add_parser("coordenar", help="Inicia o coordenador com as empresas do dataset e params.json")
+    coordinate.add_argument("--lease", type=float, default=settings.get("lease", 120),
+                            help="Segundos sem heartbeat até a empresa voltar para a fila")
+    coordinate.add_argument("--arquivo", default=settings.get("arquivo", "coordenacao.json"),
+                            help="Estado e manifestos; reaproveitado se o coordenador for reiniciado")
+    work = commands.add_parser("trabalhar", help="Processa empresas pedidas ao coordenador")
+    work.add_argument("--nome", help="Identificação do worker (padrão: <hostname>-<pid>)")
+    work.add_argument("--simular", type=float, metavar="SEGUNDOS",
+                      help="Não abre a aplicação: cada empresa só espera SEGUNDOS (teste da distribuição)")
+    commands.add_parser("status")
+    commands.add_parser("encerrar")
+    args = parser.parse_args()
+
+    if args.comando == "coordenar":
+        params = JSONManager().get_params()
+        empresas = carregar_empresas(params)
+        if not empresas:
+            return
+        Coordinator(empresas, params, args.host, args.porta, args.lease,
+                    settings.get("max_tentativas", 2), args.arquivo).serve_forever()
+    elif args.comando == "trabalhar":
+        process_func = _simulated(args.simular) if args.simular is not None else None
+        try:
+            CoordinatorWorker(args.host, args.porta, args.nome, process_func=process_func).run()
+        except ConnectionRefusedError:
+            print(f"❌ Coordenador não encontrado em {args.host}:{args.porta} (python coordinator.py coordenar)")
+            sys.exit(1)
+    else:
+        try:
+            reply = send_request({"comando": args.comando}, args.host, args.porta)[0]
+        except ConnectionRefusedError:
+            print(f"❌ Coordenador não encontrado em {args.host}:{args.porta}")
+            sys.exit(1)
+        print(json.dumps(reply, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
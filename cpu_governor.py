@@ -0,0 +1,236 @@
+import atexit
+import json
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from host_cache import HostCache
+
+WINDOW_SECONDS = 10.0  # Janela em que o uso de CPU da sessão é medido
+LONG_WAIT_SECONDS = 60.0  # Esperas com timeout a partir disso são ociosas (ex: fila de downloads)
+HOST_CPU_LIMIT = 0.8  # Fração dos núcleos que as sessões juntas podem usar antes de frear as ociosas
+STATE_INTERVAL = 2.0  # Intervalo entre gravações do estado da sessão / leituras das demais
+STALE_SECONDS = 30.0  # Estado de sessão sem atualização há mais tempo que isso é descartado
+MAX_POLL_SECONDS = 10.0  # Maior intervalo entre verificações imposto pelo governador
+REDUCTIONS = ((1.0, 1.0), (2.0, 0.75))  # (pressão até, fator de resolução); acima disso usa MIN_REDUCTION
+MIN_REDUCTION = 0.5
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        # Sem permissão para sinalizar (ou Windows): considera viva e confia no STALE_SECONDS
+        return True
+    return True
+
+
+class CpuGovernor:
+    """
+    Orçamento de CPU de captura e busca de templates para uma sessão do bot (um processo).
+
+    O RPA informa o tempo de CPU gasto em cada busca. Se a sessão passa do orçamento na
+    janela, as esperas passam a verificar a tela com menos frequência e em resolução menor.
+    As sessões da máquina trocam seu uso e sua etapa por arquivos em cache/<hostname>/sessoes/.
+    Com a máquina saturada, uma sessão numa etapa sensível à latência (espera curta: botões,
+    combos, modais) mantém o ritmo, e as que estão em esperas longas (fila de downloads) cedem
+    CPU. O relatório mostra a densidade alcançada em sessões por núcleo.
+
+    Com matching_workers > 1 as buscas mandadas ao pool de processos só contam a captura.
+    """
+
+    def __init__(self, budget: float = 0.25, cache_folder: Optional[str] = None):
+        """
+        Args:
+            budget: CPU por sessão, em núcleos (0.25 = um quarto de núcleo)
+            cache_folder: Pasta do cache (padrão: cache/ ao lado do projeto)
+        """
+        self.budget = budget
+        self.folder = os.path.join(HostCache("sessoes", cache_folder).folder, "sessoes")
+        self.path = os.path.join(self.folder, f"{os.getpid()}.json")
+        self.cores = os.cpu_count() or 1
+        self.started = time.time()
+        self.cpu_total = 0.0
+        self.lookups = 0
+        self.throttled_polls = 0
+        self.critical = True
+        self._samples: "deque[Tuple[float, float]]" = deque()  # (instante, segundos de CPU)
+        self._window_cpu = 0.0
+        self._others: List[Dict] = []
+        self._last_sync = 0.0
+
+    def record(self, cpu_seconds: float) -> None:
+        """CPU gasta numa captura + busca (time.process_time antes e depois)"""
+        now = time.monotonic()
+        self._samples.append((now, cpu_seconds))
+        self._window_cpu += cpu_seconds
+        self.cpu_total += cpu_seconds
+        self.lookups += 1
+        self._trim(now)
+
+    def _trim(self, now: float) -> None:
+        while self._samples and self._samples[0][0] < now - WINDOW_SECONDS:
+            self._window_cpu -= self._samples.popleft()[1]
+
+    def usage(self) -> float:
+        """Núcleos usados pela sessão em captura e busca na última janela"""
+        self._trim(time.monotonic())
+        elapsed = min(WINDOW_SECONDS, max(time.time() - self.started, 1.0))
+        return max(0.0, self._window_cpu) / elapsed
+
+    def begin_wait(self, timeout: float) -> None:
+        self.critical = timeout < LONG_WAIT_SECONDS
+        self._sync(force=True)
+
+    def end_wait(self) -> None:
+        self.critical = True
+
+    def pressure(self) -> float:
+        """
+        Quanto a sessão deve frear: 1.0 ou menos é ritmo normal, 2.0 é metade da frequência.
+
+        Espera curta (crítica): só freia se passou do orçamento e a máquina está saturada.
+        Espera longa: freia ao passar do orçamento e também quando a máquina está saturada,
+        com mais força se há sessões em etapas críticas.
+        """
+        self._sync()
+        own = self.usage() / self.budget if self.budget > 0 else 0.0
+        host_usage = self.usage() + sum(state["uso"] for state in self._others)
+        host = host_usage / (self.cores * HOST_CPU_LIMIT)
+
+        if self.critical:
+            return own if host > 1.0 else 1.0
+
+        others_critical = any(state["critica"] for state in self._others)
+        return max(1.0, own, host * (2.0 if others_critical else 1.0))
+
+    def throttle(self, check_interval: float) -> Tuple[float, float]:
+        """
+        Returns:
+            (intervalo até a próxima verificação, fator de resolução para a busca)
+        """
+        pressure = self.pressure()
+        if pressure <= 1.0:
+            return check_interval, 1.0
+
+        self.throttled_polls += 1
+        interval = min(check_interval * pressure, max(MAX_POLL_SECONDS, check_interval))
+        reduction = next((factor for limit, factor in REDUCTIONS if pressure <= limit), MIN_REDUCTION)
+        if self.critical:
+            # Botões e combos pequenos deixam de ser encontrados em resolução muito baixa
+            reduction = max(reduction, REDUCTIONS[-1][1])
+        return interval, reduction
+
+    def _sync(self, force: bool = False) -> None:
+        """Grava o estado desta sessão e lê o das demais, no máximo a cada STATE_INTERVAL"""
+        now = time.time()
+        if not force and now - self._last_sync < STATE_INTERVAL:
+            return
+        self._last_sync = now
+
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            temporary_path = f"{self.path}.tmp"
+            with open(temporary_path, "w", encoding="utf-8") as file:
+                json.dump(self.state(), file)
+            os.replace(temporary_path, self.path)
+            self._others = [state for state in read_sessions(self.folder) if state["pid"] != os.getpid()]
+        except OSError as e:
+            print(f"⚠ Governador de CPU: estado das sessões indisponível ({e})")
+            self._others = []
+
+    def state(self) -> Dict:
+        wall = max(time.time() - self.started, 1e-6)
+        return {
+            "pid": os.getpid(),
+            "uso": round(self.usage(), 4),
+            "uso_medio": round(self.cpu_total / wall, 4),
+            "orcamento": self.budget,
+            "critica": self.critical,
+            "buscas": self.lookups,
+            "verificacoes_freadas": self.throttled_polls,
+            "atualizado": time.time(),
+        }
+
+    def close(self) -> None:
+        """Remove o estado da sessão e mostra o uso médio e a densidade que ele permite"""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+        average = self.cpu_total / max(time.time() - self.started, 1e-6)
+        if self.lookups:
+            density = f"{1 / average:.1f}" if average > 0 else "∞"
+            print(f"\n⚙ CPU de captura/busca: {average:.3f} núcleo em média (orçamento {self.budget}), "
+                  f"≈ {density} sessões por núcleo; {self.throttled_polls} verificações freadas")
+
+
+def read_sessions(folder: str) -> List[Dict]:
+    """Estados das sessões vivas da máquina; descarta os de processos encerrados"""
+    states = []
+    if not os.path.isdir(folder):
+        return states
+
+    for name in os.listdir(folder):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(folder, name)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                state = json.load(file)
+        except (OSError, json.JSONDecodeError):
+            continue
+
+        if time.time() - state["atualizado"] > STALE_SECONDS or not _pid_alive(state["pid"]):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        states.append(state)
+
+    return states
+
+
+_governor: Optional[CpuGovernor] = None
+
+
+def get_cpu_governor(budget: float) -> CpuGovernor:
+    """Governador do processo (uma sessão), criado no primeiro uso e encerrado na saída"""
+    global _governor
+    if _governor is None:
+        _governor = CpuGovernor(budget)
+        atexit.register(_governor.close)
+    _governor.budget = budget
+    return _governor
+
+
+def main() -> None:
+    folder = os.path.join(HostCache("sessoes").folder, "sessoes")
+    sessions = read_sessions(folder)
+    cores = os.cpu_count() or 1
+
+    if not sessions:
+        print("Nenhuma sessão do bot com governador de CPU ativa nesta máquina.")
+        return
+
+    print(f"{'pid':>8} {'uso':>7} {'médio':>7} {'orçamento':>9} {'etapa':>9} {'buscas':>8} {'freadas':>8}")
+    for state in sorted(sessions, key=lambda state: state["pid"]):
+        print(f"{state['pid']:>8} {state['uso']:>7.3f} {state['uso_medio']:>7.3f} {state['orcamento']:>9} "
+              f"{'crítica' if state['critica'] else 'ociosa':>9} {state['buscas']:>8} {state['verificacoes_freadas']:>8}")
+
+    total = sum(state["uso_medio"] for state in sessions)
+    average = total / len(sessions)
+    print(f"\n{len(sessions)} sessões em {cores} núcleos: {len(sessions) / cores:.2f} sessões por núcleo, "
+          f"{total:.2f} núcleos em captura/busca")
+    if average > 0:
+        print(f"Com o uso médio atual ({average:.3f} núcleo por sessão) cabem ≈ "
+              f"{HOST_CPU_LIMIT / average:.1f} sessões por núcleo ({HOST_CPU_LIMIT:.0%} da CPU)")
+
+
+if __name__ == "__main__":
+    main()
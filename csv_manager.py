@@ -3,7 +3,7 @@ import os
 from typing import List, Dict, Optional
 
 
-def ler_arquivo_csv(nome_arquivo: str, mostrar_info: bool = True) -> Optional[Dict[str, any]]:
+def ler_arquivo_csv(nome_arquivo: str, mostrar_info: bool = True, caminho_base: Optional[str] = None) -> Optional[Dict[str, any]]:
     user = os.environ.get('USERNAME') or os.environ.get('USER')
 
     import json
@@ -17,12 +17,16 @@ def ler_arquivo_csv(nome_arquivo: str, mostrar_info: bool = True) -> Optional[Di
         if mostrar_info:
             print(f"Erro ao ler o manifest.json: {e}")
         return None
-    if not user or not bot_id:
-        if mostrar_info:
-            print("Não foi possível obter o usuário ou o id do bot.")
-        return None
+    # RPA_DATASETS_DIR permite apontar para outra pasta (ex: datasets sintéticos do benchmark)
+    caminho_base = caminho_base or os.environ.get('RPA_DATASETS_DIR')
     
-    caminho_base = fr"C:\Users\{user}\AppData\Roaming\hobots\datasets\{bot_id}"
+    if not caminho_base:
+        if not user or not bot_id:
+            if mostrar_info:
+                print("Não foi possível obter o usuário ou o id do bot.")
+            return None
+        
+        caminho_base = fr"C:\Users\{user}\AppData\Roaming\hobots\datasets\{bot_id}"
     
     if not nome_arquivo.endswith('.csv'):
         nome_arquivo += '.csv'
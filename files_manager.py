@@ -1,3 +1,4 @@
+import asyncio
 import os
 import shutil
 import getpass
@@ -6,6 +7,7 @@ from pathlib import Path
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from json_manager import JSONManager
+import metrics
 
 
 class FilesManager:
@@ -14,7 +16,16 @@ class FilesManager:
     def __init__(self):
         self.json_manager = JSONManager()
         self.current_user = getpass.getuser()
-        self.source_folder = fr"C:\Users\{self.current_user}\Documents\Arquivos ReceitanetBX"
+        self.source_folder = self._get_source_path()
+    
+    def _get_source_path(self) -> str:
+        """Pasta onde o ReceitanetBX grava os downloads (settings.json -> arquivos.origem, se informado)"""
+        try:
+            origem = self.json_manager.get_settings().get("arquivos", {}).get("origem")
+        except FileNotFoundError:
+            origem = None
+        
+        return origem or fr"C:\Users\{self.current_user}\Documents\Arquivos ReceitanetBX"
     
     def _render_template(self, template: str, data: Dict[str, Any]) -> str:
         """
@@ -103,7 +114,8 @@ class FilesManager:
                    extensions: Optional[List[str]] = None, 
                    custom_source: Optional[str] = None,
                    custom_destination: Optional[str] = None,
-                   data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+                   data: Optional[Dict[str, Any]] = None,
+                   file_paths: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         Move arquivos em massa da pasta padrão para o destino configurado
         
@@ -112,6 +124,7 @@ class FilesManager:
             custom_source: Caminho de origem personalizado (opcional)
             custom_destination: Caminho de destino personalizado (opcional)
             data: Dicionário com dados para substituição de variáveis no caminho
+            file_paths: Arquivos específicos da origem a mover, em vez de todos (opcional)
         
         Returns:
             Dict com informações sobre a operação (arquivos movidos, erros, etc.)
@@ -140,7 +153,7 @@ class FilesManager:
         self._ensure_directory_exists(destination_path)
         
         # Obtém lista de arquivos
-        files_to_move = self._get_files_in_directory(source_path, extensions)
+        files_to_move = file_paths if file_paths is not None else self._get_files_in_directory(source_path, extensions)
         
         if not files_to_move:
             return {
@@ -166,17 +179,21 @@ class FilesManager:
                     destination_file = os.path.join(destination_path, new_filename)
                     counter += 1
                 
+                size = os.path.getsize(file_path)
                 shutil.move(file_path, destination_file)
                 files_moved.append({
                     "original": file_path,
                     "destination": destination_file
                 })
+                metrics.FILES_MOVED.inc()
+                metrics.FILES_MOVED_BYTES.inc(size)
                 
             except Exception as e:
                 files_failed.append({
                     "file": file_path,
                     "error": str(e)
                 })
+                metrics.FILES_FAILED.inc()
         
         return {
             "success": len(files_failed) == 0,
@@ -188,6 +205,13 @@ class FilesManager:
             "message": f"Operação concluída. {len(files_moved)} arquivos movidos, {len(files_failed)} falharam."
         }
     
+    async def move_files_async(self, *args, **kwargs) -> Dict[str, Any]:
+        """
+        move_files numa thread do pool padrão do asyncio, sem bloquear o event loop
+        (mesmos argumentos e retorno de move_files)
+        """
+        return await asyncio.to_thread(self.move_files, *args, **kwargs)
+    
     def copy_files(self, 
                    extensions: Optional[List[str]] = None, 
                    custom_source: Optional[str] = None,
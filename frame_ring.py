@@ -0,0 +1,127 @@
+import json
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from screen_capture import ScreenCapture
+
+
+class FrameRing:
+    """
+    Últimas N capturas em buffers reaproveitados, para diagnosticar falhas sem gravar nada no caminho feliz.
+
+    Cada slot é alocado na primeira captura que recebe, no tamanho dela (a janela da aplicação
+    costuma ser bem menor que a tela), e depois as capturas são copiadas (np.copyto, sem alocar)
+    para o slot mais antigo. Em dump(), os slots preenchidos são entregues a uma thread que
+    codifica os PNGs (o OpenCV libera o GIL) e o anel volta a alocar sob demanda: o bot segue
+    sem esperar o disco. Falhas são raras, então a alocação fica fora do caminho feliz.
+    """
+
+    def __init__(self, capacity: int = 8, shape: Optional[Tuple[int, ...]] = None):
+        """
+        Args:
+            capacity: Número de capturas guardadas
+            shape: (altura, largura, canais) para pré-alocar todos os slots; None aloca cada um na primeira captura
+        """
+        self.capacity = capacity
+        self.shape = shape
+        self._slots: List[Optional[np.ndarray]] = self._allocate()
+        # (altura, largura, left, top, instante) de cada slot
+        self._meta: List[Optional[Tuple[int, int, int, int, float]]] = [None] * capacity
+        self._next = 0
+        self._lock = threading.Lock()
+        self._dumps: "queue.Queue" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_dumps, name="frame-ring-dump", daemon=True)
+        self._writer.start()
+
+    def _allocate(self) -> List[Optional[np.ndarray]]:
+        if self.shape is None:
+            return [None] * self.capacity
+        return [np.empty(self.shape, dtype=np.uint8) for _ in range(self.capacity)]
+
+    def push(self, image: np.ndarray, left: int = 0, top: int = 0) -> None:
+        height, width = image.shape[:2]
+        with self._lock:
+            index = self._next
+            slot = self._slots[index]
+            if slot is None or slot.shape[0] < height or slot.shape[1] < width or slot.shape[2:] != image.shape[2:]:
+                # Sem pré-alocação (ou captura maior que o slot): aloca no maior tamanho visto
+                previous = slot.shape[:2] if slot is not None else (0, 0)
+                slot = self._slots[index] = np.empty(
+                    (max(height, previous[0]), max(width, previous[1])) + image.shape[2:], dtype=image.dtype)
+            np.copyto(slot[:height, :width], image)
+            self._meta[index] = (height, width, left, top, time.time())
+            self._next = (index + 1) % self.capacity
+
+    def dump(self, folder: str, reason: str) -> Optional[str]:
+        """
+        Grava as capturas do anel (da mais antiga para a mais recente) em segundo plano.
+
+        Returns:
+            Pasta onde os PNGs serão gravados, ou None se o anel estiver vazio
+        """
+        with self._lock:
+            order = [(self._next + offset) % self.capacity for offset in range(self.capacity)]
+            frames = [(self._slots[index], self._meta[index]) for index in order if self._meta[index] is not None]
+            self._slots = self._allocate()
+            self._meta = [None] * self.capacity
+            self._next = 0
+
+        if not frames:
+            return None
+
+        slug = re.sub(r"[^0-9A-Za-z]+", "_", reason).strip("_")[:60] or "falha"
+        target = os.path.join(folder, f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{slug}")
+        self._dumps.put((target, reason, frames))
+        return target
+
+    def _write_dumps(self) -> None:
+        while True:
+            target, reason, frames = self._dumps.get()
+            try:
+                os.makedirs(target, exist_ok=True)
+                info = {"motivo": reason, "capturas": []}
+                for number, (slot, (height, width, left, top, timestamp)) in enumerate(frames):
+                    name = f"{number:02d}.png"
+                    cv2.imwrite(os.path.join(target, name), slot[:height, :width])
+                    info["capturas"].append({"arquivo": name, "left": left, "top": top,
+                                             "instante": datetime.fromtimestamp(timestamp).isoformat()})
+                with open(os.path.join(target, "info.json"), "w", encoding="utf-8") as file:
+                    json.dump(info, file, ensure_ascii=False, indent=2)
+            except Exception as e:
+                print(f"⚠ Falha ao gravar capturas de diagnóstico em {target}: {e}")
+            finally:
+                self._dumps.task_done()
+
+    def flush(self) -> None:
+        """Espera a gravação dos dumps pendentes"""
+        self._dumps.join()
+
+
+class RingCapture(ScreenCapture):
+    """Backend de captura que guarda cada captura de outro backend no FrameRing"""
+
+    def __init__(self, capture: ScreenCapture, ring: FrameRing):
+        self.capture = capture
+        self.ring = ring
+        self.name = capture.name
+
+    def grab(self, region: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        image = self.capture.grab(region)
+        region = self.capture.clip(region)
+        left, top = (region[0], region[1]) if region else (0, 0)
+        self.ring.push(image, left, top)
+        return image
+
+    def clip(self, region: Optional[Tuple[int, int, int, int]]) -> Optional[Tuple[int, int, int, int]]:
+        return self.capture.clip(region)
+
+    def close(self) -> None:
+        self.capture.close()
@@ -0,0 +1,43 @@
+import json
+import os
+import socket
+from typing import Any, Dict, Optional
+
+
+class HostCache:
+    """
+    Arquivo JSON com dados calibrados para a máquina atual (ex: motor de busca por template).
+
+    Fica em cache/<hostname>/<nome>.json, ao lado do projeto, para que cada máquina
+    que compartilha a pasta do bot mantenha a sua própria calibração.
+    """
+
+    def __init__(self, name: str, cache_folder: Optional[str] = None):
+        if cache_folder is None:
+            cache_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+
+        self.hostname = socket.gethostname()
+        self.folder = os.path.join(cache_folder, self.hostname)
+        self.path = os.path.join(self.folder, f"{name}.json")
+
+    def load(self) -> Dict[str, Any]:
+        if not os.path.exists(self.path):
+            return {}
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                content = file.read().strip()
+                return json.loads(content) if content else {}
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠ Cache {self.path} ignorado: {e}")
+            return {}
+
+    def save(self, data: Dict[str, Any]) -> None:
+        """Grava de forma atômica (arquivo temporário + rename) para não deixar JSON pela metade"""
+        os.makedirs(self.folder, exist_ok=True)
+        temporary_path = f"{self.path}.{os.getpid()}.tmp"
+
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False, indent=2)
+
+        os.replace(temporary_path, self.path)
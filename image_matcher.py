@@ -0,0 +1,375 @@
+import cv2
+import numpy as np
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Sobreposição (IoU) acima da qual duas ocorrências são consideradas o mesmo controle
+NMS_OVERLAP_THRESHOLD = 0.3
+
+# Até esta quantidade de pixels acima do confidence, a supressão de não-máximos é aplicada direto
+MAX_DIRECT_NMS_CANDIDATES = 2000
+
+# Em resolução reduzida os scores caem: candidatos até esta margem abaixo do confidence são
+# aceitos na busca reduzida e confirmados em resolução cheia
+REDUCED_CONFIDENCE_MARGIN = 0.15
+
+
+class Match(NamedTuple):
+    """Ocorrência de um template na tela, compatível com pyscreeze.Box e PyAutoGui.center"""
+    left: int
+    top: int
+    width: int
+    height: int
+    score: float
+
+
+def matches_to_array(matches: List[Match]) -> np.ndarray:
+    """Converte uma lista de Match em um array (N, 5): left, top, width, height, score"""
+    if not matches:
+        return np.empty((0, 5), dtype=np.float64)
+    return np.asarray(matches, dtype=np.float64).reshape(-1, 5)
+
+
+def array_to_matches(hits: np.ndarray) -> List[Match]:
+    return [
+        Match(int(left), int(top), int(width), int(height), float(score))
+        for left, top, width, height, score in hits
+    ]
+
+
+def non_max_suppression(hits: np.ndarray, overlap_threshold: float = NMS_OVERLAP_THRESHOLD) -> np.ndarray:
+    """
+    Mantém apenas a ocorrência de maior score entre caixas sobrepostas.
+
+    Args:
+        hits: Array (N, 5) de left, top, width, height, score
+        overlap_threshold: IoU a partir do qual a caixa de menor score é descartada
+
+    Returns:
+        Array (M, 5) com as ocorrências mantidas, ordenadas por score decrescente
+    """
+    if len(hits) <= 1:
+        return hits
+
+    hits = hits[np.argsort(-hits[:, 4], kind="stable")]
+    x1, y1 = hits[:, 0], hits[:, 1]
+    x2, y2 = x1 + hits[:, 2], y1 + hits[:, 3]
+    areas = hits[:, 2] * hits[:, 3]
+
+    keep = []
+    candidates = np.arange(len(hits))
+
+    while candidates.size:
+        best = candidates[0]
+        keep.append(best)
+        rest = candidates[1:]
+
+        inter_w = np.clip(np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest]), 0, None)
+        inter_h = np.clip(np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest]), 0, None)
+        intersection = inter_w * inter_h
+        iou = intersection / (areas[best] + areas[rest] - intersection)
+
+        candidates = rest[iou <= overlap_threshold]
+
+    return hits[keep]
+
+
+def sort_hits(hits: np.ndarray, by: str = "position") -> np.ndarray:
+    """
+    Ordena as ocorrências de forma determinística.
+
+    Args:
+        by: "position" (de cima para baixo, da esquerda para a direita) ou "score" (maior primeiro)
+    """
+    if len(hits) <= 1:
+        return hits
+    if by == "score":
+        return hits[np.lexsort((hits[:, 0], hits[:, 1], -hits[:, 4]))]
+    return hits[np.lexsort((hits[:, 0], hits[:, 1]))]
+
+
+def band_mask(hits: np.ndarray, min_x: Optional[int] = None, max_x: Optional[int] = None,
+              min_y: Optional[int] = None, max_y: Optional[int] = None) -> np.ndarray:
+    """
+    Máscara das ocorrências cujo centro (como em PyAutoGui.center) está dentro das faixas X/Y.
+
+    Limites None não filtram.
+    """
+    centers_x = hits[:, 0] + (hits[:, 2] // 2)
+    centers_y = hits[:, 1] + (hits[:, 3] // 2)
+    mask = np.ones(len(hits), dtype=bool)
+
+    if min_x is not None:
+        mask &= centers_x >= min_x
+    if max_x is not None:
+        mask &= centers_x <= max_x
+    if min_y is not None:
+        mask &= centers_y >= min_y
+    if max_y is not None:
+        mask &= centers_y <= max_y
+
+    return mask
+
+
+def filter_by_band(matches: List[Match], min_x: Optional[int] = None, max_x: Optional[int] = None,
+                   min_y: Optional[int] = None, max_y: Optional[int] = None) -> List[Match]:
+    """Filtra as ocorrências pelo centro dentro das faixas X/Y e as devolve ordenadas por posição"""
+    hits = matches_to_array(matches)
+    hits = hits[band_mask(hits, min_x, max_x, min_y, max_y)]
+    return array_to_matches(sort_hits(hits))
+
+
+def empty_hits() -> np.ndarray:
+    return np.empty((0, 5), dtype=np.float64)
+
+
+def hits_from_score_map(result: np.ndarray, width: int, height: int, min_confidence: float) -> np.ndarray:
+    """
+    Converte um mapa de correlação em ocorrências sem sobreposição.
+
+    Com muitos candidatos, mantém só os máximos locais (numa vizinhança do tamanho do
+    template) antes da supressão de não-máximos, para não processar cada pixel vizinho
+    de um mesmo controle. Com poucos, a supressão direta sai mais barata que a dilatação.
+    """
+    ys, xs = np.nonzero(result >= min_confidence)
+    if not len(xs):
+        return empty_hits()
+
+    if len(xs) > MAX_DIRECT_NMS_CANDIDATES:
+        kernel = np.ones((max(1, height // 2) * 2 + 1, max(1, width // 2) * 2 + 1), dtype=np.uint8)
+        local_max = result[ys, xs] >= cv2.dilate(result, kernel)[ys, xs]
+        ys, xs = ys[local_max], xs[local_max]
+
+    hits = np.empty((len(xs), 5), dtype=np.float64)
+    hits[:, 0] = xs
+    hits[:, 1] = ys
+    hits[:, 2] = width
+    hits[:, 3] = height
+    hits[:, 4] = result[ys, xs]
+
+    return non_max_suppression(hits)
+
+
+def resize_template(template: np.ndarray, scale: float) -> np.ndarray:
+    """Redimensiona o template para a escala da tela (INTER_AREA ao reduzir, INTER_LINEAR ao ampliar)"""
+    if scale == 1.0:
+        return template
+    width = max(1, int(round(template.shape[1] * scale)))
+    height = max(1, int(round(template.shape[0] * scale)))
+    interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+    return cv2.resize(template, (width, height), interpolation=interpolation)
+
+
+class MatchingEngine:
+    """
+    Interface dos algoritmos de busca de template.
+
+    match() recebe a captura e o template no mesmo formato (cinza ou BGR) e devolve o array (N, 5) de ocorrências
+    (left, top, width, height, score) relativo à captura, já sem sobreposição.
+    """
+
+    name = "base"
+
+    def match(self, frame: np.ndarray, template: np.ndarray, min_confidence: float) -> np.ndarray:
+        raise NotImplementedError
+
+
+class OpenCVEngine(MatchingEngine):
+    """Correlação cruzada normalizada (TM_CCOEFF_NORMED) do OpenCV, o mesmo critério do pyscreeze"""
+
+    name = "opencv"
+
+    def match(self, frame: np.ndarray, template: np.ndarray, min_confidence: float) -> np.ndarray:
+        height, width = template.shape[:2]
+        result = cv2.matchTemplate(frame, template, cv2.TM_CCOEFF_NORMED)
+        return hits_from_score_map(result, width, height, min_confidence)
+
+
+DEFAULT_ENGINE = OpenCVEngine.name
+
+
+class ImageMatcher:
+    """
+    Localiza templates em uma captura de tela retornando a pontuação de correlação de cada ocorrência.
+
+    Uma única passada com o menor confidence aceitável devolve todos os candidatos,
+    e quem chama aplica o confidence principal e o de fallback sobre o mesmo resultado.
+    O algoritmo usado pode ser escolhido por template (ver matching_engines).
+    """
+
+    def __init__(self, engines: Optional[Dict[str, MatchingEngine]] = None, default_engine: str = DEFAULT_ENGINE,
+                 grayscale: bool = True, atlas=None):
+        # Em tons de cinza por padrão, como o pyscreeze (GRAYSCALE_DEFAULT) usado antes pelo pyautogui
+        self.grayscale = grayscale
+        # Escala da tela em relação aos templates (ver scale_calibration); 1.0 usa os templates como estão
+        self.scale = 1.0
+        # Fator aplicado à captura e aos templates para buscar em resolução menor (ver cpu_governor)
+        self.reduction = 1.0
+        # TemplateAtlas (template_atlas.py) com os templates já decodificados, se compilado no mesmo formato
+        self.atlas = atlas if atlas is not None and atlas.grayscale == grayscale else None
+        self._templates: Dict[Tuple[str, float], np.ndarray] = {}
+        self.engines: Dict[str, MatchingEngine] = dict(engines or {})
+        # O OpenCV é sempre mantido: é o padrão e o fallback dos motores de pixels idênticos
+        self.engines.setdefault(OpenCVEngine.name, OpenCVEngine())
+        self.default_engine = default_engine if default_engine in self.engines else DEFAULT_ENGINE
+        self.engine_by_template: Dict[str, str] = {}
+
+    def load_template(self, image_path: str, scale: Optional[float] = None) -> np.ndarray:
+        """
+        Carrega o template (em cinza ou BGR), mantendo-o em cache para as próximas buscas.
+
+        Vem do atlas mapeado em memória quando disponível; senão usa np.fromfile + cv2.imdecode
+        para aceitar caminhos com acentos no Windows.
+
+        Args:
+            scale: Escala do template (padrão: a escala atual do matcher)
+        """
+        scale = self.scale if scale is None else scale
+        template = self._templates.get((image_path, scale))
+        if template is not None:
+            return template
+
+        template = self._templates.get((image_path, 1.0))
+
+        if template is None and self.atlas is not None:
+            template = self.atlas.get(image_path)
+
+        if template is None:
+            template = cv2.imdecode(np.fromfile(image_path, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if template is None:
+                raise ValueError(f"Não foi possível decodificar a imagem: {image_path}")
+            # Mesma conversão aplicada às capturas, para que pixels idênticos continuem idênticos
+            template = self.prepare(template)
+
+        self._templates[(image_path, 1.0)] = template
+
+        if scale != 1.0:
+            template = resize_template(template, scale)
+            self._templates[(image_path, scale)] = template
+
+        return template
+
+    def set_scale(self, scale: float) -> None:
+        """Muda a escala dos templates; os já redimensionados para outra escala são descartados"""
+        if scale == self.scale:
+            return
+        self.scale = scale
+        self._templates = {key: template for key, template in self._templates.items() if key[1] == 1.0}
+
+    def set_reduction(self, reduction: float) -> None:
+        """
+        Busca em resolução reduzida (ex: 0.5 = metade da largura e da altura), com menos CPU.
+
+        Os templates reduzidos ficam no cache junto dos demais (chave escala × redução), então
+        alternar entre reduções não redimensiona tudo de novo. Cada candidato é confirmado em
+        resolução cheia: coordenadas e scores são os mesmos de uma busca sem redução.
+        """
+        self.reduction = reduction
+
+    def reduce_frame(self, frame: np.ndarray) -> np.ndarray:
+        """Captura convertida (prepare) e reduzida pelo fator atual; feita uma vez por captura e passada a match"""
+        frame = self.prepare(frame)
+        if self.reduction == 1.0:
+            return frame
+        return cv2.resize(frame, None, fx=self.reduction, fy=self.reduction, interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def to_frame(screenshot) -> np.ndarray:
+        """Converte uma captura PIL (RGB) para o formato BGR usado nas buscas"""
+        return cv2.cvtColor(np.asarray(screenshot), cv2.COLOR_RGB2BGR)
+
+    def prepare(self, frame: np.ndarray) -> np.ndarray:
+        """Converte a captura BGR para o formato dos templates (uma vez por captura, se possível)"""
+        if self.grayscale and frame.ndim == 3:
+            return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return frame
+
+    def engine_for(self, image_path: str) -> str:
+        """Nome do algoritmo escolhido para o template (ou o padrão)"""
+        engine = self.engine_by_template.get(image_path, self.default_engine)
+        return engine if engine in self.engines else self.default_engine
+
+    def match(self, image_path: str, frame: np.ndarray, min_confidence: float,
+              offset: Tuple[int, int] = (0, 0), engine: Optional[str] = None,
+              reduced_frame: Optional[np.ndarray] = None) -> List[Match]:
+        """
+        Retorna as ocorrências do template com score >= min_confidence, uma por controle.
+
+        Args:
+            image_path: Caminho do template
+            frame: Captura em BGR (ou já convertida com prepare) onde procurar
+            min_confidence: Menor score aceito (normalmente o confidence de fallback)
+            offset: (x, y) somado às coordenadas, para capturas de uma região da tela
+            engine: Algoritmo a usar (padrão: o escolhido para o template)
+            reduced_frame: reduce_frame(frame) já calculado, para vários templates na mesma captura
+
+        Returns:
+            Lista de Match após supressão de não-máximos, ordenada por posição
+            (de cima para baixo, da esquerda para a direita)
+        """
+        return array_to_matches(sort_hits(self.match_hits(image_path, frame, min_confidence, offset, engine,
+                                                          reduced_frame)))
+
+    def match_hits(self, image_path: str, frame: np.ndarray, min_confidence: float,
+                   offset: Tuple[int, int] = (0, 0), engine: Optional[str] = None,
+                   reduced_frame: Optional[np.ndarray] = None) -> np.ndarray:
+        """Mesmo que match(), mas devolve o array (N, 5) sem ordenar, para juntar resultados parciais"""
+        engine_name = engine if engine in self.engines else self.engine_for(image_path)
+        frame = self.prepare(frame)
+
+        if self.reduction == 1.0:
+            hits = self._engine_hits(engine_name, frame, self.load_template(image_path), min_confidence)
+        else:
+            if reduced_frame is None:
+                reduced_frame = self.reduce_frame(frame)
+            candidates = self._engine_hits(engine_name, reduced_frame,
+                                           self.load_template(image_path, self.scale * self.reduction),
+                                           max(0.0, min_confidence - REDUCED_CONFIDENCE_MARGIN))
+            hits = self._verify_hits(candidates, frame, self.load_template(image_path), min_confidence)
+
+        if len(hits) and offset != (0, 0):
+            hits[:, 0] += offset[0]
+            hits[:, 1] += offset[1]
+
+        return hits
+
+    def _engine_hits(self, engine_name: str, frame: np.ndarray, template: np.ndarray,
+                     min_confidence: float) -> np.ndarray:
+        height, width = template.shape[:2]
+        if frame.shape[0] < height or frame.shape[1] < width:
+            return empty_hits()
+
+        hits = self.engines[engine_name].match(frame, template, min_confidence)
+
+        # Motores que só reconhecem pixels idênticos não dizem nada sobre ocorrências parecidas
+        if not len(hits) and getattr(self.engines[engine_name], "exact_only", False):
+            hits = self.engines[DEFAULT_ENGINE].match(frame, template, min_confidence)
+        return hits
+
+    def _verify_hits(self, candidates: np.ndarray, frame: np.ndarray, template: np.ndarray,
+                     min_confidence: float) -> np.ndarray:
+        """
+        Recalcula em resolução cheia o score de cada candidato da busca reduzida, numa janela
+        ao redor da posição estimada, e descarta os que ficam abaixo de min_confidence.
+        """
+        if not len(candidates):
+            return candidates
+
+        height, width = template.shape[:2]
+        # A posição reduzida erra até 1/redução pixels em cada eixo
+        pad = int(np.ceil(1 / self.reduction)) + 1
+        verified = []
+
+        for left, top in candidates[:, :2] / self.reduction:
+            x = max(0, int(round(left)) - pad)
+            y = max(0, int(round(top)) - pad)
+            patch = frame[y:y + height + 2 * pad, x:x + width + 2 * pad]
+            if patch.shape[0] < height or patch.shape[1] < width:
+                continue
+
+            _, score, _, (dx, dy) = cv2.minMaxLoc(cv2.matchTemplate(patch, template, cv2.TM_CCOEFF_NORMED))
+            if score >= min_confidence:
+                verified.append((x + dx, y + dy, width, height, score))
+
+        if not verified:
+            return empty_hits()
+        return non_max_suppression(np.asarray(verified, dtype=np.float64))
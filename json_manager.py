@@ -8,7 +8,8 @@ class JSONManager:
     
     def __init__(self, project_root: Optional[str] = None):
         if project_root is None:
-            self.project_root = os.path.dirname(os.path.abspath(__file__))
+            # RPA_CONFIG_DIR permite usar settings.json/params.json de outra pasta (ex: benchmark)
+            self.project_root = os.environ.get('RPA_CONFIG_DIR') or os.path.dirname(os.path.abspath(__file__))
         else:
             self.project_root = project_root
     
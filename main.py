@@ -1,41 +1,85 @@
+import argparse
+
 from json_manager import JSONManager
 from text_formatter import TextFormatter
 
 from csv_manager import ler_arquivo_csv
 from utils import for_each
 from receitanetbx_bot import executar_receitanetbx
+from metrics import configure_metrics
+from profiler import CompanyProfiler
+from output_packer import wait_for_packing
+from planner import DEFAULT_WORKER_COUNTS, build_plan, print_plan
 
-def main():
+def carregar_empresas(params: dict) -> list:
+    """Empresas do dataset a processar: só a de params["cnpj"], se informada e encontrada, ou todas"""
     empresas_result = ler_arquivo_csv("empresas")
 
     if not empresas_result or not empresas_result.get('dados'):
         print("Nenhuma empresa encontrada no CSV.")
-        return
+        return []
     
     empresas = empresas_result['dados']
-    
-    json_manager = JSONManager()
-    cnpj = json_manager.get_params().get("cnpj")
+    cnpj = params.get("cnpj")
 
     text_formatter = TextFormatter()
 
     empresas_filtradas = list(filter(lambda e: e['cnpj'] == text_formatter.getOnlyNumbers(cnpj), empresas)) or empresas
         
     print(f"✅ Encontradas {len(empresas_filtradas)} empresas.")
+    return empresas_filtradas
+
+def main(profile_folder: str = None, dry_run: bool = False, worker_counts=DEFAULT_WORKER_COUNTS):
+    json_manager = JSONManager()
+    params = json_manager.get_params()
+    
+    empresas_filtradas = carregar_empresas(params)
+    if not empresas_filtradas:
+        return
+    
+    if dry_run:
+        print_plan(build_plan(empresas_filtradas, params, worker_counts=worker_counts), show_companies=True)
+        return
+    
+    metrics_writer = configure_metrics(json_manager.get_settings() or {})
     
     def get_empresa_name(empresa):
         return f"{empresa['nome']} - CNPJ: {empresa['cnpj']}"
     
+    process_func = executar_receitanetbx
+    profiler = None
+    
+    if profile_folder is not None:
+        profiler = CompanyProfiler(profile_folder)
+        process_func = profiler.wrap(executar_receitanetbx, get_empresa_name)
+    
     for_each(
         items=empresas_filtradas,
-        process_func=executar_receitanetbx,
+        process_func=process_func,
         max_retries=0,
         retry_delay=2,
         item_name_func=get_empresa_name
     )
     
+    wait_for_packing()
+    
+    if metrics_writer:
+        metrics_writer.stop()
+    
+    if profiler:
+        profiler.print_summary()
+    
     print("\n🎉 Processamento de todas as empresas concluído!")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Download de arquivos do ReceitanetBX para as empresas do dataset")
+    parser.add_argument("--profile", nargs="?", const="", default=None, metavar="PASTA",
+                        help="Perfila cada empresa (CPU, parede e sleep); padrão: perfis/<data_hora>")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Só mostra o plano (pesquisas, seleções, downloads) e a estimativa de duração")
+    parser.add_argument("--workers", type=int, nargs="+", default=list(DEFAULT_WORKER_COUNTS),
+                        help="Números de sessões em paralelo para o ETA do --dry-run")
+    args = parser.parse_args()
+    
+    main(profile_folder=args.profile, dry_run=args.dry_run, worker_counts=args.workers)
@@ -0,0 +1,239 @@
+import time
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+import pyscreeze
+
+from image_matcher import (
+    DEFAULT_ENGINE,
+    ImageMatcher,
+    MatchingEngine,
+    OpenCVEngine,
+    empty_hits,
+    hits_from_score_map,
+    non_max_suppression,
+)
+
+
+class PyScreezeEngine(MatchingEngine):
+    """
+    Caminho original via pyscreeze.locateAll.
+
+    O pyscreeze não devolve o score, então ele é recalculado em cada ocorrência.
+    Mantido como referência e para comparação na calibração.
+    """
+
+    name = "pyscreeze"
+
+    def match(self, frame: np.ndarray, template: np.ndarray, min_confidence: float) -> np.ndarray:
+        try:
+            boxes = list(pyscreeze.locateAll(template, frame, confidence=min_confidence))
+        except pyscreeze.ImageNotFoundException:
+            return empty_hits()
+
+        if not boxes:
+            return empty_hits()
+
+        height, width = template.shape[:2]
+        hits = np.asarray([(box.left, box.top, width, height, 0.0) for box in boxes], dtype=np.float64)
+        for hit in hits:
+            left, top = int(hit[0]), int(hit[1])
+            patch = frame[top:top + height, left:left + width]
+            hit[4] = cv2.matchTemplate(patch, template, cv2.TM_CCOEFF_NORMED)[0, 0]
+
+        return non_max_suppression(hits)
+
+
+class FFTEngine(MatchingEngine):
+    """
+    Correlação cruzada normalizada calculada no domínio da frequência (NumPy).
+
+    Equivale ao TM_CCOEFF_NORMED, mas o custo praticamente não depende do tamanho do
+    template, o que compensa para templates grandes como fila_de_downloads.png.
+    Somas locais da captura vêm de imagens integrais.
+    """
+
+    name = "fft"
+
+    def match(self, frame: np.ndarray, template: np.ndarray, min_confidence: float) -> np.ndarray:
+        if frame.ndim == 2:
+            frame, template = frame[:, :, None], template[:, :, None]
+
+        frame_height, frame_width = frame.shape[:2]
+        height, width = template.shape[:2]
+        out_height, out_width = frame_height - height + 1, frame_width - width + 1
+        count = height * width
+
+        fft_shape = (cv2.getOptimalDFTSize(frame_height), cv2.getOptimalDFTSize(frame_width))
+        image = frame.astype(np.float64)
+        centered_template = template.astype(np.float64)
+        centered_template -= centered_template.mean(axis=(0, 1))
+
+        numerator = np.zeros((out_height, out_width), dtype=np.float64)
+        window_variance = np.zeros((out_height, out_width), dtype=np.float64)
+
+        for channel in range(frame.shape[2]):
+            channel_image = image[:, :, channel]
+            spectrum = np.fft.rfft2(channel_image, s=fft_shape)
+            template_spectrum = np.fft.rfft2(centered_template[:, :, channel], s=fft_shape)
+            correlation = np.fft.irfft2(spectrum * np.conj(template_spectrum), s=fft_shape)
+            numerator += correlation[:out_height, :out_width]
+
+            sums, squared_sums = cv2.integral2(channel_image)
+            window_sum = (sums[height:, width:] - sums[:-height, width:]
+                          - sums[height:, :-width] + sums[:-height, :-width])
+            window_squared = (squared_sums[height:, width:] - squared_sums[:-height, width:]
+                              - squared_sums[height:, :-width] + squared_sums[:-height, :-width])
+            window_variance += window_squared - (window_sum * window_sum) / count
+
+        template_variance = float((centered_template * centered_template).sum())
+        denominator = np.sqrt(np.clip(window_variance, 0, None) * template_variance)
+
+        result = np.zeros_like(numerator)
+        valid = denominator > 1e-6
+        result[valid] = numerator[valid] / denominator[valid]
+
+        return hits_from_score_map(result.astype(np.float32), width, height, min_confidence)
+
+
+class ExactEngine(MatchingEngine):
+    """
+    Comparação de pixels idênticos para elementos fixos da interface (botões, ícones).
+
+    Procura os candidatos pelo pixel mais raro do template e confere o bloco inteiro só
+    nesses pontos. Devolve score 1.0 ou nada; sem ocorrência idêntica, o ImageMatcher
+    repete a busca com o OpenCV (exact_only).
+    """
+
+    name = "exact"
+    exact_only = True
+    max_candidates = 5000
+
+    @staticmethod
+    def _pack(pixels: np.ndarray) -> np.ndarray:
+        """Um inteiro por pixel, para comparar cores de uma vez"""
+        if pixels.ndim == 2:
+            return pixels
+        return (pixels[..., 0].astype(np.uint32)
+                | (pixels[..., 1].astype(np.uint32) << 8)
+                | (pixels[..., 2].astype(np.uint32) << 16))
+
+    def match(self, frame: np.ndarray, template: np.ndarray, min_confidence: float) -> np.ndarray:
+        height, width = template.shape[:2]
+        out_height, out_width = frame.shape[0] - height + 1, frame.shape[1] - width + 1
+
+        packed_template = self._pack(template)
+        colors, inverse, counts = np.unique(packed_template, return_inverse=True, return_counts=True)
+        anchor_y, anchor_x = np.unravel_index(np.argmin(counts[inverse.reshape(-1)]), packed_template.shape)
+        anchor_color = packed_template[anchor_y, anchor_x]
+
+        window = frame[anchor_y:anchor_y + out_height, anchor_x:anchor_x + out_width]
+        ys, xs = np.nonzero(self._pack(window) == anchor_color)
+
+        if len(xs) > self.max_candidates:
+            return empty_hits()
+
+        hits = [
+            (x, y, width, height, 1.0)
+            for y, x in zip(ys, xs)
+            if np.array_equal(frame[y:y + height, x:x + width], template)
+        ]
+
+        if not hits:
+            return empty_hits()
+        return np.asarray(hits, dtype=np.float64)
+
+
+ENGINE_CLASSES = {
+    engine_class.name: engine_class
+    for engine_class in (OpenCVEngine, PyScreezeEngine, FFTEngine, ExactEngine)
+}
+
+# Motores que calculam a mesma correlação normalizada e podem substituir o OpenCV em qualquer template
+CORRELATION_ENGINES = (OpenCVEngine.name, FFTEngine.name, PyScreezeEngine.name)
+
+# Um motor só substitui o padrão se levar no máximo esta fração do tempo dele
+MIN_SPEEDUP = 0.9
+
+
+def create_engines() -> Dict[str, MatchingEngine]:
+    return {name: engine_class() for name, engine_class in ENGINE_CLASSES.items()}
+
+
+def _same_hits(expected: np.ndarray, actual: np.ndarray, tolerance: int = 1) -> bool:
+    """Compara duas listas de ocorrências pela posição, com tolerância de `tolerance` pixels"""
+    if len(expected) != len(actual):
+        return False
+    if not len(expected):
+        return True
+
+    expected = expected[np.lexsort((expected[:, 0], expected[:, 1]))]
+    actual = actual[np.lexsort((actual[:, 0], actual[:, 1]))]
+    return bool(np.all(np.abs(expected[:, :2] - actual[:, :2]) <= tolerance))
+
+
+def calibrate_engines(matcher: ImageMatcher, image_paths: List[str], frame: np.ndarray,
+                      min_confidence: float = 0.6, repeats: int = 3,
+                      engines: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """
+    Escolhe, para cada template, o motor mais rápido que devolve as mesmas ocorrências
+    que o OpenCV na captura de referência.
+
+    O motor de pixels idênticos só é elegível quando o template aparece na captura e
+    todas as ocorrências são idênticas; caso contrário nada garante que ele acerte depois.
+
+    Args:
+        matcher: ImageMatcher com os motores disponíveis
+        image_paths: Templates a calibrar
+        frame: Captura de referência em BGR (ou já convertida com matcher.prepare)
+        min_confidence: Confidence usado para comparar os resultados
+        repeats: Repetições por motor (vale o menor tempo)
+        engines: Motores a considerar (padrão: todos os do matcher)
+
+    Returns:
+        Dicionário caminho -> {"engine", "tempos" (ms por motor), "ocorrencias"}
+    """
+    candidates = [name for name in (engines or matcher.engines) if name in matcher.engines]
+    frame = matcher.prepare(frame)
+    report = {}
+
+    for image_path in image_paths:
+        try:
+            template = matcher.load_template(image_path)
+        except (ValueError, OSError) as e:
+            print(f"⚠ Template ignorado na calibração: {image_path} ({e})")
+            continue
+
+        if frame.shape[0] < template.shape[0] or frame.shape[1] < template.shape[1]:
+            continue
+
+        reference = matcher.engines[DEFAULT_ENGINE].match(frame, template, min_confidence)
+        reference_is_exact = len(reference) > 0 and bool(np.all(reference[:, 4] >= 0.9999))
+
+        timings = {}
+        for name in candidates:
+            engine = matcher.engines[name]
+            if getattr(engine, "exact_only", False):
+                if not reference_is_exact:
+                    continue
+            elif name not in CORRELATION_ENGINES:
+                continue
+
+            best = float("inf")
+            hits = empty_hits()
+            for _ in range(repeats):
+                started = time.perf_counter()
+                hits = engine.match(frame, template, min_confidence)
+                best = min(best, time.perf_counter() - started)
+
+            if _same_hits(reference, hits):
+                timings[name] = round(best * 1000, 3)
+
+        chosen = min(timings, key=timings.get) if timings else DEFAULT_ENGINE
+        # Diferenças pequenas são ruído de medição: só troca o padrão se o ganho for claro
+        if DEFAULT_ENGINE in timings and timings[chosen] > timings[DEFAULT_ENGINE] * MIN_SPEEDUP:
+            chosen = DEFAULT_ENGINE
+        report[image_path] = {"engine": chosen, "tempos": timings, "ocorrencias": int(len(reference))}
+
+    return report
@@ -0,0 +1,193 @@
+import atexit
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from image_matcher import ImageMatcher, Match, array_to_matches, non_max_suppression, sort_hits
+from matching_engines import create_engines
+from template_atlas import open_atlas
+
+# Abaixo desta área (em pixels) dividir uma única busca em faixas custa mais em IPC do que economiza
+MIN_TILED_AREA = 1280 * 720
+
+
+# Estado de cada processo do pool: matcher com cache de templates e a memória compartilhada anexada
+_worker_matcher: Optional[ImageMatcher] = None
+_worker_frames: Dict[str, shared_memory.SharedMemory] = {}
+
+
+def _init_worker(atlas_path: str, images_folder: str) -> None:
+    global _worker_matcher
+    # Cada worker mapeia o mesmo atlas somente leitura: as páginas ficam compartilhadas entre eles
+    _worker_matcher = ImageMatcher(create_engines(), atlas=open_atlas(atlas_path, images_folder))
+
+
+def _attach_frame(shm_name: str, shape: Tuple[int, ...]) -> np.ndarray:
+    """Anexa (uma vez por nome) a memória compartilhada com a captura e devolve a view NumPy"""
+    shm = _worker_frames.get(shm_name)
+
+    if shm is None:
+        for old in _worker_frames.values():
+            old.close()
+        _worker_frames.clear()
+
+        # Os workers compartilham o resource tracker do processo principal, que cria e remove o segmento
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _worker_frames[shm_name] = shm
+
+    return np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+
+
+def _match_templates(shm_name: str, shape: Tuple[int, ...], image_paths: List[str],
+                     min_confidence: float, bounds: Tuple[int, int, int, int],
+                     offset: Tuple[int, int], engines: Dict[str, str], scale: float) -> Dict[str, np.ndarray]:
+    """Executado no worker: procura cada template na faixa `bounds` (top, bottom, left, right) da captura"""
+    _worker_matcher.set_scale(scale)
+    frame = _attach_frame(shm_name, shape)
+    top, bottom, left, right = bounds
+    tile = frame[top:bottom, left:right]
+
+    return {
+        image_path: _worker_matcher.match_hits(image_path, tile, min_confidence,
+                                               offset=(offset[0] + left, offset[1] + top),
+                                               engine=engines.get(image_path))
+        for image_path in image_paths
+    }
+
+
+class MatchingPool:
+    """
+    Pool de processos para buscar templates em paralelo sobre a mesma captura.
+
+    A captura é copiada uma vez para memória compartilhada e cada worker a lê sem cópia.
+    Vários templates são divididos em subconjuntos disjuntos; um único template em uma
+    captura grande é dividido em faixas horizontais sobrepostas. Os resultados parciais
+    passam pela supressão de não-máximos antes de voltar ao chamador.
+    """
+
+    def __init__(self, workers: int, atlas_path: str = "", images_folder: str = "images"):
+        self.workers = workers
+        self._executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                             initargs=(atlas_path, images_folder))
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._template_areas: Dict[Tuple[str, float], int] = {}
+        self._matcher = ImageMatcher(atlas=open_atlas(atlas_path, images_folder))
+
+    def _publish_frame(self, image: np.ndarray) -> Tuple[str, Tuple[int, ...]]:
+        """Copia a captura para a memória compartilhada, recriando-a só quando não couber"""
+        image = np.ascontiguousarray(image)
+
+        if self._shm is None or self._shm.size < image.nbytes:
+            self._release_shm()
+            self._shm = shared_memory.SharedMemory(create=True, size=image.nbytes)
+
+        np.ndarray(image.shape, dtype=np.uint8, buffer=self._shm.buf)[...] = image
+        return self._shm.name, image.shape
+
+    def _template_area(self, image_path: str) -> int:
+        key = (image_path, self._matcher.scale)
+        area = self._template_areas.get(key)
+        if area is None:
+            height, width = self._matcher.load_template(image_path).shape[:2]
+            area = self._template_areas[key] = height * width
+        return area
+
+    def _split_templates(self, image_paths: List[str]) -> List[List[str]]:
+        """Distribui os templates entre os workers equilibrando a área total de cada grupo"""
+        groups = [[] for _ in range(min(self.workers, len(image_paths)))]
+        loads = [0] * len(groups)
+
+        for image_path in sorted(image_paths, key=self._template_area, reverse=True):
+            lightest = loads.index(min(loads))
+            groups[lightest].append(image_path)
+            loads[lightest] += self._template_area(image_path)
+
+        return groups
+
+    def _split_rows(self, frame_height: int, template_height: int) -> List[Tuple[int, int]]:
+        """Faixas horizontais que se sobrepõem o suficiente para não perder ocorrências na divisa"""
+        band = max(template_height, -(-frame_height // self.workers))
+        rows = []
+        top = 0
+        while top < frame_height:
+            bottom = min(frame_height, top + band + template_height - 1)
+            rows.append((top, bottom))
+            if bottom == frame_height:
+                break
+            top += band
+        return rows
+
+    def match_many(self, image_paths: List[str], image: np.ndarray, min_confidence: float,
+                   offset: Tuple[int, int] = (0, 0), engines: Optional[Dict[str, str]] = None,
+                   scale: float = 1.0) -> Dict[str, List[Match]]:
+        """
+        Procura vários templates na mesma captura, em paralelo.
+
+        Args:
+            engines: Motor a usar por template (ver matching_engines); ausentes usam o padrão
+            scale: Escala da tela em relação aos templates (ver scale_calibration)
+
+        Returns:
+            Dicionário caminho do template -> lista de Match em coordenadas de tela
+        """
+        if not image_paths:
+            return {}
+
+        self._matcher.set_scale(scale)
+        shm_name, shape = self._publish_frame(self._matcher.prepare(image))
+        frame_height, frame_width = shape[:2]
+        full = (0, frame_height, 0, frame_width)
+        engines = engines or {}
+
+        if len(image_paths) == 1 and frame_height * frame_width >= MIN_TILED_AREA:
+            template_height = self._matcher.load_template(image_paths[0]).shape[0]
+            futures = [
+                self._executor.submit(_match_templates, shm_name, shape, image_paths, min_confidence,
+                                      (top, bottom, 0, frame_width), offset, engines, scale)
+                for top, bottom in self._split_rows(frame_height, template_height)
+            ]
+        else:
+            futures = [
+                self._executor.submit(_match_templates, shm_name, shape, group, min_confidence, full, offset, engines, scale)
+                for group in self._split_templates(image_paths)
+            ]
+
+        merged: Dict[str, List[np.ndarray]] = {image_path: [] for image_path in image_paths}
+        for future in futures:
+            for image_path, hits in future.result().items():
+                merged[image_path].append(hits)
+
+        return {
+            image_path: array_to_matches(sort_hits(non_max_suppression(np.concatenate(parts))))
+            for image_path, parts in merged.items()
+        }
+
+    def _release_shm(self) -> None:
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self._release_shm()
+
+
+_shared_pools: Dict[Tuple[int, str, str], MatchingPool] = {}
+
+
+def get_matching_pool(workers: int, atlas_path: str = "", images_folder: str = "images") -> MatchingPool:
+    """
+    Pool compartilhado pelo processo inteiro, criado no primeiro uso.
+
+    Assim várias instâncias de RPA (uma por empresa) reaproveitam os mesmos workers
+    e os templates já carregados por eles.
+    """
+    key = (workers, atlas_path, images_folder)
+    pool = _shared_pools.get(key)
+    if pool is None:
+        pool = _shared_pools[key] = MatchingPool(workers, atlas_path, images_folder)
+        atexit.register(pool.close)
+    return pool
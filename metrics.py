@@ -0,0 +1,326 @@
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """Base das métricas: uma série por combinação de valores dos labels"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Labels de {self.name} devem ser {self.labelnames}, recebido {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def expose(self) -> List[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+
+    def snapshot(self) -> List[Dict]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        # Sem labels, a série existe desde o início (exposta como 0)
+        self._values: Dict[LabelValues, float] = {} if self.labelnames else {(): 0.0}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if amount < 0:
+            raise ValueError("Contadores só aumentam")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def expose(self) -> List[str]:
+        lines = super().expose()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}")
+        return lines
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            return [{"labels": dict(zip(self.labelnames, key)), "valor": value} for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Por série: contagem por bucket (não acumulada), soma e total
+        self._series: Dict[LabelValues, List] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, **labels) -> "_Timer":
+        """Context manager que observa a duração do bloco"""
+        return _Timer(self, labels)
+
+    def expose(self) -> List[str]:
+        lines = super().expose()
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labelnames, key, ("le", _format_number(bound)))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_number(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            return [
+                {"labels": dict(zip(self.labelnames, key)), "soma": total, "total": count,
+                 "buckets": dict(zip([_format_number(bound) for bound in self.buckets + (float("inf"),)], counts))}
+                for key, (counts, total, count) in self._series.items()
+            ]
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+class MetricsRegistry:
+    """Registro de métricas do processo, exposto em formato texto do Prometheus e em snapshots JSON"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Métrica {metric.name} já registrada com outro tipo ou labels")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, description, labelnames))
+
+    def gauge(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, description, labelnames))
+
+    def histogram(self, name: str, description: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, description, labelnames, buckets))
+
+    def expose(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict:
+        return {
+            "timestamp": time.time(),
+            "inicio": self.started_at,
+            "pid": os.getpid(),
+            "metricas": {name: {"tipo": metric.kind, "series": metric.snapshot()}
+                         for name, metric in list(self._metrics.items())},
+        }
+
+
+REGISTRY = MetricsRegistry()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = REGISTRY
+
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.registry.expose().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        # Sem log por requisição: o scraper consulta a cada poucos segundos
+        pass
+
+
+def start_http_server(port: int, host: str = "127.0.0.1", registry: MetricsRegistry = REGISTRY) -> ThreadingHTTPServer:
+    """Serve /metrics em formato Prometheus numa thread daemon"""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+class SnapshotWriter:
+    """Grava o snapshot JSON das métricas periodicamente (e ao parar), de forma atômica"""
+
+    def __init__(self, path: str, interval: float = 15.0, registry: MetricsRegistry = REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+
+    def start(self) -> "SnapshotWriter":
+        self._thread.start()
+        return self
+
+    def write(self) -> None:
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        temporary_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(self.registry.snapshot(), file, ensure_ascii=False)
+        os.replace(temporary_path, self.path)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                print(f"⚠ Falha ao gravar métricas em {self.path}: {e}")
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.write()
+
+
+def configure_metrics(settings: Dict) -> Optional[SnapshotWriter]:
+    """
+    Liga a exportação conforme settings.json -> "metricas":
+    {"porta": 9464, "host": "127.0.0.1", "arquivo": "metricas.json", "intervalo": 15}
+
+    Sem a seção, as métricas continuam sendo coletadas, mas não são expostas.
+    """
+    config = settings.get("metricas") or {}
+    writer = None
+
+    if config.get("porta"):
+        try:
+            start_http_server(int(config["porta"]), config.get("host", "127.0.0.1"))
+            print(f"📈 Métricas em http://{config.get('host', '127.0.0.1')}:{config['porta']}/metrics")
+        except OSError as e:
+            print(f"⚠ Não foi possível abrir a porta de métricas {config['porta']}: {e}")
+
+    if config.get("arquivo"):
+        writer = SnapshotWriter(config["arquivo"], float(config.get("intervalo", 15))).start()
+
+    return writer
+
+
+# Métricas do bot
+
+TEMPLATE_LOOKUPS = REGISTRY.counter(
+    "rpa_template_lookups_total", "Buscas de template por resultado (hit: ao menos uma ocorrência)", ("template", "resultado"))
+TEMPLATE_LOOKUP_SECONDS = REGISTRY.histogram(
+    "rpa_template_lookup_seconds",
+    "Duração das buscas de template (captura + matching); as de vários templates juntos ficam em template=\"lote\"",
+    ("template",))
+WAIT_SECONDS = REGISTRY.histogram(
+    "rpa_wait_seconds", "Tempo esperando uma imagem aparecer", ("template", "resultado"))
+ITEMS_PROCESSED = REGISTRY.counter(
+    "for_each_items_total", "Itens processados pelo for_each por resultado", ("resultado",))
+ITEM_RETRIES = REGISTRY.counter(
+    "for_each_retries_total", "Novas tentativas feitas pelo for_each")
+FILES_MOVED = REGISTRY.counter(
+    "files_moved_total", "Arquivos movidos pelo FilesManager")
+FILES_MOVED_BYTES = REGISTRY.counter(
+    "files_moved_bytes_total", "Bytes movidos pelo FilesManager")
+FILES_FAILED = REGISTRY.counter(
+    "files_move_failures_total", "Arquivos que o FilesManager não conseguiu mover")
+COMPANIES = REGISTRY.counter(
+    "companies_processed_total", "Empresas processadas pelo bot por resultado", ("resultado",))
+COMPANY_SECONDS = REGISTRY.histogram(
+    "company_seconds", "Duração do processamento de cada empresa",
+    buckets=(10, 30, 60, 120, 300, 600, 1200, 1800, 3600))
+PACKED_BYTES_IN = REGISTRY.counter(
+    "pack_input_bytes_total", "Bytes originais compactados")
+PACKED_BYTES_OUT = REGISTRY.counter(
+    "pack_output_bytes_total", "Bytes dos pacotes compactados gerados")
+PACK_SECONDS = REGISTRY.histogram(
+    "pack_seconds", "Duração da compactação de cada pasta",
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600))
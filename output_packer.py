@@ -0,0 +1,231 @@
+import os
+import shutil
+import tarfile
+import threading
+import time
+import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import metrics
+
+FORMATS = {
+    "zip": ".zip",  # Deflate, abre nativamente no Windows
+    "tar.xz": ".tar.xz",  # LZMA, bem menor para texto SPED, porém mais lento
+}
+
+COPY_CHUNK_SIZE = 1024 * 1024  # Blocos ao copiar os membros de um pacote anterior
+
+
+def _folder_files(folder: str) -> List[str]:
+    return sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(folder)
+        for name in names
+    )
+
+
+def _copy_previous_zip(previous_path: str, archive: zipfile.ZipFile, skip: set) -> Tuple[int, int]:
+    """Copia para o novo zip os membros do pacote anterior que não serão regravados; devolve (membros, bytes)"""
+    members = copied = 0
+    with zipfile.ZipFile(previous_path) as previous:
+        for info in previous.infolist():
+            if info.filename in skip:
+                continue
+            with previous.open(info) as source, archive.open(info, "w", force_zip64=True) as target:
+                shutil.copyfileobj(source, target, COPY_CHUNK_SIZE)
+            members += 1
+            copied += info.file_size
+    return members, copied
+
+
+def _copy_previous_tar(previous_path: str, archive: tarfile.TarFile, skip: set) -> Tuple[int, int]:
+    members = copied = 0
+    with tarfile.open(previous_path, "r:xz") as previous:
+        for member in previous:
+            if member.name in skip:
+                continue
+            archive.addfile(member, previous.extractfile(member) if member.isfile() else None)
+            members += 1
+            copied += member.size
+    return members, copied
+
+
+def pack_folder(folder: str, archive_format: str = "zip", level: int = 6, remove_originals: bool = False) -> Dict:
+    """
+    Compacta todos os arquivos da pasta em <pasta><extensão>, ao lado dela.
+
+    Cada arquivo é lido e comprimido em blocos pelo zipfile/tarfile, sem carregá-lo inteiro.
+    O arquivo compactado é gravado com outro nome e renomeado no fim, para que uma cópia
+    para o arquivamento nunca pegue um pacote pela metade. Se o pacote já existe (pasta
+    compactada de novo, com remove_originals), os membros anteriores são copiados para o
+    novo: um arquivo só é apagado depois de estar no pacote final.
+
+    Returns:
+        Estatísticas: arquivos no pacote (arquivos_novos: os desta pasta, o resto veio do pacote
+        anterior), bytes de entrada e saída, razão de compressão, segundos e MB/s
+    """
+    started = time.perf_counter()
+    folder = os.path.normpath(folder)
+    archive_path = folder + FORMATS[archive_format]
+    temporary_path = f"{archive_path}.{os.getpid()}.tmp"
+    files = _folder_files(folder)
+    names = {os.path.relpath(path, folder).replace(os.sep, "/") for path in files}
+    bytes_in = sum(os.path.getsize(path) for path in files)
+    previous = os.path.exists(archive_path)
+    carried = (0, 0)
+
+    if archive_format == "zip":
+        with zipfile.ZipFile(temporary_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=level,
+                             allowZip64=True) as archive:
+            if previous:
+                carried = _copy_previous_zip(archive_path, archive, names)
+            for path in files:
+                archive.write(path, os.path.relpath(path, folder))
+    else:
+        with tarfile.open(temporary_path, "w:xz", preset=level) as archive:
+            if previous:
+                carried = _copy_previous_tar(archive_path, archive, names)
+            for path in files:
+                archive.add(path, os.path.relpath(path, folder), recursive=False)
+
+    os.replace(temporary_path, archive_path)
+    bytes_in += carried[1]
+
+    if remove_originals:
+        for path in files:
+            os.remove(path)
+
+    seconds = time.perf_counter() - started
+    bytes_out = os.path.getsize(archive_path)
+    return {
+        "pasta": folder,
+        "pacote": archive_path,
+        "arquivos": len(files) + carried[0],
+        "arquivos_novos": len(files),
+        "bytes_entrada": bytes_in,
+        "bytes_saida": bytes_out,
+        "razao": bytes_in / bytes_out if bytes_out else 0.0,
+        "segundos": seconds,
+        "mb_s": bytes_in / (1024 * 1024) / seconds if seconds else 0.0,
+    }
+
+
+class OutputPacker:
+    """
+    Compacta, em processos separados, as pastas de destino que o bot terminou de preencher.
+
+    A compactação roda em paralelo com o restante da execução (a próxima empresa já começa);
+    uma pasta enviada de novo enquanto está sendo compactada é refeita ao terminar, para
+    incluir os arquivos novos.
+
+    settings.json -> arquivos.compactar:
+    {"ativo": true, "processos": 2, "formato": "zip", "nivel": 6, "remover_originais": false}
+    """
+
+    def __init__(self, workers: int = 2, archive_format: str = "zip", level: int = 6, remove_originals: bool = False):
+        if archive_format not in FORMATS:
+            raise ValueError(f"Formato de compactação desconhecido: {archive_format} (use {', '.join(FORMATS)})")
+
+        self.archive_format = archive_format
+        self.level = level
+        self.remove_originals = remove_originals
+        self.executor = ProcessPoolExecutor(max_workers=max(1, workers))
+        self.results: List[Dict] = []
+        self.errors: List[str] = []
+        self._active: Dict[str, Future] = {}
+        self._again = set()
+        self._lock = threading.Lock()
+
+    def submit(self, folder: str) -> None:
+        folder = os.path.normpath(folder)
+        if not os.path.isdir(folder):
+            return
+
+        with self._lock:
+            if folder in self._active:
+                self._again.add(folder)
+                return
+            future = self.executor.submit(pack_folder, folder, self.archive_format, self.level, self.remove_originals)
+            self._active[folder] = future
+
+        future.add_done_callback(lambda done, folder=folder: self._finished(folder, done))
+
+    def _finished(self, folder: str, future: Future) -> None:
+        try:
+            result = future.result()
+        except Exception as e:
+            self.errors.append(f"{folder}: {e}")
+            print(f"❌ Falha ao compactar {folder}: {e}")
+        else:
+            self.results.append(result)
+            metrics.PACKED_BYTES_IN.inc(result["bytes_entrada"])
+            metrics.PACKED_BYTES_OUT.inc(result["bytes_saida"])
+            metrics.PACK_SECONDS.observe(result["segundos"])
+            print(f"📦 {result['pacote']}: {result['arquivos']} arquivos, "
+                  f"{result['bytes_entrada'] / 1048576:.1f} MB → {result['bytes_saida'] / 1048576:.1f} MB "
+                  f"({result['razao']:.1f}x) em {result['segundos']:.1f}s ({result['mb_s']:.1f} MB/s)")
+
+        with self._lock:
+            del self._active[folder]
+            again = folder in self._again
+            self._again.discard(folder)
+
+        if again:
+            self.submit(folder)
+
+    def wait(self) -> None:
+        """Aguarda todas as compactações (inclusive as refeitas) e mostra o total"""
+        while True:
+            with self._lock:
+                pending = list(self._active.values())
+            if not pending:
+                break
+            for future in pending:
+                try:
+                    future.result()
+                except Exception:
+                    pass
+            # Dá tempo ao callback de remover a pasta de _active (e reenviar, se preciso)
+            time.sleep(0.05)
+
+        self.executor.shutdown(wait=True)
+        self.print_summary()
+
+    def print_summary(self) -> None:
+        if not self.results:
+            return
+        bytes_in = sum(result["bytes_entrada"] for result in self.results)
+        bytes_out = sum(result["bytes_saida"] for result in self.results)
+        seconds = sum(result["segundos"] for result in self.results)
+        print(f"\n📦 {len(self.results)} pastas compactadas: {bytes_in / 1048576:.1f} MB → {bytes_out / 1048576:.1f} MB "
+              f"({bytes_in / bytes_out if bytes_out else 0:.1f}x), {bytes_in / 1048576 / seconds if seconds else 0:.1f} MB/s por processo")
+
+
+_packer: Optional[OutputPacker] = None
+
+
+def get_output_packer(settings: Dict) -> Optional[OutputPacker]:
+    """OutputPacker do processo conforme settings.json -> arquivos.compactar, ou None se desativado"""
+    global _packer
+    config = (settings.get("arquivos") or {}).get("compactar") or {}
+
+    if not config.get("ativo"):
+        return None
+
+    if _packer is None:
+        _packer = OutputPacker(
+            workers=config.get("processos", 2),
+            archive_format=config.get("formato", "zip"),
+            level=config.get("nivel", 6),
+            remove_originals=config.get("remover_originais", False),
+        )
+    return _packer
+
+
+def wait_for_packing() -> None:
+    """Chamado ao fim da execução: espera as compactações pendentes"""
+    global _packer
+    if _packer is not None:
+        _packer.wait()
+        _packer = None
@@ -0,0 +1,86 @@
+import heapq
+from typing import Dict, List, Sequence
+
+from receitanetbx_bot import montar_periodos
+from step_timings import StepTimings
+
+DEFAULT_WORKER_COUNTS = (1, 2, 4, 8)
+
+
+def plan_company(empresa: Dict, params: Dict, timings: StepTimings, keep_open: bool = False) -> Dict:
+    """
+    Expande as etapas que executar_receitanetbx faria para uma empresa e estima a duração.
+
+    Args:
+        keep_open: Sessão mantida aberta entre empresas (daemon): sem abertura/fechamento por empresa
+    """
+    tipos = [tipo for tipo, enabled in (params.get("types") or {}).items() if enabled is True]
+    counts = {"pesquisas": 0, "selecoes": 0, "downloads": 0}
+    seconds = timings.estimate("perfil")
+
+    if not keep_open:
+        seconds += timings.estimate("abertura") + timings.estimate("fechamento")
+
+    for tipo in tipos:
+        for _ in montar_periodos(tipo, params["period"]):
+            counts["pesquisas"] += 1
+            counts["selecoes"] += 1
+            counts["downloads"] += 1
+            seconds += sum(timings.estimate(f"{step}.{tipo}") for step in ("pesquisa", "selecao", "download"))
+            seconds += timings.estimate("mover")
+
+    return {"cnpj": empresa.get("cnpj"), "nome": empresa.get("nome"), "tipos": tipos,
+            "segundos": seconds, **counts}
+
+
+def makespan(durations: Sequence[float], workers: int) -> float:
+    """Duração total distribuindo as empresas entre sessões paralelas (maiores primeiro, na menos ocupada)"""
+    loads = [0.0] * max(1, workers)
+    for duration in sorted(durations, reverse=True):
+        heapq.heapreplace(loads, loads[0] + duration)
+    return max(loads)
+
+
+def build_plan(empresas: List[Dict], params: Dict, timings: StepTimings = None,
+               worker_counts: Sequence[int] = DEFAULT_WORKER_COUNTS, keep_open: bool = False) -> Dict:
+    """Plano de uma execução de main.main() sem tocar na tela: etapas, contagens e ETA por número de sessões"""
+    timings = timings or StepTimings()
+    companies = [plan_company(empresa, params, timings, keep_open) for empresa in empresas]
+    durations = [company["segundos"] for company in companies]
+
+    steps = ["abertura", "perfil", "mover", "fechamento"] + [
+        f"{step}.{tipo}" for tipo in (companies[0]["tipos"] if companies else [])
+        for step in ("pesquisa", "selecao", "download")
+    ]
+
+    return {
+        "empresas": companies,
+        "totais": {key: sum(company[key] for company in companies) for key in ("pesquisas", "selecoes", "downloads")},
+        "eta": {workers: makespan(durations, workers) for workers in worker_counts},
+        "estimativas": {step: (timings.estimate(step), timings.has_history(step)) for step in steps},
+    }
+
+
+def _format_duration(seconds: float) -> str:
+    hours, rest = divmod(int(round(seconds)), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def print_plan(plan: Dict, show_companies: bool = False) -> None:
+    totals = plan["totais"]
+    print(f"\n🗓 Plano: {len(plan['empresas'])} empresas, {totals['pesquisas']} pesquisas, "
+          f"{totals['selecoes']} seleções, {totals['downloads']} downloads")
+
+    print("⏱ Tempo por etapa (mediana):")
+    for step, (seconds, known) in plan["estimativas"].items():
+        print(f"  {step}: {seconds:.1f}s{'' if known else ' (sem histórico, padrão)'}")
+
+    if show_companies:
+        for company in plan["empresas"]:
+            print(f"  {company['nome']} - CNPJ: {company['cnpj']}: {company['pesquisas']} pesquisas, "
+                  f"~{_format_duration(company['segundos'])}")
+
+    print("📊 ETA por número de sessões em paralelo:")
+    for workers, seconds in plan["eta"].items():
+        print(f"  {workers}: {_format_duration(seconds)}")
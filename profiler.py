@@ -0,0 +1,188 @@
+import cProfile
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+SLEEP_MARKER = "[sleep]"
+
+# Pontos de entrada de captura + busca de template cujo tempo acumulado conta como "matching"
+# no resumo. Só os mais externos: ImageMatcher.match, os motores e os backends de captura rodam
+# dentro deles e seriam contados de novo
+MATCHING_FUNCTIONS = {
+    ("rpa.py", "_find_all_image_matches"),
+    ("rpa.py", "_find_many_image_matches"),
+}
+
+_real_sleep = time.sleep
+
+
+def _profiled_sleep(seconds: float) -> None:
+    # Frame Python próprio para que o amostrador reconheça o tempo parado em sleep
+    _profiled_sleep.total += seconds
+    _real_sleep(seconds)
+
+
+_profiled_sleep.total = 0.0
+
+
+def _frame_name(frame) -> str:
+    module = os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]
+    return f"{module}:{frame.f_code.co_name}"
+
+
+class StackSampler:
+    """Amostra a pilha de uma thread em intervalos fixos e acumula no formato folded (flame graph)"""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self) -> None:
+        sleep_code = _profiled_sleep.__code__
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+
+            names = []
+            if frame.f_code is sleep_code:
+                names.append(SLEEP_MARKER)
+                frame = frame.f_back
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+
+            self.stacks[";".join(reversed(names))] += 1
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^0-9A-Za-z]+", "_", name).strip("_")[:80] or "item"
+
+
+def _is_matching(function_key) -> bool:
+    filename, _, function = function_key
+    return (os.path.basename(filename), function) in MATCHING_FUNCTIONS
+
+
+def _matching_cpu(profile: cProfile.Profile) -> float:
+    """Tempo acumulado das chamadas a MATCHING_FUNCTIONS feitas de fora delas (sem contar aninhadas)"""
+    stats = pstats.Stats(profile)
+    total = 0.0
+    for function_key, (_, _, _, cumulative, callers) in stats.stats.items():
+        if not _is_matching(function_key):
+            continue
+        if not callers:
+            total += cumulative
+            continue
+        total += sum(edge[3] for caller, edge in callers.items() if not _is_matching(caller))
+    return total
+
+
+class CompanyProfiler:
+    """
+    Perfila cada chamada de uma função de processamento (ex: executar_receitanetbx).
+
+    Por item gera:
+      - <item>.prof: perfil determinístico (cProfile) em tempo de CPU, para pstats/snakeviz
+      - <item>.folded: pilhas amostradas em tempo de parede, com o tempo em time.sleep
+        marcado como [sleep], para flamegraph.pl/speedscope
+    E ao final: todas.folded (pilhas de todos os itens) e resumo.json com parede x CPU x sleep.
+
+    Tempo gasto nos processos do pool de matching não entra no CPU deste processo.
+    """
+
+    def __init__(self, output_folder: str = "", sample_interval: float = 0.005):
+        self.output_folder = output_folder or os.path.join("perfis", datetime.now().strftime("%Y%m%d_%H%M%S"))
+        self.sample_interval = sample_interval
+        self.merged: Counter = Counter()
+        self.summary: Dict[str, Dict] = {}
+        os.makedirs(self.output_folder, exist_ok=True)
+
+    def wrap(self, process_func: Callable, item_name_func: Optional[Callable] = None) -> Callable:
+        """Retorna process_func perfilada, com a mesma assinatura (item, first_time)"""
+        def profiled(item, *args, **kwargs):
+            name = item_name_func(item) if item_name_func else str(item.get("nome") or item.get("id"))
+            return self.run(name, process_func, item, *args, **kwargs)
+        return profiled
+
+    def run(self, name: str, func: Callable, *args, **kwargs):
+        slug = _slug(name)
+        profile = cProfile.Profile(time.process_time)
+        sampler = StackSampler(threading.get_ident(), self.sample_interval)
+
+        _profiled_sleep.total = 0.0
+        time.sleep = _profiled_sleep
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        sampler.start()
+        profile.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            stacks = sampler.stop()
+            time.sleep = _real_sleep
+            wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+            profile.dump_stats(os.path.join(self.output_folder, f"{slug}.prof"))
+            self._write_folded(os.path.join(self.output_folder, f"{slug}.folded"), stacks)
+            self.merged.update(stacks)
+
+            sampled = sum(stacks.values()) or 1
+            self.summary[name] = {
+                "parede": wall,
+                "cpu": cpu,
+                "cpu_matching": _matching_cpu(profile),
+                "sleep": _profiled_sleep.total,
+                "amostras": sum(stacks.values()),
+                "fracao_sleep_amostrada": sum(n for s, n in stacks.items() if s.endswith(SLEEP_MARKER)) / sampled,
+            }
+            self._print_item(name, self.summary[name])
+            self.save()
+
+    @staticmethod
+    def _write_folded(path: str, stacks: Counter) -> None:
+        with open(path, "w", encoding="utf-8") as file:
+            for stack, count in stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+    @staticmethod
+    def _print_item(name: str, stats: Dict) -> None:
+        print(f"⏱ Perfil {name}: parede {stats['parede']:.1f}s | CPU {stats['cpu']:.1f}s "
+              f"(matching {stats['cpu_matching']:.1f}s) | sleep {stats['sleep']:.1f}s")
+
+    def save(self) -> None:
+        self._write_folded(os.path.join(self.output_folder, "todas.folded"), self.merged)
+        with open(os.path.join(self.output_folder, "resumo.json"), "w", encoding="utf-8") as file:
+            json.dump(self.summary, file, ensure_ascii=False, indent=2)
+
+    def print_summary(self) -> None:
+        if not self.summary:
+            return
+
+        totals = {key: sum(stats[key] for stats in self.summary.values())
+                  for key in ("parede", "cpu", "cpu_matching", "sleep")}
+        other = max(0.0, totals["parede"] - totals["cpu"] - totals["sleep"])
+        print(f"\n📊 Perfil de {len(self.summary)} itens em {self.output_folder}")
+        print(f"  Parede: {totals['parede']:.1f}s")
+        print(f"  CPU: {totals['cpu']:.1f}s (matching {totals['cpu_matching']:.1f}s)")
+        print(f"  Sleep: {totals['sleep']:.1f}s")
+        print(f"  Outros (I/O, espera do pool e do sistema): {other:.1f}s")
@@ -1,75 +1,272 @@
+from datetime import datetime
 from date_formatter import DateFormatter
+import os
 import time
 from json_manager import JSONManager
 from rpa import RPA, RPAResult, RPAConfig
 from files_manager import FilesManager
+import metrics
+from step_timings import StepTimings
+from request_registry import STATUS_DOWNLOADED, STATUS_NOT_READY, RequestRegistry
+from sped_files import header_matches, list_downloaded_files, read_sped_header
+from sped_indexer import SpedIndex, verify_moved_files
+from output_packer import get_output_packer
 
-def executar_receitanetbx(empresa, first_time):
-    config = RPAConfig(
+def montar_periodos(tipo: str, period: dict, hoje: datetime = None) -> list:
+    """
+    Expande o período de params.json nas pesquisas feitas para um tipo: uma por ano com
+    as datas de início de cada mês ou, para sped_fiscal, uma única pesquisa anual.
+
+    Returns:
+        Lista de {"inicio", "fim", "meses", "primeiro"} com datas dd/mm/aaaa; "fim" não passa de hoje
+    """
+    date_formatter = DateFormatter()
+    start_date_formatted = datetime.strptime(period["start_date"], "%Y-%m-%d").strftime("%d/%m/%Y")
+    end_date_formatted = datetime.strptime(period["end_date"], "%Y-%m-%d").strftime("%d/%m/%Y")
+
+    if tipo != "sped_fiscal":
+        range_dates = date_formatter.generate_monthly_start_dates(start_date_formatted, end_date_formatted, format_type="dd/mm/yyyy")
+    else:
+        yearly_dates = date_formatter.generate_yearly_start_dates(start_date_formatted, end_date_formatted, format_type="dd/mm/yyyy")
+        range_dates = [yearly_dates]
+
+    hoje = (hoje or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    periodos = []
+
+    for i, year_dates in enumerate(range_dates):
+        end_date = date_formatter.get_last_day_of_month(year_dates[-1], input_format="dd/mm/yyyy")
+
+        if datetime.strptime(end_date, "%d/%m/%Y") > hoje:
+            end_date = hoje.strftime("%d/%m/%Y")
+
+        periodos.append({"inicio": year_dates[0], "fim": end_date, "meses": year_dates, "primeiro": i == 0})
+
+    return periodos
+
+
+def _data(texto: str):
+    return datetime.strptime(texto, "%d/%m/%Y").date()
+
+
+def _conferir_arquivos(indice: SpedIndex, move_result: dict, empresa: dict, tipo: str, inicio: str, fim: str) -> None:
+    """Indexa os arquivos movidos e avisa os que não conferem com empresa/tipo/período ou estão incompletos"""
+    for mensagem in verify_moved_files(indice, move_result["files_moved"], empresa, tipo, _data(inicio), _data(fim)):
+        print(f"  ⚠ {mensagem}")
+
+
+def _registrar_manifesto(manifesto: list, move_result: dict, tipo: str, inicio: str, fim: str) -> None:
+    """Acrescenta os arquivos movidos ao manifesto da empresa (devolvido ao coordenador)"""
+    if manifesto is None:
+        return
+    for item in move_result["files_moved"]:
+        manifesto.append({
+            "tipo": tipo,
+            "inicio": inicio,
+            "fim": fim,
+            "arquivo": item["destination"],
+            "tamanho": os.path.getsize(item["destination"]) if os.path.exists(item["destination"]) else None,
+        })
+
+
+def _arquivos_da_solicitacao(files_manager: FilesManager, request: dict, baixado_em: float,
+                             outras_aguardando: bool) -> list:
+    """
+    Arquivos baixados que pertencem à solicitação.
+
+    Os SPED em texto são conferidos pelo |0000|. Os que não têm cabeçalho (ex: .zip) só são
+    atribuídos sem ambiguidade: criados depois do clique em baixar desta solicitação e sem
+    nenhuma outra clicada e ainda não entregue. Nos demais casos ficam na pasta, com aviso.
+
+    Args:
+        baixado_em: time.time() de antes do clique em baixar desta solicitação
+        outras_aguardando: Há outra solicitação do lote já clicada que ainda não chegou
+    """
+    inicio = _data(request["inicio"])
+    fim = _data(request["fim"])
+    arquivos = []
+    ambiguos = []
+
+    for path in list_downloaded_files(files_manager.source_folder):
+        header = read_sped_header(path)
+        if header is not None:
+            if header_matches(header, request["cnpj"], inicio, fim, request["tipo"]):
+                arquivos.append(path)
+            continue
+
+        try:
+            recente = os.path.getmtime(path) >= baixado_em
+        except OSError:
+            continue
+        if recente and not outras_aguardando:
+            arquivos.append(path)
+        elif recente:
+            ambiguos.append(path)
+
+    if ambiguos:
+        print(f"  ⚠ Arquivos sem cabeçalho SPED deixados em {files_manager.source_folder}: outras solicitações "
+              f"ainda podem entregá-los ({', '.join(os.path.basename(path) for path in ambiguos)})")
+
+    return arquivos
+
+
+def baixar_solicitacoes(rpa: RPA, empresa: dict, registry: RequestRegistry, files_manager: FilesManager,
+                        timings: StepTimings, pipeline: dict, indice: SpedIndex, manifesto: list = None) -> set:
+    """
+    Fase 2 do modo em duas fases: visita Ver pedidos e baixa as solicitações do lote.
+
+    As que não concluem dentro de pipeline["timeout_pronto"] (ainda em preparo no servidor)
+    são tentadas de novo nas rodadas seguintes, após pipeline["intervalo"] segundos.
+
+    Returns:
+        Pastas de destino que receberam arquivos
+    """
+    destinos = set()
+    rodadas = pipeline.get("rodadas", 3)
+    timeout = pipeline.get("timeout_pronto", 60)
+    intervalo = pipeline.get("intervalo", 30)
+
+    for rodada in range(rodadas):
+        pendentes = registry.pending()
+        if not pendentes:
+            break
+
+        if rodada:
+            print(f"  ⏱ {len(pendentes)} solicitações ainda em preparo; nova rodada em {intervalo}s")
+            time.sleep(intervalo)
+
+        print(f"\nBaixando {len(pendentes)} solicitações...")
+        rpa.open_requests_tab()
+
+        for request in sorted(pendentes, key=registry.row_index):
+            baixado_em = time.time()
+            with timings.measure(f"download.{request['tipo']}"):
+                result = rpa.download_request(registry.row_index(request), timeout=timeout)
+
+            outras_aguardando = any(other is not request and other["status"] == STATUS_NOT_READY
+                                    for other in registry.pending())
+            arquivos = _arquivos_da_solicitacao(files_manager, request, baixado_em, outras_aguardando)
+
+            if result != RPAResult.SUCCESS or not arquivos:
+                print(f"  ⏳ {request['tipo']} {request['inicio']} a {request['fim']} ainda não está pronta")
+                registry.mark(request, STATUS_NOT_READY)
+                continue
+
+            empresa_data = empresa.copy()
+            empresa_data['tipo'] = request['tipo']
+            empresa_data['periodo'] = request['fim'].split('/')[-1]
+
+            with timings.measure("mover"):
+                move_result = files_manager.move_files(data=empresa_data, file_paths=arquivos)
+
+            if move_result["success"]:
+                print(f"  ✅ {request['tipo']} {request['inicio']} a {request['fim']}: {move_result['message']}")
+            else:
+                print(f"  ❌ Erro ao mover arquivos do tipo {request['tipo']}: {move_result.get('error', 'Erro desconhecido')}")
+            _conferir_arquivos(indice, move_result, empresa, request['tipo'], request['inicio'], request['fim'])
+            _registrar_manifesto(manifesto, move_result, request['tipo'], request['inicio'], request['fim'])
+            if move_result["files_moved"]:
+                destinos.add(move_result["destination_path"])
+            registry.mark(request, STATUS_DOWNLOADED)
+
+    pendentes = registry.pending()
+    if pendentes:
+        raise Exception(f"Falha no download dos arquivos: {len(pendentes)} solicitações não ficaram prontas")
+
+    return destinos
+
+
+def executar_receitanetbx(empresa, first_time, rpa_config: RPAConfig = None, rpa: RPA = None,
+                          params: dict = None, keep_open: bool = False, manifesto: list = None):
+    """
+    Baixa os arquivos dos tipos habilitados de uma empresa.
+
+    Args:
+        empresa: Linha do dataset (cnpj, nome, ...)
+        first_time: True na primeira tentativa (for_each)
+        rpa_config: Configuração do RPA criado aqui, se rpa não for informado
+        rpa: Instância já aquecida (templates, pool, aplicação aberta) para reaproveitar
+        params: Parâmetros (types, period); padrão: params.json
+        keep_open: Manter o ReceitanetBX aberto ao terminar com sucesso, para a próxima empresa
+        manifesto: Lista que recebe os arquivos movidos (tipo, período, caminho e tamanho)
+    """
+    config = rpa_config or RPAConfig(
         confidence=0.9,  # Confidence baixo para encontrar e abrir a aplicação
         preview_mode=False,  # False para produção
-        images_folder="images"
+        images_folder="images",
+        window_title="ReceitanetBX"  # Limita capturas à janela da aplicação após abri-la
     )
 
-    rpa = RPA(config)
+    owns_rpa = rpa is None
+    rpa = rpa or RPA(config)
+    started = time.perf_counter()
+    resultado = "falha"
+    timings = StepTimings()
+    indice = None
     
     try:
-        json_manager = JSONManager()
-        tipos = json_manager.get_params().get("types")
+        params = params if params is not None else JSONManager().get_params()
+        tipos = params.get("types")
         tipos_habilitados = [key for key, value in tipos.items() if value is True]
         
         if not tipos_habilitados:
             print("❌ Nenhum tipo habilitado nos parâmetros para processamento.")
+            resultado = "sem_tipos"
             return "Unfinish"
         
-        init_result = rpa.init()
+        if not rpa.application_open:
+            with timings.measure("abertura"):
+                init_result = rpa.init()
 
-        if init_result != RPAResult.SUCCESS:
-            print(f"❌ Falha na inicialização: {init_result.value if init_result else 'Resultado nulo'}")
-            raise Exception(f"Falha na inicialização: {init_result.value}")
+            if init_result != RPAResult.SUCCESS:
+                print(f"❌ Falha na inicialização: {init_result.value if init_result else 'Resultado nulo'}")
+                rpa.dump_failure("inicializacao")
+                raise Exception(f"Falha na inicialização: {init_result.value}")
         
-        empresa_result = rpa.trocarPerfil(empresa['cnpj'], first_time=first_time)
+        with timings.measure("perfil"):
+            empresa_result = rpa.trocarPerfil(empresa['cnpj'], first_time=first_time)
 
         if empresa_result != RPAResult.SUCCESS:
             print(f"❌ Falha na seleção da empresa: {empresa_result.value if empresa_result else 'Resultado nulo'}")
+            rpa.dump_failure(f"perfil_{empresa['cnpj']}")
             raise Exception(f"Falha na seleção da empresa: {empresa_result.value}")
         
-        date_formatter = DateFormatter()
+        if rpa.needs_engine_calibration():
+            # Primeira execução nesta máquina com matching_engine="auto": calibra com a aplicação aberta
+            rpa.calibrate_matching_engines()
+        
+        files_manager = FilesManager()
+        
+        # Modo em duas fases (settings.json -> "pipeline": {"ativo": true, ...}): envia todas as
+        # solicitações da empresa e só depois baixa, enquanto o servidor prepara as anteriores
+        settings = JSONManager().get_settings()
+        pipeline = settings.get("pipeline") or {}
+        registry = None
+        if pipeline.get("ativo"):
+            registry = RequestRegistry()
+            registry.begin_batch()
+        
+        # Índice dos arquivos SPED baixados: confere cada arquivo movido e, com
+        # settings.json -> arquivos.incremental, pula períodos que já estão completos
+        indice = SpedIndex()
+        incremental = (settings.get("arquivos") or {}).get("incremental", False)
+        # Compactação das pastas de destino concluídas (settings.json -> arquivos.compactar)
+        packer = get_output_packer(settings)
         
         for tipo in tipos_habilitados:
             print(f"  📋 Processando tipo: {tipo}")
+            primeira_pesquisa = True
+            destinos = set()
 
-            files_manager = FilesManager()
-            
-            period = json_manager.get_params().get("period")
-            start_date_iso = period["start_date"]
-            end_date_iso = period["end_date"]
-            
-            from datetime import datetime
-            start_date_formatted = datetime.strptime(start_date_iso, "%Y-%m-%d").strftime("%d/%m/%Y")
-            end_date_formatted = datetime.strptime(end_date_iso, "%Y-%m-%d").strftime("%d/%m/%Y")
-
-            if tipo != "sped_fiscal":
-                range_dates = date_formatter.generate_monthly_start_dates(start_date_formatted, end_date_formatted, format_type="dd/mm/yyyy")
-            else:
-                yearly_dates = date_formatter.generate_yearly_start_dates(start_date_formatted, end_date_formatted, format_type="dd/mm/yyyy")
-                range_dates = [yearly_dates]
-
-            for i, year_dates in enumerate(range_dates):
-                is_first_iteration = (i == 0)
-                last_month_start = year_dates[year_dates.__len__() - 1]
-                
-                end_date = date_formatter.get_last_day_of_month(last_month_start, input_format="dd/mm/yyyy")
-
-                from datetime import datetime
-                data_atual = datetime.now().strftime("%d/%m/%Y")
-                end_date_dt = datetime.strptime(end_date, "%d/%m/%Y")
-                data_atual_dt = datetime.strptime(data_atual, "%d/%m/%Y")
+            for periodo in montar_periodos(tipo, params.get("period")):
+                start_date, end_date = periodo["inicio"], periodo["fim"]
 
-                if end_date_dt > data_atual_dt:
-                    end_date = data_atual
+                if incremental and indice.covered(empresa['cnpj'], tipo, _data(start_date), _data(end_date)):
+                    print(f"  ⏭️ {tipo} de {start_date} a {end_date} já baixado - pulando")
+                    continue
 
-                start_date = year_dates[0]
+                # A primeira pesquisa do tipo prepara o formulário, mesmo que períodos anteriores tenham sido pulados
+                is_first_iteration = primeira_pesquisa
+                primeira_pesquisa = False
 
                 if is_first_iteration:
                     print("[LOG] Checando se botão maximizar está visível...")
@@ -77,21 +274,25 @@ def executar_receitanetbx(empresa, first_time):
                         print("[LOG] Botão maximizar visível. Realizando double click.")
                         rpa._double_click_image("maximizar.png", "botoes")
                         time.sleep(1)  # Aguarda janela maximizar
+                        rpa.attach_window()  # A geometria da janela mudou
                     else:
                         print("[LOG] Botão maximizar NÃO está visível. Não será clicado.")
 
-                search_result = rpa.search(tipo=tipo, start_date=start_date, end_date=end_date, is_first_iteration=is_first_iteration)
+                with timings.measure(f"pesquisa.{tipo}"):
+                    search_result = rpa.search(tipo=tipo, start_date=start_date, end_date=end_date, is_first_iteration=is_first_iteration)
 
                 if search_result != RPAResult.SUCCESS:
                     print(f"❌ Falha na pesquisa do tipo {tipo}: {search_result.value if search_result else 'Resultado nulo'}")
+                    rpa.dump_failure(f"pesquisa_{tipo}")
                     continue
 
                 if tipo == "sped_fiscal":
                     range_dates = None
                 else:
-                    range_dates = year_dates
+                    range_dates = periodo["meses"]
 
-                request_result = rpa.select_dates(range_dates)
+                with timings.measure(f"selecao.{tipo}"):
+                    request_result = rpa.select_dates(range_dates)
 
                 if request_result != RPAResult.SUCCESS:
                     print(f"❌ Falha na solicitação dos arquivos para tipo {tipo}: {request_result.value if request_result else 'Resultado nulo'}")
@@ -102,7 +303,13 @@ def executar_receitanetbx(empresa, first_time):
 
                     raise Exception(f"Falha na solicitação dos arquivos: {request_result.value}")
                 
-                downloads_result = rpa.download_files()
+                if registry is not None:
+                    registry.add(empresa, tipo, periodo)
+                    print(f"  📨 Solicitação enviada: {tipo} de {start_date} a {end_date}")
+                    continue
+                
+                with timings.measure(f"download.{tipo}"):
+                    downloads_result = rpa.download_files()
 
                 if downloads_result != RPAResult.SUCCESS:
                     print(f"❌ Falha no download dos arquivos para tipo {tipo}: {downloads_result.value if downloads_result else 'Resultado nulo'}")
@@ -113,13 +320,44 @@ def executar_receitanetbx(empresa, first_time):
                 empresa_data = empresa.copy()
                 empresa_data['tipo'] = tipo
                 empresa_data['periodo'] = end_date.split('/')[-1]
-                move_result = files_manager.move_files(data=empresa_data)
+                with timings.measure("mover"):
+                    move_result = files_manager.move_files(data=empresa_data)
                 
                 if move_result["success"]:
                     print(f"  ✅ {move_result['message']}")
                 else:
                     print(f"  ❌ Erro ao mover arquivos do tipo {tipo}: {move_result.get('error', 'Erro desconhecido')}")
 
-            print(f"\n🎉 Arquivos tipo: {tipo} baixados com sucesso!")
+                _conferir_arquivos(indice, move_result, empresa, tipo, start_date, end_date)
+                _registrar_manifesto(manifesto, move_result, tipo, start_date, end_date)
+                if move_result["files_moved"]:
+                    destinos.add(move_result["destination_path"])
+
+            if registry is None:
+                print(f"\n🎉 Arquivos tipo: {tipo} baixados com sucesso!")
+                if packer is not None:
+                    for destino in destinos:
+                        packer.submit(destino)
+        
+        if registry is not None:
+            destinos = baixar_solicitacoes(rpa, empresa, registry, files_manager, timings, pipeline, indice, manifesto)
+            if packer is not None:
+                for destino in destinos:
+                    packer.submit(destino)
+        
+        resultado = "concluida"
     finally:
-        rpa.close()
+        # Após falha o estado da tela é desconhecido: fecha mesmo em modo keep_open
+        if not keep_open or resultado == "falha":
+            with timings.measure("fechamento"):
+                rpa.close()
+            rpa.application_open = False
+        timings.save()
+        if indice is not None:
+            indice.save()
+        if rpa.timeouts is not None:
+            rpa.timeouts.save()
+        if owns_rpa:
+            rpa.stop_recording()
+        metrics.COMPANIES.inc(resultado=resultado)
+        metrics.COMPANY_SECONDS.observe(time.perf_counter() - started)
@@ -0,0 +1,680 @@
+import argparse
+import base64
+import json
+import os
+import random
+import time
+import tkinter as tk
+from dataclasses import asdict, dataclass, fields
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+APP_TITLE = "ReceitanetBX"
+
+# Opção do combo de sistema -> (tipo usado pelo bot, imagem do combo com o sistema selecionado)
+SISTEMAS = {
+    "opcao_sped_contribuicoes.png": ("sped_contribuicoes", "combo_sistema_contribuicoes.png"),
+    "opcao_sped_fiscal.png": ("sped_fiscal", "combo_sistema_fiscal.png"),
+    "opcao_sped_ecf.png": ("sped_ecf", "combo_sistema_ecf.png"),
+    "opcao_sped_contabil.png": ("sped_contabil", "combo_sistema_contabil.png"),
+}
+
+# Cliques no mesmo ponto dentro deste intervalo são o segundo clique de um double click
+DOUBLE_CLICK_WINDOW = 0.35
+DOUBLE_CLICK_DISTANCE = 3
+
+ROW_HEIGHT = 28
+
+
+@dataclass
+class StandInConfig:
+    """Latências (segundos), injeção de falhas (probabilidades) e layout da aplicação simulada"""
+    pasta_origem: str = "arquivos_receitanetbx"
+    latencia_abertura: float = 1.0
+    latencia_login: float = 1.5
+    latencia_pesquisa: float = 2.0
+    latencia_solicitacao: float = 1.5
+    latencia_download_por_arquivo: float = 0.5
+    latencia_preparo: float = 0.0  # Tempo no servidor até o pedido poder ser baixado
+    variacao: float = 0.2  # Fração aleatória somada/subtraída de cada latência
+    falha_sem_resultados: float = 0.0
+    falha_nenhum_arquivo: float = 0.0
+    falha_procuracao: float = 0.0
+    falha_download: float = 0.0  # A fila de downloads trava e nunca conclui
+    tamanho_arquivo_kb: int = 64
+    linhas_visiveis: int = 8
+    manter_sessao: bool = True  # Ao reabrir, volta logado (o bot usa "Trocar perfil")
+    seed: Optional[int] = None
+    log_eventos: str = ""  # Arquivo JSON lines com os eventos, para medir cada etapa
+
+    @classmethod
+    def from_file(cls, path: str) -> "StandInConfig":
+        with open(path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        known = {field.name for field in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+
+def _months_between(start: date, end: date) -> List[date]:
+    months = []
+    current = date(start.year, start.month, 1)
+    while current <= end:
+        months.append(current)
+        current = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+    return months
+
+
+def _parse_date(digits: str) -> Optional[date]:
+    digits = "".join(char for char in digits if char.isdigit())
+    if len(digits) != 8:
+        return None
+    try:
+        return date(int(digits[4:]), int(digits[2:4]), int(digits[:2]))
+    except ValueError:
+        return None
+
+
+def _last_day(month: date) -> date:
+    following = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+    return date.fromordinal(following.toordinal() - 1)
+
+
+def sped_header(sistema: str, cnpj: str, nome: str, start: date, end: date) -> str:
+    """Registro |0000| no leiaute real do sistema (mesmas posições lidas por sped_files.LAYOUTS)"""
+    inicio, fim = start.strftime('%d%m%Y'), end.strftime('%d%m%Y')
+    if sistema == "sped_contabil":
+        return f"|0000|LECD|{inicio}|{fim}|{nome}|{cnpj}|SP||||0|0|0|0||0|G|||N|0|0||"
+    if sistema == "sped_ecf":
+        return f"|0000|LECF|0010|{cnpj}|{nome}|0|0||{inicio}|{inicio}|{fim}|N||1||"
+    if sistema == "sped_fiscal":
+        return f"|0000|017|0|{inicio}|{fim}|{nome}|{cnpj}||SP||3550308|||A|1|"
+    return f"|0000|006|0|||{inicio}|{fim}|{nome}|{cnpj}|SP|3550308||00|1|"
+
+
+def sped_content(sistema: str, cnpj: str, nome: str, start: date, end: date, size_kb: int) -> bytes:
+    """Arquivo no formato SPED (registros |REG|...| com |0000| no início e |9999| no fim)"""
+    lines = [
+        sped_header(sistema, cnpj, nome, start, end),
+        "|0001|0|",
+    ]
+    target = size_kb * 1024
+    size = sum(len(line) + 2 for line in lines)
+    counter = 0
+    while size < target:
+        line = f"|C100|0|1|{cnpj}|55|00|001|{counter:09d}||{start.strftime('%d%m%Y')}|{counter * 10:.2f}|"
+        lines.append(line)
+        size += len(line) + 2
+        counter += 1
+    lines.append(f"|9999|{len(lines) + 1}|")
+    return ("\r\n".join(lines) + "\r\n").encode("latin-1")
+
+
+class ReceitanetBXStandIn:
+    """
+    Aplicação local que imita as telas do ReceitanetBX usadas pelo bot, para testes ponta a ponta
+    headless (Xvfb) sem o serviço real.
+
+    As telas são montadas com os próprios templates de images/, desenhados pixel a pixel,
+    de modo que as buscas do RPA encontram os mesmos controles que na aplicação real:
+    ícone na área de trabalho, login/troca de perfil, combos, tabela de resultados com
+    uma linha por mês, modais e a fila de downloads, que grava arquivos SPED na pasta de
+    origem. Cada etapa tem latência configurável e falhas podem ser injetadas.
+    """
+
+    def __init__(self, config: StandInConfig, images_folder: str = "images"):
+        self.config = config
+        self.images_folder = images_folder
+        self.random = random.Random(config.seed)
+        self._log_file = open(config.log_eventos, "a", encoding="utf-8") if config.log_eventos else None
+
+        self.root = tk.Tk()
+        self.root.title("Área de trabalho")
+        self.screen_width = self.root.winfo_screenwidth()
+        self.screen_height = self.root.winfo_screenheight()
+        self.root.geometry(f"{self.screen_width}x{self.screen_height}+0+0")
+        self.desktop = tk.Canvas(self.root, bg="#3a6ea5", highlightthickness=0)
+        self.desktop.pack(fill="both", expand=True)
+        self.desktop.bind("<Button-1>", lambda event: self._on_click(self._desktop_hits, event))
+
+        self._sprites: Dict[str, tk.PhotoImage] = {}
+        self._sizes: Dict[str, Tuple[int, int]] = {}
+        self._desktop_hits: List[Tuple[int, int, int, int, Callable]] = []
+        self._app_hits: List[Tuple[int, int, int, int, Callable]] = []
+        self._last_click: Tuple[float, int, int] = (0.0, -100, -100)
+
+        self.window: Optional[tk.Toplevel] = None
+        self.canvas: Optional[tk.Canvas] = None
+        self.maximized = False
+        self.logged_in = False
+        self.pedidos: List[Dict] = []
+        self.download = None  # {"pedido", "pendentes", "travado"} enquanto a fila estiver ativa
+        self.download_concluido = False
+        self._reset_form()
+
+        self._draw_desktop()
+
+    # Recursos
+
+    def _sprite(self, relative_path: str) -> tk.PhotoImage:
+        """Template desenhado exatamente como o bot o carrega (BGR, sem alfa)"""
+        sprite = self._sprites.get(relative_path)
+        if sprite is None:
+            path = os.path.join(self.images_folder, relative_path)
+            image = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                raise ValueError(f"Não foi possível decodificar a imagem: {path}")
+            encoded = base64.b64encode(cv2.imencode(".png", image)[1].tobytes())
+            sprite = self._sprites[relative_path] = tk.PhotoImage(data=encoded)
+            self._sizes[relative_path] = (image.shape[1], image.shape[0])
+        return sprite
+
+    def _size(self, relative_path: str) -> Tuple[int, int]:
+        self._sprite(relative_path)
+        return self._sizes[relative_path]
+
+    def _latency(self, seconds: float) -> int:
+        jitter = 1 + self.random.uniform(-self.config.variacao, self.config.variacao)
+        return max(1, int(seconds * jitter * 1000))
+
+    def _log(self, event: str, **details) -> None:
+        if self._log_file is None:
+            return
+        self._log_file.write(json.dumps({"t": time.time(), "evento": event, **details}, ensure_ascii=False) + "\n")
+        self._log_file.flush()
+
+    # Entrada
+
+    def _on_click(self, hits: List[Tuple[int, int, int, int, Callable]], event) -> None:
+        now = time.monotonic()
+        last_time, last_x, last_y = self._last_click
+        self._last_click = (now, event.x_root, event.y_root)
+
+        # O segundo clique de um double click não aciona nada de novo
+        if now - last_time < DOUBLE_CLICK_WINDOW and abs(event.x_root - last_x) <= DOUBLE_CLICK_DISTANCE \
+                and abs(event.y_root - last_y) <= DOUBLE_CLICK_DISTANCE:
+            return
+
+        for x1, y1, x2, y2, action in reversed(hits):
+            if x1 <= event.x <= x2 and y1 <= event.y <= y2:
+                action()
+                self.render()
+                return
+
+    def _on_key(self, event) -> str:
+        key = event.keysym
+
+        if self.modal is not None:
+            if key in ("Return", "KP_Enter", "Escape"):
+                self._close_modal()
+                self.render()
+            return "break"
+
+        if key == "Escape":
+            self.screen = "principal" if self.logged_in else self.screen
+        elif key == "Tab":
+            self._next_field()
+        elif key == "Down" and self.screen == "acompanhamento" and self.pedido_selecionado is not None:
+            # Seta para baixo na lista de pedidos seleciona o próximo mais antigo
+            index = self.pedidos.index(self.pedido_selecionado)
+            self._select_request(self.pedidos[max(0, index - 1)])
+        elif key == "Down":
+            self.scroll = min(self.scroll + 1, max(0, len(self.rows) - self.config.linhas_visiveis))
+        elif key in ("Return", "KP_Enter", "space"):
+            if key == "space" and self.focus == "checkbox_periodo":
+                self.form["periodo_marcado"] = not self.form["periodo_marcado"]
+        elif event.char and (event.char.isdigit() or event.char in "/.-"):
+            if self.focus in self.fields:
+                self.fields[self.focus] += event.char
+
+        self.render()
+        return "break"
+
+    def _next_field(self) -> None:
+        order = ["checkbox_periodo", "tipo_periodo", "data_inicio", "data_fim", "pesquisar"]
+        if self.focus in order:
+            self.focus = order[(order.index(self.focus) + 1) % len(order)]
+        elif self.focus == "cnpj":
+            self.focus = "entrar"
+
+    # Estado
+
+    def _reset_form(self) -> None:
+        self.screen = "login"
+        self.modal: Optional[str] = None
+        self.dropdown: Optional[str] = None
+        self.focus: Optional[str] = None
+        self.fields = {"cnpj": "", "data_inicio": "", "data_fim": ""}
+        self.form = {"perfil": None, "tipo_doc": None, "certificado": None, "sistema": None,
+                     "combo_sistema": "combo_sistema.png", "arquivo": None, "pesquisa": None,
+                     "periodo_marcado": False}
+        self.rows: List[Dict] = []
+        self.scroll = 0
+        self.todos = False
+        self.selected_row: Optional[int] = None
+        self.loading: Optional[str] = None
+        self.tab_pedidos = False
+        self.pedido_selecionado: Optional[Dict] = None
+        self.arquivos_marcados = False
+
+    def _new_search_form(self) -> None:
+        cnpj, certificado = self.fields["cnpj"], self.form["certificado"]
+        self._reset_form()
+        self.fields["cnpj"], self.form["certificado"] = cnpj, certificado
+        self.screen = "pesquisa"
+
+    def _open_app(self) -> None:
+        if self.window is not None:
+            return
+        self._log("abrir")
+        self.loading = "abrindo"
+        self.root.after(self._latency(self.config.latencia_abertura), self._show_app)
+
+    def _show_app(self) -> None:
+        self.loading = None
+        self.window = tk.Toplevel(self.root)
+        self.window.title(APP_TITLE)
+        self.maximized = False
+        self.window.geometry(f"1024x720+{min(140, self.screen_width // 8)}+40")
+        self.window.protocol("WM_DELETE_WINDOW", self._close_app)
+        self.canvas = tk.Canvas(self.window, bg="#f0f0f0", highlightthickness=0)
+        self.canvas.pack(fill="both", expand=True)
+        self.canvas.bind("<Button-1>", lambda event: self._on_click(self._app_hits, event))
+        self.window.bind("<Key>", self._on_key)
+
+        self._reset_form()
+        if self.logged_in and self.config.manter_sessao:
+            self.screen = "principal"
+        else:
+            self.logged_in = False
+
+        self.window.focus_force()
+        self.canvas.focus_set()
+        self.render()
+
+    def _close_app(self) -> None:
+        if self.window is None:
+            return
+        self._log("fechar")
+        self.window.destroy()
+        self.window = None
+        self.canvas = None
+
+    def _maximize(self) -> None:
+        self.maximized = True
+        self.window.geometry(f"{self.screen_width}x{self.screen_height}+0+0")
+
+    def _show_modal(self, modal: str) -> None:
+        self.modal = modal
+        self.dropdown = None
+
+    def _close_modal(self) -> None:
+        modal, self.modal = self.modal, None
+        if modal in ("modais/modal_sem_resultados.png", "modais/modal_nao_existe_procuracao.png",
+                     "modais/modal_nenhum_arquivo_encontrado.png"):
+            self.rows = []
+        elif modal == "modais/modal_sucesso.png":
+            self.rows = []
+            self.todos = False
+
+    # Ações
+
+    def _select_option(self, dropdown: str, key: str, value: str) -> None:
+        self.form[key] = value
+        self.dropdown = None
+        if dropdown == "sistema":
+            self.form["sistema"], self.form["combo_sistema"] = SISTEMAS[value]
+        elif dropdown == "arquivo":
+            # A aplicação leva o foco para o período ao escolher o tipo de arquivo
+            self.focus = "data_inicio"
+
+    def _toggle_period(self) -> None:
+        self.form["periodo_marcado"] = not self.form["periodo_marcado"]
+        self.focus = "checkbox_periodo"
+
+    def _focus_dates(self) -> None:
+        # Campo com máscara: clicar seleciona o conteúdo e a digitação o substitui
+        self.fields["data_inicio"] = self.fields["data_fim"] = ""
+        self.focus = "data_inicio"
+
+    def _open_profile(self) -> None:
+        certificado = self.form["certificado"]
+        self._reset_form()
+        self.form["certificado"] = certificado
+        self.screen = "perfil"
+
+    def _toggle_dropdown(self, name: str) -> None:
+        self.dropdown = None if self.dropdown == name else name
+
+    def _login(self) -> None:
+        cnpj = "".join(char for char in self.fields["cnpj"] if char.isdigit())
+        if self.form["certificado"] is None or self.form["perfil"] != "procurador" or len(cnpj) != 14:
+            self._log("login_recusado", cnpj=cnpj)
+            return
+
+        self.loading = "login"
+
+        def done():
+            self.loading = None
+            self.logged_in = True
+            self.screen = "principal"
+            self._log("login", cnpj=cnpj)
+            self.render()
+
+        self.root.after(self._latency(self.config.latencia_login), done)
+
+    def _search(self) -> None:
+        start = _parse_date(self.fields["data_inicio"])
+        end = _parse_date(self.fields["data_fim"])
+        sistema = self.form["sistema"]
+        self._log("pesquisa", sistema=sistema, inicio=self.fields["data_inicio"], fim=self.fields["data_fim"])
+        self.loading = "pesquisa"
+
+        def done():
+            self.loading = None
+            roll = self.random.random()
+            if roll < self.config.falha_procuracao:
+                self._show_modal("modais/modal_nao_existe_procuracao.png")
+            elif roll < self.config.falha_procuracao + self.config.falha_sem_resultados or not (sistema and start and end) \
+                    or start > end:
+                self._show_modal("modais/modal_sem_resultados.png")
+            elif roll < self.config.falha_procuracao + self.config.falha_sem_resultados + self.config.falha_nenhum_arquivo:
+                self._show_modal("modais/modal_nenhum_arquivo_encontrado.png")
+            else:
+                self.rows = [
+                    {"mes": month, "fim": min(_last_day(month), end), "marcada": False}
+                    for month in _months_between(start, end)
+                ]
+                self.scroll = 0
+                self.selected_row = None
+            self._log("resultado_pesquisa", linhas=len(self.rows), modal=self.modal)
+            self.render()
+
+        self.root.after(self._latency(self.config.latencia_pesquisa), done)
+
+    def _click_row(self, index: int) -> None:
+        self.selected_row = index
+
+    def _check_row(self, index: int) -> None:
+        if index == self.selected_row:
+            self.rows[index]["marcada"] = not self.rows[index]["marcada"]
+
+    def _request_files(self) -> None:
+        months = [row for row in self.rows if row["marcada"] or self.todos]
+        if not months:
+            return
+
+        pedido = {
+            "id": len(self.pedidos) + 1,
+            "cnpj": "".join(char for char in self.fields["cnpj"] if char.isdigit()),
+            "sistema": self.form["sistema"],
+            "periodos": [(row["mes"], row["fim"]) for row in months],
+            "pronto_em": time.time() + self._latency(self.config.latencia_preparo) / 1000,
+        }
+        self.loading = "solicitacao"
+        self._log("solicitacao", pedido=pedido["id"], arquivos=len(months))
+
+        def done():
+            self.loading = None
+            self.pedidos.append(pedido)
+            if self.download is not None and self.download["travado"]:
+                # Uma nova solicitação libera a fila travada pela falha injetada
+                self.download = None
+            self.download_concluido = False
+            self._show_modal("modais/modal_sucesso.png")
+            self.render()
+
+        self.root.after(self._latency(self.config.latencia_solicitacao), done)
+
+    def _open_tracking(self) -> None:
+        self.screen = "acompanhamento"
+        self.dropdown = None
+        self.tab_pedidos = False
+        self.pedido_selecionado = None
+        self.arquivos_marcados = False
+
+    def _select_request(self, pedido: Dict) -> None:
+        # Os arquivos do pedido aparecem desmarcados a cada seleção
+        self.pedido_selecionado = pedido
+        self.arquivos_marcados = False
+
+    def _start_download(self) -> None:
+        if self.pedido_selecionado is None or not self.arquivos_marcados or self.download is not None:
+            return
+
+        pedido = self.pedido_selecionado
+        if time.time() < pedido["pronto_em"]:
+            # Ainda em preparo no servidor: o botão não faz nada
+            self.download_concluido = False
+            self._log("pedido_nao_pronto", pedido=pedido["id"])
+            return
+
+        self.download = {"pedido": pedido, "pendentes": list(pedido["periodos"]),
+                         "travado": self.random.random() < self.config.falha_download}
+        self.download_concluido = False
+        self._log("download_inicio", pedido=pedido["id"], arquivos=len(pedido["periodos"]), travado=self.download["travado"])
+        self.root.after(self._latency(self.config.latencia_download_por_arquivo), self._download_next)
+
+    def _download_next(self) -> None:
+        download = self.download
+        if download is None or download["travado"]:
+            return
+
+        pedido = download["pedido"]
+        start, end = download["pendentes"].pop(0)
+        os.makedirs(self.config.pasta_origem, exist_ok=True)
+
+        filename = f"{pedido['sistema']}-{pedido['cnpj']}-{start.strftime('%Y%m%d')}-{end.strftime('%Y%m%d')}-{pedido['id']}.txt"
+        path = os.path.join(self.config.pasta_origem, filename)
+        # Grava com outro nome e renomeia: quem move os arquivos nunca vê um arquivo pela metade
+        with open(f"{path}.part", "wb") as file:
+            file.write(sped_content(pedido["sistema"], pedido["cnpj"], f"EMPRESA {pedido['cnpj']}",
+                                    start, end, self.config.tamanho_arquivo_kb))
+        os.replace(f"{path}.part", path)
+
+        if download["pendentes"]:
+            self.root.after(self._latency(self.config.latencia_download_por_arquivo), self._download_next)
+        else:
+            self.download = None
+            self.download_concluido = True
+            self._log("download_fim", pedido=pedido["id"])
+        self.render()
+
+    # Desenho
+
+    def _draw(self, canvas: tk.Canvas, hits: list, relative_path: str, x: int, y: int,
+              action: Optional[Callable] = None) -> Tuple[int, int]:
+        canvas.create_image(x, y, image=self._sprite(relative_path), anchor="nw")
+        width, height = self._size(relative_path)
+        if action is not None:
+            hits.append((x, y, x + width, y + height, action))
+        return width, height
+
+    def _draw_desktop(self) -> None:
+        self.desktop.delete("all")
+        self._desktop_hits = []
+        self._draw(self.desktop, self._desktop_hits, "botoes/icon.png", 24, 24, self._open_app)
+
+    def render(self) -> None:
+        if self.canvas is None:
+            return
+
+        canvas, hits = self.canvas, []
+        canvas.delete("all")
+        width = self.window.winfo_width() if self.maximized else 1024
+
+        self._draw_toolbar(canvas, hits, width)
+
+        if self.loading:
+            canvas.create_text(40, 100, text="Aguarde...", anchor="nw", fill="#555555")
+        elif self.screen in ("login", "perfil"):
+            self._draw_login(canvas, hits)
+        elif self.screen == "pesquisa":
+            self._draw_search(canvas, hits)
+        elif self.screen == "acompanhamento":
+            self._draw_tracking(canvas, hits)
+
+        if self.modal is not None:
+            hits = self._draw_modal(canvas, hits)
+
+        self._app_hits = hits
+
+    def _draw_toolbar(self, canvas: tk.Canvas, hits: list, width: int) -> None:
+        canvas.create_rectangle(0, 0, width, 64, fill="#dde4ee", outline="")
+        if self.logged_in and self.screen != "login":
+            self._draw(canvas, hits, "botoes/icone_trocar_perfil.png", 8, 6, self._open_profile)
+            self._draw(canvas, hits, "botoes/lupa.png", 90, 16, self._new_search_form)
+            self._draw(canvas, hits, "botoes/acompanhamento.png", 140, 22, self._open_tracking)
+        if not self.maximized:
+            self._draw(canvas, hits, "botoes/maximizar.png", width - 80, 20, self._maximize)
+        self._draw(canvas, hits, "botoes/fechar.png", width - 48, 18, self._close_app)
+
+    def _draw_login(self, canvas: tk.Canvas, hits: list) -> None:
+        certificates = os.path.join(self.images_folder, "certificados")
+        y = 100
+        for filename in sorted(os.listdir(certificates)) if os.path.isdir(certificates) else []:
+            if filename.lower().endswith(".png"):
+                name = filename[:-4]
+                _, height = self._draw(canvas, hits, f"certificados/{filename}", 40, y,
+                                       lambda name=name: self.form.update(certificado=name))
+                if self.form["certificado"] == name:
+                    canvas.create_rectangle(36, y - 2, 44, y + height + 2, fill="#2a64b4", outline="")
+                y += height + 16
+
+        perfil_combo = {
+            None: "comboboxes/perfil/combo_perfil_contribuinte.png",
+            "contribuinte": "comboboxes/perfil/combo_perfil_contribuinte.png",
+            "procurador": "comboboxes/perfil/combo_perfil_procurador.png",
+            "receita_federal": "comboboxes/perfil/combo_perfil_receita_federal.png",
+        }[self.form["perfil"]]
+        self._draw(canvas, hits, perfil_combo, 400, 100, lambda: self._toggle_dropdown("perfil"))
+
+        self._draw(canvas, hits, "comboboxes/tipo_doc/combo_tipo_doc.png", 400, 240,
+                   lambda: self._toggle_dropdown("tipo_doc"))
+        self._draw(canvas, hits, "inputs/cnpj_input.png", 480, 240, lambda: setattr(self, "focus", "cnpj"))
+        canvas.create_text(480, 262, text=self.fields["cnpj"], anchor="nw")
+
+        button = "botoes/entrar.png" if self.screen == "login" else "botoes/trocar_perfil.png"
+        self._draw(canvas, hits, button, 400, 320, self._login)
+
+        if self.dropdown == "perfil":
+            for index, (option, value) in enumerate((("opcao_contribuinte.png", "contribuinte"),
+                                                      ("opcao_procurador.png", "procurador"),
+                                                      ("opcao_receita_federal.png", "receita_federal"))):
+                self._draw(canvas, hits, f"comboboxes/perfil/{option}", 400, 132 + index * 30,
+                           lambda value=value: self._select_option("perfil", "perfil", value))
+        elif self.dropdown == "tipo_doc":
+            self._draw(canvas, hits, "comboboxes/tipo_doc/opcao_cnpj.png", 400, 268,
+                       lambda: self._select_option("tipo_doc", "tipo_doc", "cnpj"))
+
+    def _draw_search(self, canvas: tk.Canvas, hits: list) -> None:
+        self._draw(canvas, hits, f"comboboxes/sistema/{self.form['combo_sistema']}", 40, 100,
+                   lambda: self._toggle_dropdown("sistema"))
+        self._draw(canvas, hits, "comboboxes/arquivo/combo_arquivo.png", 40, 250, lambda: self._toggle_dropdown("arquivo"))
+        self._draw(canvas, hits, "comboboxes/pesquisa/combo_pesquisa.png", 40, 380, lambda: self._toggle_dropdown("pesquisa"))
+        self._draw(canvas, hits, "checkboxes/checkbox.png", 40, 462, self._toggle_period)
+        self._draw(canvas, hits, "inputs/input_data_inicio.png", 100, 460, self._focus_dates)
+        canvas.create_text(100, 488, text=f"{self.fields['data_inicio']}  a  {self.fields['data_fim']}", anchor="nw")
+        self._draw(canvas, hits, "botoes/pesquisar.png", 420, 460, self._search)
+
+        if self.rows:
+            self._draw_results(canvas, hits)
+
+        if self.dropdown == "sistema":
+            for index, option in enumerate(SISTEMAS):
+                self._draw(canvas, hits, f"comboboxes/sistema/{option}", 40, 132 + index * 28,
+                           lambda option=option: self._select_option("sistema", "sistema_opcao", option))
+        elif self.dropdown == "arquivo":
+            for index, option in enumerate(("opcao_escrituracao.png", "opcao_escrituracao_fiscal_digital.png",
+                                            "opcao_escrituracao_contabil_digital.png")):
+                self._draw(canvas, hits, f"comboboxes/arquivo/{option}", 40, 280 + index * 26,
+                           lambda option=option: self._select_option("arquivo", "arquivo", option))
+        elif self.dropdown == "pesquisa":
+            self._draw(canvas, hits, "comboboxes/pesquisa/opcao_periodo_escrituracao.png", 40, 422,
+                       lambda: self._select_option("pesquisa", "pesquisa", "periodo"))
+
+    def _draw_results(self, canvas: tk.Canvas, hits: list) -> None:
+        left, top = 520, 100
+        self._draw(canvas, hits, "checkboxes/checkbox_todos.png", left, top, lambda: setattr(self, "todos", not self.todos))
+        self._draw(canvas, hits, "tabelas/coluna_transmissao.png", left + 40, top)
+        header_width, _ = self._draw(canvas, hits, "tabelas/coluna_data_inicio.png", left + 180, top)
+        column_center = left + 180 + header_width // 2
+
+        visible = self.rows[self.scroll:self.scroll + self.config.linhas_visiveis]
+        for offset, row in enumerate(visible):
+            index = self.scroll + offset
+            y = top + 40 + offset * ROW_HEIGHT
+            selected = index == self.selected_row or row["marcada"] or self.todos
+            if index == self.selected_row:
+                canvas.create_rectangle(left, y - 4, left + 360, y + ROW_HEIGHT - 6, fill="#cfe0f7", outline="")
+
+            checkbox = "checkboxes/checkbox_linha_selecionada.png" if selected else "checkboxes/checkbox.png"
+            self._draw(canvas, hits, checkbox, left + 4, y, lambda index=index: self._check_row(index))
+            canvas.create_text(left + 60, y + 2, text=row["mes"].strftime("%d/%m/%Y"), anchor="nw")
+
+            month_image = f"tabelas/01.{row['mes'].month:02d}.png"
+            month_width, _ = self._size(month_image)
+            self._draw(canvas, hits, month_image, column_center - month_width // 2, y,
+                       lambda index=index: self._click_row(index))
+
+        self._draw(canvas, hits, "botoes/solicitar_arquivos.png", left, top + 60 + self.config.linhas_visiveis * ROW_HEIGHT,
+                   self._request_files)
+
+    def _draw_tracking(self, canvas: tk.Canvas, hits: list) -> None:
+        self._draw(canvas, hits, "tabs/tab_ver_pedidos.png", 40, 100, lambda: setattr(self, "tab_pedidos", True))
+
+        if self.tab_pedidos:
+            for index, pedido in enumerate(reversed(self.pedidos[-6:])):
+                y = 140 + index * ROW_HEIGHT
+                if index == 0:
+                    self._draw(canvas, hits, "tabelas/ultima_solicitacao.png", 40, y,
+                               lambda pedido=pedido: self._select_request(pedido))
+                else:
+                    canvas.create_text(40, y, text=f"Pedido {pedido['id']}", anchor="nw")
+
+        if self.pedido_selecionado is not None:
+            self._draw(canvas, hits, "checkboxes/checkbox_todos.png", 400, 140,
+                       lambda: setattr(self, "arquivos_marcados", not self.arquivos_marcados))
+            for index, (start, _) in enumerate(self.pedido_selecionado["periodos"][:10]):
+                canvas.create_text(440, 176 + index * 20, text=f"{self.pedido_selecionado['sistema']} {start:%m/%Y}", anchor="nw")
+            self._draw(canvas, hits, "botoes/baixar.png", 700, 130, self._start_download)
+
+        if self.download is not None:
+            self._draw(canvas, hits, "botoes/baixando.png", 800, 130)
+        elif self.download_concluido:
+            self._draw(canvas, hits, "tabelas/fila_de_downloads.png", 700, 420)
+
+    def _draw_modal(self, canvas: tk.Canvas, hits: list) -> list:
+        # Com um modal aberto só o OK responde
+        modal_hits = []
+        width, height = self._size(self.modal)
+        x, y = 260, 220
+        canvas.create_rectangle(x - 12, y - 12, x + max(width, 110) + 12, y + height + 70, fill="#ffffff", outline="#888888")
+        self._draw(canvas, modal_hits, self.modal, x, y)
+        self._draw(canvas, modal_hits, "botoes/ok.png", x + (width - 110) // 2, y + height + 12, self._close_modal)
+        return modal_hits
+
+    def run(self) -> None:
+        print(f"✅ {APP_TITLE} simulado em execução (arquivos em {os.path.abspath(self.config.pasta_origem)})")
+        self.root.mainloop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ReceitanetBX simulado para testes ponta a ponta")
+    parser.add_argument("--config", help="JSON com os campos de StandInConfig")
+    parser.add_argument("--origem", help="Pasta onde os downloads são gravados")
+    parser.add_argument("--imagens", default="images", help="Pasta com os templates")
+    args = parser.parse_args()
+
+    config = StandInConfig.from_file(args.config) if args.config else StandInConfig()
+    if args.origem:
+        config.pasta_origem = args.origem
+
+    print(json.dumps(asdict(config), ensure_ascii=False, indent=2))
+    ReceitanetBXStandIn(config, args.imagens).run()
+
+
+if __name__ == "__main__":
+    main()
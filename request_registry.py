@@ -0,0 +1,68 @@
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from host_cache import HostCache
+
+STATUS_SUBMITTED = "enviada"
+STATUS_DOWNLOADED = "baixada"
+STATUS_NOT_READY = "nao_pronta"
+
+
+class RequestRegistry:
+    """
+    Solicitações feitas ao ReceitanetBX e ainda não baixadas, em cache/<hostname>/solicitacoes.json.
+
+    As solicitações de um lote (as de uma empresa, enviadas em sequência) guardam a ordem de
+    envio: na aba "Ver pedidos" a mais recente fica no topo, então a linha de cada uma é
+    quantas foram enviadas depois dela. Assim a fase de download chega à linha sem OCR.
+    O que sobra no arquivo ao fim da execução são solicitações que não ficaram prontas.
+    """
+
+    def __init__(self, cache: Optional[HostCache] = None):
+        self.cache = cache or HostCache("solicitacoes")
+        self.requests: List[Dict] = self.cache.load().get("solicitacoes", [])
+        self.batch = None
+        self.batch_size = 0
+
+    def begin_batch(self) -> str:
+        self.batch = uuid.uuid4().hex[:8]
+        self.batch_size = 0
+        return self.batch
+
+    def add(self, empresa: Dict, tipo: str, periodo: Dict) -> Dict:
+        request = {
+            "lote": self.batch,
+            "posicao": self.batch_size,
+            "cnpj": empresa["cnpj"],
+            "nome": empresa.get("nome", ""),
+            "tipo": tipo,
+            "inicio": periodo["inicio"],
+            "fim": periodo["fim"],
+            "enviada_em": datetime.now().isoformat(timespec="seconds"),
+            "status": STATUS_SUBMITTED,
+            "tentativas": 0,
+        }
+        self.batch_size += 1
+        self.requests.append(request)
+        self.save()
+        return request
+
+    def row_index(self, request: Dict) -> int:
+        """Linha na lista de pedidos, contando a partir da mais recente (0)"""
+        return self.batch_size - 1 - request["posicao"]
+
+    def pending(self) -> List[Dict]:
+        """Solicitações do lote atual ainda não baixadas"""
+        return [request for request in self.requests
+                if request["lote"] == self.batch and request["status"] != STATUS_DOWNLOADED]
+
+    def mark(self, request: Dict, status: str) -> None:
+        request["status"] = status
+        request["tentativas"] += status != STATUS_SUBMITTED
+        self.save()
+
+    def save(self) -> None:
+        # Baixadas saem do registro; o restante fica para consulta
+        self.requests = [request for request in self.requests if request["status"] != STATUS_DOWNLOADED]
+        self.cache.save({"solicitacoes": self.requests})
@@ -1,11 +1,36 @@
-import pyautogui as PyAutoGui
+try:
+    import pyautogui as PyAutoGui
+    PYAUTOGUI_ERROR = None
+except Exception as e:
+    # Sem servidor gráfico (ex: session_replay num servidor): só as buscas em capturas gravadas funcionam
+    PyAutoGui = None
+    PYAUTOGUI_ERROR = e
 import time
 import os
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from enum import Enum
 
 from json_manager import JSONManager
 from date_formatter import DateFormatter
+from image_matcher import DEFAULT_ENGINE, ImageMatcher, filter_by_band
+from matching_engines import calibrate_engines, create_engines
+from host_cache import HostCache
+from screen_capture import CapturedFrame, create_screen_capture
+from window_locator import find_window
+from matching_pool import MIN_TILED_AREA, get_matching_pool
+from template_atlas import open_atlas
+from scale_calibration import detect_scale
+from session_recorder import RecordingCapture, SessionRecorder
+from frame_ring import FrameRing, RingCapture
+from timeout_tuner import TimeoutTuner
+from cpu_governor import get_cpu_governor
+import metrics
+
+# Confidence mínimo aceito quando o confidence configurado não encontra a imagem
+FALLBACK_CONFIDENCE = 0.6
+
+# Rótulo de rpa_template_lookup_seconds para buscas de vários templates na mesma captura
+LOOKUP_BATCH_LABEL = "lote"
 
 class RPAResult(Enum):
     SUCCESS = "success"
@@ -21,28 +46,234 @@ class RPAConfig:
     startup_delay: int = 3
     images_folder: str = "images"
     preview_mode: bool = False
+    capture_backend: str = "pyautogui"  # "xshm" para captura via memória compartilhada no Linux/Xvfb
+    window_title: str = ""  # Se informado, limita capturas e buscas à janela com este título
+    matching_workers: int = 0  # Acima de 1, busca vários templates em paralelo num pool de processos
+    matching_engine: str = DEFAULT_ENGINE  # "opencv", "fft", "exact", "pyscreeze" ou "auto" (calibrado por template)
+    template_atlas: str = ""  # Atlas gerado por template_atlas.py (ex: "images.atlas"); vazio lê os PNG
+    scale_anchor: str = "botoes/icon.png"  # Template usado para detectar a escala da tela; vazio desativa
+    recording_folder: str = ""  # Se informado, grava capturas, buscas e entradas da sessão (ver session_replay.py)
+    poll_interval: float = 1.0  # Intervalo padrão (s) entre verificações ao esperar uma imagem
+    frame_ring_size: int = 0  # Últimas capturas mantidas em memória e gravadas só em caso de falha (ex: 8); 0 desativa
+    failure_folder: str = "falhas"  # Onde dump_failure() grava as capturas do anel
+    adaptive_timeouts: bool = True  # Timeout e intervalo de cada espera calibrados pelo histórico desta máquina
+    timeout_margin: float = 1.5  # Timeout calibrado = p99 das esperas × margem
+    cpu_budget: float = 0.0  # Núcleos por sessão para captura e busca (ex: 0.25); acima disso as esperas freiam; 0 desativa
 
 
 class RPA:
     def _is_image_visible(self, icon_filename: str = "icon.png", alias: str = "", confidence: float = None) -> bool:
         """Verifica se a imagem está visível na tela."""
         image_path = self._get_image_path(alias, icon_filename)
-        conf = confidence if confidence is not None else self.config.confidence
-        locations = self._find_all_image_locations(image_path, confidence=conf)
+        locations = self._find_all_image_locations(image_path, confidence=confidence)
         return bool(locations)
-    def __init__(self, config: RPAConfig = None):
+    def __init__(self, config: RPAConfig = None, screen_size: tuple = None):
+        if PyAutoGui is None and screen_size is None:
+            raise RuntimeError(
+                f"pyautogui indisponível ({PYAUTOGUI_ERROR!r}): instale-o e rode numa sessão gráfica, "
+                "ou informe screen_size para usar o RPA só com capturas gravadas (session_replay)"
+            )
         self.config = config or RPAConfig()
+        self.screen_size = screen_size  # (largura, altura) fixos, ex: os da gravação no replay; None lê do pyautogui
         self.desktop_rpa = None
         self.last_click_y = None  # Controle de posição Y para filtros de coluna
+        self.last_click_box = None  # Box do último clique filtrado, usado como âncora
+        self.matcher = self._create_matcher()
+        self._scale_known = self._load_cached_scale()
+        self.screen = create_screen_capture(self.config.capture_backend)
+        self.window_region = None  # (left, top, width, height) da janela da aplicação nesta sessão
+        self._window_scope_enabled = False
+        self._last_window_lookup = 0.0
+        self.application_open = False  # ReceitanetBX aberto por esta instância (reaproveitado pelo daemon)
+        self.matching_pool = get_matching_pool(
+            self.config.matching_workers, self.config.template_atlas, self.config.images_folder
+        ) if self.config.matching_workers > 1 else None
+        self.frame_ring = None
+        if self.config.frame_ring_size > 0:
+            # Slots alocados no tamanho capturado (janela ou região), na primeira volta do anel
+            self.frame_ring = FrameRing(self.config.frame_ring_size)
+            self.screen = RingCapture(self.screen, self.frame_ring)
+        self.timeouts = TimeoutTuner(
+            self.config.timeout_margin, self.config.poll_interval
+        ) if self.config.adaptive_timeouts else None
+        self.governor = get_cpu_governor(self.config.cpu_budget) if self.config.cpu_budget > 0 else None
+        self.recorder = None
+        if self.config.recording_folder:
+            self.start_recording()
         self._setup_pyautogui()
     
+    def start_recording(self) -> SessionRecorder:
+        """Passa a gravar a sessão na pasta configurada (capturas, buscas de template e entradas)"""
+        self.recorder = SessionRecorder.in_folder(self.config.recording_folder or "gravacoes")
+        self.screen = RecordingCapture(self.screen, self.recorder)
+        self.recorder.record_meta(
+            config=asdict(self.config),
+            tela=list(self._screen_size()),
+            escala=self.matcher.scale,
+            motores=self.matcher.engine_by_template,
+        )
+        print(f"⏺ Gravando sessão em {self.recorder.path}")
+        return self.recorder
+    
+    def stop_recording(self) -> None:
+        if self.recorder is None:
+            return
+        self.recorder.close()
+        self.screen = self.screen.capture
+        self.recorder = None
+    
+    def dump_failure(self, reason: str) -> None:
+        """Grava em segundo plano as últimas capturas (FrameRing) para diagnosticar uma falha"""
+        if self.frame_ring is None:
+            return
+        target = self.frame_ring.dump(self.config.failure_folder, reason)
+        if target:
+            print(f"📸 Capturas da falha em {target}")
+    
+    def _click(self, point) -> None:
+        if self.recorder is not None:
+            self.recorder.record_input("click", x=int(point[0]), y=int(point[1]))
+        PyAutoGui.click(point)
+    
+    def _double_click(self, point) -> None:
+        if self.recorder is not None:
+            self.recorder.record_input("double_click", x=int(point[0]), y=int(point[1]))
+        PyAutoGui.doubleClick(point, interval=self.config.double_click_interval)
+    
+    def _write(self, text: str, interval: float = 0.1) -> None:
+        if self.recorder is not None:
+            self.recorder.record_input("write", texto=text, intervalo=interval)
+        PyAutoGui.write(text, interval=interval)
+    
+    def _press(self, key: str, presses: int = 1, interval: float = 0.0) -> None:
+        if self.recorder is not None:
+            self.recorder.record_input("press", tecla=key, vezes=presses, intervalo=interval)
+        PyAutoGui.press(key, presses=presses, interval=interval)
+    
+    def _create_matcher(self) -> ImageMatcher:
+        auto = self.config.matching_engine == "auto"
+        matcher = ImageMatcher(
+            create_engines(),
+            default_engine=DEFAULT_ENGINE if auto else self.config.matching_engine,
+            atlas=open_atlas(self.config.template_atlas, self.config.images_folder),
+        )
+        
+        if auto:
+            # Caminhos relativos à pasta de imagens, para valer em qualquer diretório de trabalho
+            calibrated = HostCache("motores_de_busca").load().get("templates", {})
+            matcher.engine_by_template = {
+                self._get_image_path("", relative_path): entry["engine"]
+                for relative_path, entry in calibrated.items()
+            }
+            if not matcher.engine_by_template and matcher.atlas is not None:
+                # Máquina sem calibração: parte dos motores gravados no atlas
+                matcher.engine_by_template = {
+                    self._get_image_path("", key): entry["engine"]
+                    for key, entry in matcher.atlas.templates.items() if entry.get("engine") in matcher.engines
+                }
+        
+        return matcher
+    
+    def needs_engine_calibration(self) -> bool:
+        return self.config.matching_engine == "auto" and not self.matcher.engine_by_template
+    
+    def calibrate_matching_engines(self) -> dict:
+        """
+        Calibra o motor de busca mais rápido para cada template de images/ usando a tela atual.
+        
+        O resultado fica salvo por máquina (HostCache) e é carregado nas próximas sessões.
+        """
+        image_paths = []
+        for folder, _, files in os.walk(self.config.images_folder):
+            image_paths.extend(os.path.join(folder, filename) for filename in files if filename.lower().endswith(".png"))
+        
+        print(f"\n⏱ Calibrando motores de busca para {len(image_paths)} templates...")
+        report = calibrate_engines(self.matcher, image_paths, self._capture_screen().image)
+        
+        self.matcher.engine_by_template = {path: entry["engine"] for path, entry in report.items()}
+        HostCache("motores_de_busca").save({
+            "templates": {
+                os.path.relpath(path, self.config.images_folder): entry
+                for path, entry in report.items()
+            }
+        })
+        
+        chosen = {}
+        for entry in report.values():
+            chosen[entry["engine"]] = chosen.get(entry["engine"], 0) + 1
+        print(f"✅ Motores escolhidos: {chosen}")
+        
+        return report
+    
+    def _scale_cache_key(self) -> str:
+        width, height = self._screen_size()
+        return f"{width}x{height}"
+    
+    def _load_cached_scale(self) -> bool:
+        """Aplica a escala já detectada para esta máquina e resolução de tela, se houver"""
+        if not self.config.scale_anchor:
+            return True
+        
+        cached = HostCache("escala").load().get(self._scale_cache_key())
+        if cached is None:
+            return False
+        
+        self.matcher.set_scale(cached["escala"])
+        return True
+    
+    def calibrate_scale(self, haystack: CapturedFrame = None) -> float:
+        """
+        Detecta a escala da tela (DPI) procurando a âncora em várias escalas, uma única vez por máquina.
+        
+        A escala fica salva por resolução de tela e os templates passam a ser redimensionados
+        no carregamento, mantendo a busca em escala única. Sem a âncora visível, nada é salvo.
+        """
+        anchor_path = os.path.join(self.config.images_folder, self.config.scale_anchor)
+        if not self._validate_image_file(anchor_path):
+            print(f"⚠ Âncora de escala não encontrada: {anchor_path}")
+            return self.matcher.scale
+        
+        if haystack is None:
+            haystack = self.screen.grab(None)
+        else:
+            haystack = haystack.image
+        
+        scale, score = detect_scale(self.matcher, anchor_path, haystack)
+        
+        if scale is None:
+            print(f"⚠ Escala da tela não detectada (melhor score: {score:.2f}). Mantendo {self.matcher.scale}.")
+            return self.matcher.scale
+        
+        self.matcher.set_scale(scale)
+        self._scale_known = True
+        
+        cache = HostCache("escala")
+        data = cache.load()
+        data[self._scale_cache_key()] = {"escala": scale, "score": round(score, 4), "ancora": self.config.scale_anchor}
+        cache.save(data)
+        
+        print(f"✅ Escala da tela detectada: {scale} (score {score:.2f})")
+        return scale
+    
+    def _scaled(self, pixels: int) -> int:
+        """Converte uma distância medida nos templates para a escala da tela"""
+        return int(round(pixels * self.matcher.scale))
+    
+    def _screen_size(self) -> tuple:
+        if self.screen_size is not None:
+            return self.screen_size
+        return PyAutoGui.size()
+    
     def _setup_pyautogui(self) -> None:
+        if PyAutoGui is None:
+            return
         PyAutoGui.FAILSAFE = True
         PyAutoGui.PAUSE = 0.1
     
     def reset_click_position(self) -> None:
         """Reseta a posição Y do último clique para permitir nova busca desde o início"""
         self.last_click_y = None
+        self.last_click_box = None
     
     def set_confidence(self, confidence: float) -> None:
         """Altera o confidence dinamicamente durante a execução"""
@@ -57,23 +288,333 @@ class RPA:
     def _validate_image_file(self, image_path: str) -> bool:
         return os.path.exists(image_path)
     
-    def _find_all_image_locations(self, image_path: str, confidence: float = None) -> list:
+    def attach_window(self) -> bool:
+        """
+        Localiza a janela da aplicação (config.window_title) e passa a limitar as capturas a ela.
+        
+        Returns:
+            True se a janela foi encontrada
+        """
+        self._last_window_lookup = time.monotonic()
+        
+        if not self.config.window_title:
+            return False
+        
+        window = find_window(self.config.window_title)
+        
+        if window is None:
+            self.window_region = None
+            return False
+        
+        screen_width, screen_height = self._screen_size()
+        left, top = max(0, window.left), max(0, window.top)
+        right = min(screen_width, window.left + window.width)
+        bottom = min(screen_height, window.top + window.height)
+        
+        if right <= left or bottom <= top:
+            self.window_region = None
+            return False
+        
+        self.window_region = (left, top, right - left, bottom - top)
+        print(f"🪟 Janela '{window.title}' localizada em {self.window_region}")
+        return True
+    
+    def detach_window(self) -> None:
+        """Volta a capturar a área de trabalho inteira (ex: para localizar o ícone da aplicação)"""
+        self.window_region = None
+        self._window_scope_enabled = False
+    
+    def _current_window_region(self) -> tuple:
+        """
+        Região da janela da aplicação, localizada uma vez por sessão.
+        
+        Enquanto a janela não aparece, tenta novamente no máximo uma vez por segundo.
+        """
+        if not self._window_scope_enabled or not self.config.window_title:
+            return None
+        
+        if self.window_region is None and time.monotonic() - self._last_window_lookup >= 1.0:
+            self.attach_window()
+        
+        return self.window_region
+    
+    def _capture_screen(self, region: tuple = None) -> CapturedFrame:
+        """
+        Captura a região informada, a janela da aplicação ou a tela inteira, em BGR.
+        
+        O backend pode reaproveitar o mesmo buffer: a captura vale até a próxima chamada.
+        """
+        if region is None:
+            region = self._current_window_region()
+        
+        image = self.screen.grab(region)
+        # Parte da região fora da tela (ex: janela arrastada além da borda) não é capturada
+        region = self.screen.clip(region)
+        
+        if region is None:
+            return CapturedFrame(image)
+        return CapturedFrame(image, region[0], region[1])
+    
+    def _find_all_image_matches(self, image_path: str, min_confidence: float, haystack: CapturedFrame = None, region: tuple = None,
+                                reduction: float = 1.0) -> list:
+        """
+        Retorna todas as ocorrências com score >= min_confidence em uma única passada.
+        
+        Args:
+            image_path: Caminho da imagem
+            min_confidence: Menor score aceito
+            haystack: Captura já feita (opcional). Se None, captura a tela (ou a janela da aplicação)
+            region: (left, top, width, height) em coordenadas de tela para limitar a busca
+                    (padrão: a região esperada do template no atlas, se houver)
+            reduction: Fator de resolução da busca (CpuGovernor); 1.0 busca na resolução da tela
+        
+        Returns:
+            Lista de Match em coordenadas absolutas de tela
+        """
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        if region is None:
+            region = self._expected_region(image_path)
+        recorded_region = region
+        
+        if haystack is None:
+            haystack = self._capture_screen(region=region)
+            region = None
+        
+        image, origin_x, origin_y = haystack
+        
+        if region:
+            image, origin_x, origin_y = self._crop_to_region(image, origin_x, origin_y, region)
+        
+        if self._use_matching_pool(1, image):
+            matches = self.matching_pool.match_many(
+                [image_path], image, min_confidence, offset=(origin_x, origin_y),
+                engines={image_path: self.matcher.engine_for(image_path)}, scale=self.matcher.scale
+            )[image_path]
+        else:
+            self.matcher.set_reduction(reduction)
+            try:
+                matches = self.matcher.match(image_path, image, min_confidence, offset=(origin_x, origin_y))
+            finally:
+                self.matcher.set_reduction(1.0)
+        
+        elapsed = time.perf_counter() - started
+        self._record_lookup_metrics({image_path: matches}, elapsed)
+        if self.governor is not None:
+            self.governor.record(time.process_time() - cpu_started)
+        
+        if self.recorder is not None:
+            self.recorder.record_query([image_path], min_confidence, {image_path: matches},
+                                       elapsed, region=recorded_region)
+        
+        return matches
+    
+    def _use_matching_pool(self, template_count: int, image) -> bool:
+        """
+        Só compensa mandar a busca ao pool (IPC + cópia para a memória compartilhada) com vários
+        templates ou uma captura grande, dividida em faixas; o resto roda neste processo.
+        """
+        if self.matching_pool is None:
+            return False
+        return template_count > 1 or image.shape[0] * image.shape[1] >= MIN_TILED_AREA
+    
+    def _find_many_image_matches(self, image_paths: list, min_confidence: float, haystack: CapturedFrame = None,
+                                 reduction: float = 1.0) -> dict:
+        """
+        Procura vários templates sobre a mesma captura (em paralelo, se houver pool de matching).
+        Templates com região esperada no atlas são buscados só no recorte dela, neste processo.
+        
+        Args:
+            reduction: Fator de resolução da busca (CpuGovernor); o pool de matching busca sempre em 1.0
+        
+        Returns:
+            Dicionário caminho da imagem -> lista de Match em coordenadas absolutas de tela
+        """
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        
+        if haystack is None:
+            haystack = self._capture_screen()
+        
+        image, origin_x, origin_y = haystack
+        regions = {image_path: self._expected_region(image_path) for image_path in image_paths}
+        regional = {image_path: region for image_path, region in regions.items() if region is not None}
+        remaining = [image_path for image_path in image_paths if image_path not in regional]
+        results = {}
+        
+        if remaining and self._use_matching_pool(len(remaining), image):
+            engines = {image_path: self.matcher.engine_for(image_path) for image_path in remaining}
+            results.update(self.matching_pool.match_many(remaining, image, min_confidence, offset=(origin_x, origin_y),
+                                                         engines=engines, scale=self.matcher.scale))
+            remaining = []
+        
+        if remaining or regional:
+            # Converte a captura uma única vez para todos os templates
+            image = self.matcher.prepare(image)
+            
+            self.matcher.set_reduction(reduction)
+            try:
+                # Reduzida uma única vez para todos os templates
+                reduced = self.matcher.reduce_frame(image) if reduction != 1.0 and remaining else None
+                for image_path in remaining:
+                    results[image_path] = self.matcher.match(image_path, image, min_confidence,
+                                                             offset=(origin_x, origin_y), reduced_frame=reduced)
+                for image_path, region in regional.items():
+                    cropped, left, top = self._crop_to_region(image, origin_x, origin_y, region)
+                    results[image_path] = self.matcher.match(image_path, cropped, min_confidence, offset=(left, top))
+            finally:
+                self.matcher.set_reduction(1.0)
+        
+        results = {image_path: results[image_path] for image_path in image_paths}
+        
+        elapsed = time.perf_counter() - started
+        self._record_lookup_metrics(results, elapsed)
+        if self.governor is not None:
+            self.governor.record(time.process_time() - cpu_started)
+        
+        if self.recorder is not None:
+            self.recorder.record_query(image_paths, min_confidence, results, elapsed)
+        
+        return results
+    
+    def _template_label(self, image_path: str) -> str:
+        return os.path.relpath(image_path, self.config.images_folder).replace(os.sep, "/")
+    
+    def _record_lookup_metrics(self, results: dict, elapsed: float) -> None:
+        labels = [self._template_label(image_path) for image_path in results]
+        for label, matches in zip(labels, results.values()):
+            metrics.TEMPLATE_LOOKUPS.inc(template=label, resultado="hit" if matches else "miss")
+        metrics.TEMPLATE_LOOKUP_SECONDS.observe(elapsed, template=labels[0] if len(labels) == 1 else LOOKUP_BATCH_LABEL)
+    
+    @staticmethod
+    def _wait_key(alias: str, filename: str) -> str:
+        """Chave do template nas esperas (TimeoutTuner e métricas): alias/arquivo, como _template_label"""
+        return f"{alias}/{filename}" if alias else filename
+    
+    def _observe_wait(self, keys: list, seconds: float, found_key: str = None) -> None:
+        """
+        Uma série de rpa_wait_seconds por template. Numa espera por várias imagens conta só a
+        encontrada; no timeout, cada uma das esperadas.
+        """
+        if found_key is not None:
+            metrics.WAIT_SECONDS.observe(seconds, template=found_key, resultado="encontrada")
+            return
+        for key in keys:
+            metrics.WAIT_SECONDS.observe(seconds, template=key, resultado="timeout")
+    
+    def _atlas_info(self, image_path: str) -> dict:
+        info = self.matcher.atlas.info(image_path) if self.matcher.atlas is not None else None
+        return info or {}
+    
+    def _template_confidence(self, image_path: str) -> float:
+        """Confidence calibrado do template no atlas ou, sem ele, o configurado"""
+        confidence = self._atlas_info(image_path).get("confidence")
+        return confidence if confidence is not None else self.config.confidence
+    
+    def _search_confidence(self, image_paths: list) -> float:
+        """Menor score a pedir na busca para depois aplicar o confidence de cada template e o de fallback"""
+        return min([FALLBACK_CONFIDENCE] + [self._template_confidence(image_path) for image_path in image_paths])
+    
+    def _expected_region(self, image_path: str) -> tuple:
+        """
+        Região esperada do template no atlas, em coordenadas de tela (ou None).
+        
+        A região do atlas é relativa à janela da aplicação (ou à tela, sem janela) e medida
+        na escala dos templates.
+        """
+        region = self._atlas_info(image_path).get("regiao")
+        if not region:
+            return None
+        
+        left, top, width, height = (self._scaled(value) for value in region)
+        origin_x, origin_y = self.window_region[:2] if self.window_region is not None else (0, 0)
+        return (origin_x + left, origin_y + top, width, height)
+    
+    @staticmethod
+    def _crop_to_region(image, origin_x: int, origin_y: int, region: tuple) -> tuple:
+        """Recorta a captura à região (coordenadas de tela); retorna (imagem, origem x, origem y)"""
+        left = max(0, region[0] - origin_x)
+        top = max(0, region[1] - origin_y)
+        right = max(left, region[0] - origin_x + region[2])
+        bottom = max(top, region[1] - origin_y + region[3])
+        return image[top:bottom, left:right], origin_x + left, origin_y + top
+    
+    def _apply_confidence(self, matches: list, allow_fallback: bool = True, image_path: str = None) -> tuple:
+        """
+        Aplica o confidence do template (ver _template_confidence) e, se nada passar, o de
+        fallback sobre o mesmo resultado.
+        
+        Returns:
+            (ocorrências aceitas, True se foi necessário usar o confidence de fallback)
+        """
+        confidence = self._template_confidence(image_path) if image_path else self.config.confidence
+        primary = [match for match in matches if match.score >= confidence]
+        
+        if primary or not allow_fallback or confidence <= FALLBACK_CONFIDENCE:
+            return primary, False
+        
+        return [match for match in matches if match.score >= FALLBACK_CONFIDENCE], True
+    
+    def _find_all_image_locations(self, image_path: str, confidence: float = None, haystack=None) -> list:
         try:
-            conf = confidence if confidence is not None else self.config.confidence
-            locations = list(PyAutoGui.locateAllOnScreen(image_path, confidence=conf))
-            return locations
+            conf = confidence if confidence is not None else self._template_confidence(image_path)
+            return self._find_all_image_matches(image_path, conf, haystack=haystack)
         except Exception as e:
             print(f"Erro ao procurar imagem: {e}")
             return []
     
+    def _row_offset_box(self, anchor_box, margin: int = 4) -> tuple:
+        """
+        Caixa de deslocamento padrão: a mesma linha da âncora, em toda a largura da tela.
+        
+        O formato é (dx, dy, largura, altura), relativo ao canto superior esquerdo da âncora.
+        """
+        screen_width, _ = self._screen_size()
+        return (-anchor_box[0], -margin, screen_width, anchor_box[3] + 2 * margin)
+    
+    def _find_image_relative_to_anchor(self, image_path: str, anchor_box, offset_box: tuple = None, haystack=None, confidence: float = None) -> list:
+        """
+        Localiza uma imagem apenas dentro de uma caixa relativa a uma âncora já encontrada.
+        
+        Args:
+            image_path: Caminho da imagem alvo
+            anchor_box: Box (left, top, width, height) da âncora
+            offset_box: (dx, dy, largura, altura) relativo ao canto superior esquerdo da âncora.
+                        Se None, usa a mesma linha da âncora (ver _row_offset_box)
+            haystack: Captura onde a âncora foi encontrada. Se None, captura apenas a região
+            confidence: Confidence da busca (padrão: o do template, ver _template_confidence)
+        
+        Returns:
+            Lista de Box em coordenadas absolutas de tela
+        """
+        if offset_box is None:
+            offset_box = self._row_offset_box(anchor_box)
+        
+        screen_width, screen_height = self._screen_size()
+        left = max(0, anchor_box[0] + offset_box[0])
+        top = max(0, anchor_box[1] + offset_box[1])
+        right = min(screen_width, anchor_box[0] + offset_box[0] + offset_box[2])
+        bottom = min(screen_height, anchor_box[1] + offset_box[1] + offset_box[3])
+        
+        if right <= left or bottom <= top:
+            return []
+        
+        region = (left, top, right - left, bottom - top)
+        
+        try:
+            conf = confidence if confidence is not None else self._template_confidence(image_path)
+            return self._find_all_image_matches(image_path, conf, haystack=haystack, region=region)
+        except Exception as e:
+            print(f"Erro ao procurar imagem relativa à âncora: {e}")
+            return []
+    
     def _locate_and_double_click_image(self, image_path: str, description: str, silent: bool = False) -> RPAResult:
         try:
-            all_locations = self._find_all_image_locations(image_path)
+            matches = self._find_all_image_matches(image_path, self._search_confidence([image_path]))
+            all_locations, used_fallback = self._apply_confidence(matches, image_path=image_path)
             
-            if not all_locations and self.config.confidence > 0.6:
-                if not silent:
-                    print(f"⚠ Tentando com menor precisão para {description}...")
-                all_locations = self._find_all_image_locations(image_path, confidence=0.6)
+            if used_fallback and not silent:
+                print(f"⚠ Tentando com menor precisão para {description}...")
             
             if not all_locations:
                 if not silent:
@@ -84,7 +625,7 @@ class RPA:
                 location = all_locations[0]
                 center = PyAutoGui.center(location)
                 
-                PyAutoGui.doubleClick(center, interval=self.config.double_click_interval)
+                self._double_click(center)
                 return RPAResult.SUCCESS
             
             else:
@@ -97,7 +638,7 @@ class RPA:
                 location = all_locations[0]
                 center = PyAutoGui.center(location)
                 
-                PyAutoGui.doubleClick(center, interval=self.config.double_click_interval)
+                self._double_click(center)
                 return RPAResult.SUCCESS
                 
         except Exception as e:
@@ -107,12 +648,11 @@ class RPA:
 
     def _locate_and_single_click_image(self, image_path: str, description: str, silent: bool = False) -> RPAResult:
         try:
-            all_locations = self._find_all_image_locations(image_path)
+            matches = self._find_all_image_matches(image_path, self._search_confidence([image_path]))
+            all_locations, used_fallback = self._apply_confidence(matches, image_path=image_path)
             
-            if not all_locations and self.config.confidence > 0.6:
-                if not silent:
-                    print(f"⚠ Tentando com menor precisão para {description}...")
-                all_locations = self._find_all_image_locations(image_path, confidence=0.6)
+            if used_fallback and not silent:
+                print(f"⚠ Tentando com menor precisão para {description}...")
             
             if not all_locations:
                 if not silent:
@@ -123,7 +663,7 @@ class RPA:
                 location = all_locations[0]
                 center = PyAutoGui.center(location)
                 
-                PyAutoGui.click(center)
+                self._click(center)
                 return RPAResult.SUCCESS
             
             else:
@@ -136,7 +676,7 @@ class RPA:
                 location = all_locations[0]
                 center = PyAutoGui.center(location)
                 
-                PyAutoGui.click(center)
+                self._click(center)
                 return RPAResult.SUCCESS
                 
         except Exception as e:
@@ -144,44 +684,180 @@ class RPA:
                 print(f"✗ Erro ao tentar dar click único em {description}: {e}")
             return RPAResult.CLICK_FAILED
     
+    def _single_click_image_relative(self, image_filename: str, alias: str, anchor_box, offset_box: tuple = None, haystack=None, silent: bool = False) -> RPAResult:
+        """
+        Clica na imagem localizada dentro da caixa relativa à âncora (por padrão, a mesma linha).
+        
+        Evita uma nova busca em tela cheia e garante que o clique não caia em outra linha.
+        """
+        image_path = self._get_image_path(alias, image_filename)
+        
+        if not self._validate_image_file(image_path):
+            if not silent:
+                print(f"✗ Arquivo de imagem não encontrado: {image_path}")
+            return RPAResult.FILE_NOT_EXISTS
+        
+        if anchor_box is None:
+            if not silent:
+                print(f"✗ Nenhuma âncora disponível para localizar {image_filename}")
+            return RPAResult.IMAGE_NOT_FOUND
+        
+        try:
+            locations = self._find_image_relative_to_anchor(image_path, anchor_box, offset_box, haystack)
+            
+            if not locations:
+                if not silent:
+                    print(f"⚠ Imagem {image_filename} não encontrada junto à âncora {tuple(anchor_box)}")
+                return RPAResult.IMAGE_NOT_FOUND
+            
+            # Prioriza a ocorrência mais próxima verticalmente do centro da âncora
+            anchor_center = PyAutoGui.center(anchor_box)
+            location = min(locations, key=lambda box: abs(PyAutoGui.center(box).y - anchor_center.y))
+            
+            self._click(PyAutoGui.center(location))
+            return RPAResult.SUCCESS
+        
+        except Exception as e:
+            if not silent:
+                print(f"✗ Erro ao clicar em {image_filename} relativo à âncora: {e}")
+            return RPAResult.CLICK_FAILED
+    
     def _wait_with_countdown(self, seconds: int, message: str = "Iniciando...") -> None:
         for i in range(seconds, 0, -1):
             time.sleep(1)
 
-    def _wait_for_image(self, image_filename: str, alias: str = "", timeout: int = 30, check_interval: float = 1.0) -> RPAResult:
+    def _wait_settings(self, key: str, timeout: float, check_interval: float = None) -> tuple:
+        """Timeout e intervalo da espera: calibrados pelo histórico (TimeoutTuner) ou os informados"""
+        if self.timeouts is not None:
+            timeout, tuned_interval = self.timeouts.settings(key, timeout)
+            check_interval = check_interval or tuned_interval
+        return timeout, check_interval or self.config.poll_interval
+    
+    def _record_wait(self, key: str, seconds: float, found: bool) -> None:
+        if self.timeouts is not None:
+            self.timeouts.record(key, seconds, found)
+    
+    def _governed_poll(self, check_interval: float) -> tuple:
+        """Intervalo até a próxima verificação e fator de resolução, conforme o orçamento de CPU (CpuGovernor)"""
+        if self.governor is None:
+            return check_interval, 1.0
+        return self.governor.throttle(check_interval)
+    
+    def _governed_wait(self, timeout: float = None) -> None:
+        """Informa ao CpuGovernor o início (timeout) ou o fim (None) de uma espera: longas cedem CPU às críticas"""
+        if self.governor is None:
+            return
+        if timeout is None:
+            self.governor.end_wait()
+        else:
+            self.governor.begin_wait(timeout)
+    
+    def _wait_for_image(self, image_filename: str, alias: str = "", timeout: int = 30, check_interval: float = None,
+                        adaptive: bool = True) -> RPAResult:
+        """
+        Aguarda a imagem aparecer. Com adaptive_timeouts, timeout é só o valor usado enquanto
+        não há histórico da imagem nesta máquina (e a base do teto do valor calibrado).
+        
+        Args:
+            adaptive: False quando o timeout é uma regra do chamador e não um palpite (usa o valor exato)
+        """
+        wait_key = self._wait_key(alias, image_filename)
+        if adaptive:
+            timeout, check_interval = self._wait_settings(wait_key, timeout, check_interval)
+        else:
+            check_interval = check_interval or self.config.poll_interval
         image_path = self._get_image_path(alias, image_filename)
         
         if not self._validate_image_file(image_path):
             print(f"✗ Arquivo de imagem não encontrado: {image_path}")
             return RPAResult.FILE_NOT_EXISTS
         
-        elapsed_time = 0.0
+        started = time.perf_counter()
         tried_lower_confidence = False
+        self._governed_wait(timeout)
         
-        while elapsed_time < timeout:
+        while time.perf_counter() - started < timeout:
+            poll_interval, reduction = self._governed_poll(check_interval)
             try:
-                confidence_to_use = self.config.confidence
+                allow_fallback = time.perf_counter() - started > timeout / 2 and not tried_lower_confidence
                 
-                if elapsed_time > timeout / 2 and not tried_lower_confidence and self.config.confidence > 0.6:
-                    confidence_to_use = 0.6
-                    tried_lower_confidence = True
+                matches = self._find_all_image_matches(image_path, self._search_confidence([image_path]),
+                                                       reduction=reduction)
+                locations, used_fallback = self._apply_confidence(matches, allow_fallback=allow_fallback,
+                                                                  image_path=image_path)
+                tried_lower_confidence = tried_lower_confidence or used_fallback
                 
-                location = PyAutoGui.locateOnScreen(image_path, confidence=confidence_to_use)
-                
-                if location is not None:
-                    PyAutoGui.center(location)
+                if locations:
+                    self._observe_wait([wait_key], time.perf_counter() - started, found_key=wait_key)
+                    if adaptive:
+                        self._record_wait(wait_key, time.perf_counter() - started, True)
+                    self._governed_wait()
                     return RPAResult.SUCCESS
                 
-                time.sleep(check_interval)
-                elapsed_time += check_interval
+                time.sleep(poll_interval)
                 
             except Exception as e:
-                time.sleep(check_interval)
-                elapsed_time += check_interval
+                time.sleep(poll_interval)
         
-        print(f"✗ Timeout: Imagem {image_filename} não foi encontrada em {timeout} segundos")
+        self._governed_wait()
+        self._observe_wait([wait_key], time.perf_counter() - started)
+        if adaptive:
+            self._record_wait(wait_key, time.perf_counter() - started, False)
+        print(f"✗ Timeout: Imagem {image_filename} não foi encontrada em {timeout:.1f} segundos")
         return RPAResult.IMAGE_NOT_FOUND
     
+    def _wait_for_any_image(self, image_filenames: list, alias: str = "", timeout: int = 30, check_interval: float = None) -> tuple:
+        """
+        Aguarda até que qualquer uma das imagens apareça, verificando todas na mesma captura.
+        
+        Returns:
+            (RPAResult, nome da primeira imagem encontrada na ordem informada ou None)
+        """
+        keys = [self._wait_key(alias, filename) for filename in image_filenames]
+        wait_key = "|".join(keys)
+        timeout, check_interval = self._wait_settings(wait_key, timeout, check_interval)
+        image_paths = [self._get_image_path(alias, filename) for filename in image_filenames]
+        existing = [(filename, path) for filename, path in zip(image_filenames, image_paths) if self._validate_image_file(path)]
+        
+        if not existing:
+            print(f"✗ Nenhum arquivo de imagem encontrado: {', '.join(image_paths)}")
+            return RPAResult.FILE_NOT_EXISTS, None
+        
+        started = time.perf_counter()
+        tried_lower_confidence = False
+        self._governed_wait(timeout)
+        
+        while time.perf_counter() - started < timeout:
+            poll_interval, reduction = self._governed_poll(check_interval)
+            try:
+                allow_fallback = time.perf_counter() - started > timeout / 2 and not tried_lower_confidence
+                
+                matches_by_path = self._find_many_image_matches(
+                    [path for _, path in existing], self._search_confidence([path for _, path in existing]),
+                    reduction=reduction
+                )
+                
+                for filename, path in existing:
+                    locations, used_fallback = self._apply_confidence(matches_by_path[path], allow_fallback=allow_fallback,
+                                                                      image_path=path)
+                    tried_lower_confidence = tried_lower_confidence or used_fallback
+                    if locations:
+                        self._observe_wait(keys, time.perf_counter() - started, found_key=self._wait_key(alias, filename))
+                        self._record_wait(wait_key, time.perf_counter() - started, True)
+                        self._governed_wait()
+                        return RPAResult.SUCCESS, filename
+                
+            except Exception:
+                pass
+            
+            time.sleep(poll_interval)
+        
+        self._governed_wait()
+        self._observe_wait(keys, time.perf_counter() - started)
+        self._record_wait(wait_key, time.perf_counter() - started, False)
+        print(f"✗ Timeout: Nenhuma das imagens {', '.join(image_filenames)} foi encontrada em {timeout:.1f} segundos")
+        return RPAResult.IMAGE_NOT_FOUND, None
+    
     def _single_click_image(self, image_filename: str, alias: str = "", silent: bool = False) -> RPAResult:
         image_path = self._get_image_path(alias, image_filename)
 
@@ -227,30 +903,22 @@ class RPA:
         Tenta selecionar a primeira combinação encontrada entre combos e opções fornecidas.
         """
         for attempt in range(attempts):
-            combo_found = False
-            for combo_image in combo_images:
-                combo_result = self._wait_for_image(combo_image, alias, timeout=10)
-                if combo_result == RPAResult.SUCCESS:
-                    self._single_click_image(combo_image, alias)
-                    combo_found = True
-                    break
-            if not combo_found:
+            # Todos os combos são verificados na mesma captura, em vez de esperar 10s por cada um
+            combo_result, combo_image = self._wait_for_any_image(combo_images, alias, timeout=10)
+            if combo_result != RPAResult.SUCCESS:
                 if attempt < attempts - 1:
                     time.sleep(1)
                     continue
                 else:
                     return RPAResult.IMAGE_NOT_FOUND
+            self._single_click_image(combo_image, alias)
 
-            option_found = False
-            for option_image in option_images:
-                option_result = self._wait_for_image(option_image, alias, timeout=10)
-                if option_result == RPAResult.SUCCESS:
-                    click_result = self._single_click_image(option_image, alias)
-                    if click_result == RPAResult.SUCCESS:
-                        return RPAResult.SUCCESS
-                    option_found = True
-                    break
-            if not option_found and attempt < attempts - 1:
+            option_result, option_image = self._wait_for_any_image(option_images, alias, timeout=10)
+            if option_result == RPAResult.SUCCESS:
+                click_result = self._single_click_image(option_image, alias)
+                if click_result == RPAResult.SUCCESS:
+                    return RPAResult.SUCCESS
+            elif attempt < attempts - 1:
                 time.sleep(1)
         return RPAResult.IMAGE_NOT_FOUND
 
@@ -288,12 +956,24 @@ class RPA:
     
     def init(self) -> RPAResult:
         print("\nAbrindo o ReceitanetBX...")
+        # O ícone fica na área de trabalho, fora da janela da aplicação
+        self.detach_window()
         time.sleep(2)
+        
+        if not self._scale_known:
+            self.calibrate_scale()
+            # Sem a âncora visível mantém a escala atual até o fim da sessão, em vez de repetir
+            # a busca em várias escalas a cada empresa
+            self._scale_known = True
 
         wait_result = self._wait_for_image("icon.png", "botoes", timeout=10)
         
         if wait_result == RPAResult.SUCCESS:
-            return self._double_click_image("icon.png", "botoes")
+            result = self._double_click_image("icon.png", "botoes")
+            if result == RPAResult.SUCCESS:
+                self._window_scope_enabled = True
+                self.application_open = True
+            return result
         else:
             print(f"\n❌ ERRO: {wait_result.value}")
             return wait_result
@@ -316,6 +996,7 @@ class RPA:
             
             if result == RPAResult.SUCCESS:
                 print(f"✅ ReceitanetBX fechado usando: {button_file}")
+                self.application_open = False
                 return
         
         print("⚠ Não foi possível fechar o ReceitanetBX automaticamente")
@@ -347,7 +1028,7 @@ class RPA:
         self._selectOption("combo_tipo_doc.png", "opcao_cnpj.png", "comboboxes/tipo_doc")
         self._single_click_image("cnpj_input.png", "inputs")
         
-        PyAutoGui.write(cnpj, interval=0.1)
+        self._write(cnpj, interval=0.1)
 
         botao_entrar = self._wait_for_image("entrar.png", "botoes", timeout=5)
 
@@ -374,10 +1055,10 @@ class RPA:
 
         self._single_click_image("input_data_inicio.png", "inputs")
 
-        PyAutoGui.write(start_date, interval=0.1)
-        PyAutoGui.press("Tab")
-        PyAutoGui.write(end_date, interval=0.1)
-        PyAutoGui.press("Enter")
+        self._write(start_date, interval=0.1)
+        self._press("Tab")
+        self._write(end_date, interval=0.1)
+        self._press("Enter")
         
         self._single_click_image("pesquisar.png", "botoes")
 
@@ -391,66 +1072,56 @@ class RPA:
     def _dispatch_message_if_exists(self) -> RPAResult:
         time.sleep(5)
         
+        # Os três modais são verificados em uma única captura (em paralelo, se houver pool de matching)
+        modal_paths = {
+            filename: self._get_image_path("modais", filename)
+            for filename in ("modal_sem_resultados.png", "modal_nenhum_arquivo_encontrado.png", "modal_nao_existe_procuracao.png")
+        }
+        existing_paths = [path for path in modal_paths.values() if self._validate_image_file(path)]
+        
+        try:
+            found = self._find_many_image_matches(
+                existing_paths, min(self._template_confidence(path) for path in existing_paths)
+            ) if existing_paths else {}
+        except Exception:
+            # Ignora erros de localização de imagem, como antes
+            return RPAResult.SUCCESS
+        
+        def is_visible(filename: str) -> bool:
+            path = modal_paths[filename]
+            return any(match.score >= self._template_confidence(path) for match in found.get(path, []))
+        
         # Verifica modal_sem_resultados silenciosamente
-        image_path = self._get_image_path("modais", "modal_sem_resultados.png")
-        if self._validate_image_file(image_path):
-            try:
-                location = PyAutoGui.locateOnScreen(image_path, confidence=self.config.confidence)
-                if location is not None:
-                    message = "⚠ Nenhum arquivo foi encontrado para o critério de pesquisa solicitado."
-                    print(message)
-                    time.sleep(1)
-                    self._double_click_image("ok.png", "botoes", silent=True)
-                    PyAutoGui.press("Enter")
-                    # Lança exceção com mensagem "Unfinish" para o loop entender que deve pular
-                    raise Exception("Unfinish: " + message)
-            except Exception as e:
-                # Re-lança se for uma exceção Unfinish
-                if "Unfinish:" in str(e):
-                    raise e
-                # Ignora outros erros (como erros de localização de imagem)
-                pass
-
+        if is_visible("modal_sem_resultados.png"):
+            message = "⚠ Nenhum arquivo foi encontrado para o critério de pesquisa solicitado."
+            print(message)
+            time.sleep(1)
+            self._double_click_image("ok.png", "botoes", silent=True)
+            self._press("Enter")
+            # Lança exceção com mensagem "Unfinish" para o loop entender que deve pular
+            raise Exception("Unfinish: " + message)
+        
         # Verifica modal_nenhum_arquivo_encontrado silenciosamente
-        image_path = self._get_image_path("modais", "modal_nenhum_arquivo_encontrado.png")
-        if self._validate_image_file(image_path):
-            try:
-                location = PyAutoGui.locateOnScreen(image_path, confidence=self.config.confidence)
-                if location is not None:
-                    message = "⚠ Nenhum arquivo encontrado correspondente a busca."
-                    print(message)
-                    time.sleep(1)
-                    self._double_click_image("ok.png", "botoes", silent=True)
-                    self._double_click_image("fechar.png", "botoes", silent=True)
-                    # Lança exceção com mensagem "Unfinish" para o loop entender que deve pular
-                    raise Exception("Unfinish: " + message)
-            except Exception as e:
-                # Re-lança se for uma exceção Unfinish
-                if "Unfinish:" in str(e):
-                    raise e
-                # Ignora outros erros (como erros de localização de imagem)
-                pass
-
+        if is_visible("modal_nenhum_arquivo_encontrado.png"):
+            message = "⚠ Nenhum arquivo encontrado correspondente a busca."
+            print(message)
+            time.sleep(1)
+            self._double_click_image("ok.png", "botoes", silent=True)
+            self._double_click_image("fechar.png", "botoes", silent=True)
+            # Lança exceção com mensagem "Unfinish" para o loop entender que deve pular
+            raise Exception("Unfinish: " + message)
+        
         # Verifica modal de erro de procuração eletrônica
-        image_path = self._get_image_path("modais", "modal_nao_existe_procuracao.png")
-        if self._validate_image_file(image_path):
-            try:
-                location = PyAutoGui.locateOnScreen(image_path, confidence=self.config.confidence)
-                if location is not None:
-                    message = "❌ Erro de procuração eletrônica detectado. Tentando novamente..."
-                    print(message)
-                    time.sleep(5)
-                    self._double_click_image("ok.png", "botoes", silent=True)
-                    PyAutoGui.press("Enter")
-                    PyAutoGui.press("Esc")
-                    # Lança exceção para que o for_each_with_retry tente novamente
-                    raise Exception(f"Erro de procuração eletrônica: {message}")
-            except Exception as e:
-                # Se a exceção já foi nossa (do modal), re-lança para o retry
-                if "Erro de procuração eletrônica" in str(e):
-                    raise e
-                # Se foi erro ao detectar o modal, ignora
-                pass
+        if is_visible("modal_nao_existe_procuracao.png"):
+            message = "❌ Erro de procuração eletrônica detectado. Tentando novamente..."
+            print(message)
+            self.dump_failure("procuracao")
+            time.sleep(5)
+            self._double_click_image("ok.png", "botoes", silent=True)
+            self._press("Enter")
+            self._press("Esc")
+            # Lança exceção para que o for_each_with_retry tente novamente
+            raise Exception(f"Erro de procuração eletrônica: {message}")
                 
         return RPAResult.SUCCESS
         
@@ -463,7 +1134,7 @@ class RPA:
 
         self._single_click_image("checkbox.png", "checkboxes")
 
-        PyAutoGui.press("Tab", presses=2, interval=0.2)
+        self._press("Tab", presses=2, interval=0.2)
 
         json_manager = JSONManager()
         period = json_manager.get_params().get("period")
@@ -471,12 +1142,12 @@ class RPA:
         end_date = DateFormatter.iso_to_ddmmyyyy(period["end_date"])
 
         print(f"Período: {start_date} a {end_date}")
-        PyAutoGui.write(start_date, interval=0.1)
-        PyAutoGui.press("Tab")
-        PyAutoGui.write(end_date, interval=0.1)
+        self._write(start_date, interval=0.1)
+        self._press("Tab")
+        self._write(end_date, interval=0.1)
 
-        PyAutoGui.press("Tab")
-        PyAutoGui.press("Space")
+        self._press("Tab")
+        self._press("Space")
 
         self._single_click_image("pesquisar.png", "botoes")
 
@@ -500,10 +1171,10 @@ class RPA:
         end_date = DateFormatter.iso_to_ddmmyyyy(period["end_date"])
 
         print(f"Período: {start_date} a {end_date}")
-        PyAutoGui.write(start_date, interval=0.1)
-        PyAutoGui.press("Tab")
-        PyAutoGui.write(end_date, interval=0.1)
-        PyAutoGui.press("Enter")
+        self._write(start_date, interval=0.1)
+        self._press("Tab")
+        self._write(end_date, interval=0.1)
+        self._press("Enter")
 
         self._single_click_image("pesquisar.png", "botoes")
 
@@ -562,7 +1233,7 @@ class RPA:
         return RPAResult.IMAGE_NOT_FOUND
 
     def _single_click_image_filtered_by_column(self, image_filename: str, alias: str = "", silent: bool = False) -> RPAResult:
-        max_y_range = 36
+        max_y_range = self._scaled(36)
         
         column_image_path = self._get_image_path("tabelas", "coluna_data_inicio.png")
         column_image_path_cortada = self._get_image_path("tabelas", "coluna_data_inicio_cortada.png")
@@ -573,12 +1244,15 @@ class RPA:
             return RPAResult.FILE_NOT_EXISTS
         
         try:
-            column_locations = self._find_all_image_locations(column_image_path)
+            # Uma única captura serve para a coluna de referência e para a imagem alvo
+            screen = self._capture_screen()
+            
+            column_locations = self._find_all_image_locations(column_image_path, haystack=screen)
             
             if not column_locations and self._validate_image_file(column_image_path_cortada):
                 if not silent:
                     print("⚠ Coluna normal não encontrada, tentando versão cortada...")
-                column_locations = self._find_all_image_locations(column_image_path_cortada)
+                column_locations = self._find_all_image_locations(column_image_path_cortada, haystack=screen)
             
             if not column_locations:
                 if not silent:
@@ -586,8 +1260,8 @@ class RPA:
                 return RPAResult.IMAGE_NOT_FOUND
             
             column_center = PyAutoGui.center(column_locations[0])
-            min_x = column_center.x - 47
-            max_x = column_center.x + 47
+            min_x = column_center.x - self._scaled(47)
+            max_x = column_center.x + self._scaled(47)
             
             last_click_y = getattr(self, 'last_click_y', None)
             
@@ -609,68 +1283,44 @@ class RPA:
                     print(f"✗ Arquivo de imagem não encontrado: {image_path}")
                 return RPAResult.FILE_NOT_EXISTS
             
-            all_locations = self._find_all_image_locations(image_path)
+            all_locations = self._find_all_image_locations(image_path, haystack=screen)
             
             if not all_locations:
                 if not silent:
                     print(f"✗ Imagem {image_filename} não encontrada na tela")
                 return RPAResult.IMAGE_NOT_FOUND
             
-            valid_locations = []
-            for location in all_locations:
-                center = PyAutoGui.center(location)
-                x_valid = min_x <= center.x <= max_x
-                
-                if min_y is None and max_y is None:
-                    y_valid = True
-                else:
-                    y_valid = min_y <= center.y <= max_y
-                
-                if x_valid and y_valid:
-                    valid_locations.append((location, center))
+            # Um único filtro vetorizado com o range expandido; o range normal é um subconjunto dele
+            expanded_max_y = None if last_click_y is None else last_click_y + (max_y_range * 2)
+            valid_locations = filter_by_band(all_locations, min_x=min_x, max_x=max_x, min_y=min_y, max_y=expanded_max_y)
             
             if not valid_locations:
-                if min_y is not None and max_y is not None:
-                    if not silent:
-                        print(f"✗ Nenhuma ocorrência válida de {image_filename} encontrada no range Y: [{min_y} - {max_y}]")
-                        
-                        expanded_max_y = last_click_y + (max_y_range * 2)
-                        print(f"🔍 Tentando range expandido Y: [{min_y} - {expanded_max_y}]")
-                    
-                    expanded_valid_locations = []
-                    for location in all_locations:
-                        center = PyAutoGui.center(location)
-                        if (min_x <= center.x <= max_x and min_y <= center.y <= (last_click_y + (max_y_range * 2))):
-                            expanded_valid_locations.append((location, center))
-                    
-                    if not expanded_valid_locations:
-                        if not silent:
-                            print(f"✗ Nenhuma ocorrência encontrada mesmo com range expandido")
-                        return RPAResult.IMAGE_NOT_FOUND
+                if not silent:
+                    if min_y is not None:
+                        print(f"✗ Nenhuma ocorrência encontrada mesmo com range expandido Y: [{min_y} - {expanded_max_y}]")
                     else:
-                        valid_locations = expanded_valid_locations
-                        if not silent:
-                            print(f"✅ Encontrada ocorrência no range expandido")
-                else:
-                    if not silent:
                         print(f"✗ Nenhuma ocorrência válida de {image_filename} encontrada no range X")
-                    return RPAResult.IMAGE_NOT_FOUND
+                return RPAResult.IMAGE_NOT_FOUND
             
-            valid_locations.sort(key=lambda item: item[1].y)
+            if max_y is not None and PyAutoGui.center(valid_locations[0]).y > max_y and not silent:
+                print(f"✗ Nenhuma ocorrência válida de {image_filename} encontrada no range Y: [{min_y} - {max_y}]")
+                print(f"✅ Encontrada ocorrência no range expandido Y: [{min_y} - {expanded_max_y}]")
             
             if not silent:
                 print(f"LOCATIONS: {len(valid_locations)}")
                 print(f"VALID LOCATIONS: {valid_locations}")
             
-            selected_location, selected_center = valid_locations[0]
+            selected_location = valid_locations[0]
+            selected_center = PyAutoGui.center(selected_location)
             
             if not silent:
                 print(f"SELECTED LOCATION: {selected_location}, CENTER: {selected_center}")
                 print(f"✅ Clicando em {image_filename} na posição {selected_center}")
             
             self.last_click_y = selected_center.y
+            self.last_click_box = selected_location
             
-            PyAutoGui.click(selected_center)
+            self._click(selected_center)
             return RPAResult.SUCCESS
             
         except Exception as e:
@@ -706,13 +1356,14 @@ class RPA:
                 result = self._single_click_image_filtered_by_column(period_file, "tabelas", silent=True)
 
                 if result == RPAResult.SUCCESS:
-                    self._single_click_image("checkbox_linha_selecionada.png", "checkboxes")
+                    # A linha muda de aparência após o clique, então captura só a faixa da linha clicada
+                    self._single_click_image_relative("checkbox_linha_selecionada.png", "checkboxes", self.last_click_box)
                     dates_clicked += 1
                     print(f"    ✅ Data {date} clicada com sucesso.")
                     
                     if dates_clicked % 5 == 0:
                         for _ in range(15):
-                            PyAutoGui.press("down")
+                            self._press("down")
                             time.sleep(0.1)
                         
                         self.reset_click_position()
@@ -729,31 +1380,51 @@ class RPA:
 
         if confirm_result == RPAResult.SUCCESS:
             time.sleep(2)
-            PyAutoGui.press("enter")
+            self._press("enter")
             return RPAResult.SUCCESS
         else:
+            self.dump_failure(f"select_dates_{confirm_result.value}")
             return confirm_result
         
-    def download_files(self) -> RPAResult:
-        print("\nBaixando arquivos...")
-
+    def open_requests_tab(self) -> None:
+        """Abre Acompanhamento > Ver pedidos"""
         self._single_click_image("acompanhamento.png", "botoes")
         time.sleep(1)
 
         self._single_click_image("tab_ver_pedidos.png", "tabs")
         time.sleep(1)
 
+    def download_request(self, row_index: int = 0, timeout: int = None) -> RPAResult:
+        """
+        Baixa todos os arquivos de um pedido da aba Ver pedidos (já aberta).
+
+        Args:
+            row_index: Linha do pedido a partir do mais recente (0), alcançada com a seta para baixo
+            timeout: Espera exata pela conclusão da fila de downloads (pedidos ainda em preparo não
+                concluem); None usa o timeout calibrado pelo histórico, com base de 5 minutos
+        """
         self._single_click_image("ultima_solicitacao.png", "tabelas")
+        if row_index:
+            self._press("down", presses=row_index, interval=0.1)
         time.sleep(3)
         self._single_click_image("checkbox_todos.png", "checkboxes")
         time.sleep(3)
         self._single_click_image("baixar.png", "botoes")
 
-        downloads_concluidos = self._wait_for_image("fila_de_downloads.png", "tabelas", timeout=60 * 5)
+        if timeout is None:
+            return self._wait_for_image("fila_de_downloads.png", "tabelas", timeout=60 * 5)
+        return self._wait_for_image("fila_de_downloads.png", "tabelas", timeout=timeout, adaptive=False)
+
+    def download_files(self) -> RPAResult:
+        print("\nBaixando arquivos...")
+
+        self.open_requests_tab()
+        downloads_concluidos = self.download_request()
 
         if downloads_concluidos == RPAResult.SUCCESS:
             print("🎉 Todos os arquivos foram baixados com sucesso!")
             return RPAResult.SUCCESS
         else:
             print(f"❌ Falha no download dos arquivos: {downloads_concluidos.value}")
+            self.dump_failure(f"download_{downloads_concluidos.value}")
             return downloads_concluidos
@@ -0,0 +1,255 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Union
+
+from rpa import RPA, RPAResult
+
+_STOP = object()
+
+
+class _Lookup:
+    """Busca somente leitura: resolvida junto com as buscas vizinhas da fila, sobre a mesma captura"""
+
+    def __init__(self, future: Future, paths: List[str], confidence: float):
+        self.future = future
+        self.paths = paths
+        self.confidence = confidence
+
+
+class _Wait:
+    """Espera por uma ou mais imagens, reavaliada pela thread do executor a cada intervalo"""
+
+    def __init__(self, future: Future, filenames: List[str], paths: List[str], key: str, alias: str,
+                 timeout: float, interval: float, single: bool):
+        self.future = future
+        self.filenames = filenames
+        self.paths = paths
+        self.key = key
+        self.alias = alias
+        self.timeout = timeout
+        self.interval = interval
+        self.single = single
+        self.started = time.perf_counter()
+        self.next_due = self.started
+        self.tried_lower_confidence = False
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+class RPAExecutor:
+    """
+    Executor no estilo ator: uma única thread é dona do RPA (tela, mouse, teclado e estado
+    como confidence e last_click_y) e as demais threads enviam comandos e recebem Futures.
+
+    Os comandos rodam na ordem de envio. Buscas somente leitura (find) consecutivas na fila e
+    as esperas vencidas são resolvidas numa única captura; ações (clique, digitação) sempre
+    separam as capturas, já que mudam a tela. Uma espera não prende a thread: ela é
+    reavaliada a cada intervalo entre os demais comandos, então um observador de downloads
+    e um tratador de modais podem usar a tela ao mesmo tempo que o fluxo principal.
+
+    Exemplo:
+        executor = RPAExecutor(rpa)
+        modal = executor.wait_for("modal_sucesso.png", "modais", timeout=30)
+        executor.click("baixar.png", "botoes").result()
+        print(modal.result())
+        executor.shutdown()
+    """
+
+    def __init__(self, rpa: RPA):
+        self.rpa = rpa
+        self._commands: "queue.Queue" = queue.Queue()
+        self._waits: List[_Wait] = []
+        self._thread = threading.Thread(target=self._run, name="rpa-executor", daemon=True)
+        self._thread.start()
+
+    # Comandos
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """Executa qualquer método do RPA na thread dona da tela (ex: executor.submit(rpa.search, ...))"""
+        future = Future()
+        self._commands.put((future, func, args, kwargs))
+        return future
+
+    def find(self, image_filename: str, alias: str = "", confidence: float = None) -> Future:
+        """Future com as ocorrências (Match) da imagem na próxima captura; [] se o arquivo não existe"""
+        future = Future()
+        path = self.rpa._get_image_path(alias, image_filename)
+        self._commands.put(_Lookup(future, [path] if self.rpa._validate_image_file(path) else [], confidence))
+        return future
+
+    def wait_for(self, image_filename: str, alias: str = "", timeout: int = 30,
+                 check_interval: float = None) -> Future:
+        """Future com o RPAResult da espera (mesmas regras de RPA._wait_for_image)"""
+        return self._submit_wait([image_filename], alias, timeout, check_interval, single=True)
+
+    def wait_for_any(self, image_filenames: List[str], alias: str = "", timeout: int = 30,
+                     check_interval: float = None) -> Future:
+        """Future com (RPAResult, imagem encontrada ou None), como RPA._wait_for_any_image"""
+        return self._submit_wait(image_filenames, alias, timeout, check_interval, single=False)
+
+    def click(self, image_filename: str, alias: str = "", silent: bool = False) -> Future:
+        return self.submit(self.rpa._single_click_image, image_filename, alias, silent)
+
+    def double_click(self, image_filename: str, alias: str = "", silent: bool = False) -> Future:
+        return self.submit(self.rpa._double_click_image, image_filename, alias, silent)
+
+    def type(self, text: str, interval: float = 0.1) -> Future:
+        return self.submit(self.rpa._write, text, interval)
+
+    def press(self, key: str, presses: int = 1, interval: float = 0.0) -> Future:
+        return self.submit(self.rpa._press, key, presses, interval)
+
+    def set_confidence(self, confidence: float) -> Future:
+        return self.submit(self.rpa.set_confidence, confidence)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Executa os comandos já enviados, encerra as esperas pendentes com erro e termina a thread"""
+        self._commands.put(_STOP)
+        if wait:
+            self._thread.join()
+
+    def _submit_wait(self, image_filenames: List[str], alias: str, timeout: float,
+                     check_interval: Optional[float], single: bool) -> Future:
+        future = Future()
+        paths = [self.rpa._get_image_path(alias, filename) for filename in image_filenames]
+        existing = [(filename, path) for filename, path in zip(image_filenames, paths)
+                    if self.rpa._validate_image_file(path)]
+
+        if not existing:
+            print(f"✗ Nenhum arquivo de imagem encontrado: {', '.join(paths)}")
+            future.set_result(RPAResult.FILE_NOT_EXISTS if single else (RPAResult.FILE_NOT_EXISTS, None))
+            return future
+
+        key = "|".join(self.rpa._wait_key(alias, filename) for filename in image_filenames)
+        # Calibração e registro das esperas (TimeoutTuner) são lidos na thread do executor
+        self._commands.put((future, self._start_wait, (existing, key, alias, timeout, check_interval, single), {}))
+        return future
+
+    # Thread do executor
+
+    def _start_wait(self, existing: List, key: str, alias: str, timeout: float, check_interval: Optional[float],
+                    single: bool) -> _Wait:
+        timeout, interval = self.rpa._wait_settings(key, timeout, check_interval)
+        return _Wait(None, [filename for filename, _ in existing], [path for _, path in existing],
+                     key, alias, timeout, interval, single)
+
+    def _run(self) -> None:
+        while True:
+            commands = self._next_commands()
+            stop = _STOP in commands
+            commands = [command for command in commands if command is not _STOP]
+
+            due = [wait for wait in self._waits if wait.next_due <= time.perf_counter()]
+            batch: List[Union[_Lookup, _Wait]] = list(due)
+
+            for command in commands:
+                if isinstance(command, _Lookup):
+                    if command.future.set_running_or_notify_cancel():
+                        batch.append(command)
+                    continue
+
+                self._resolve(batch)
+                batch = []
+                self._execute(*command)
+
+            self._resolve(batch)
+
+            if stop:
+                for wait in self._waits:
+                    wait.future.set_exception(RuntimeError("RPAExecutor encerrado antes do fim da espera"))
+                self._waits = []
+                return
+
+    def _next_commands(self) -> List:
+        """Bloqueia até o próximo comando ou a próxima espera vencer; devolve tudo que estiver na fila"""
+        timeout = None
+        if self._waits:
+            timeout = max(0.0, min(wait.next_due for wait in self._waits) - time.perf_counter())
+
+        try:
+            commands = [self._commands.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+
+        while True:
+            try:
+                commands.append(self._commands.get_nowait())
+            except queue.Empty:
+                return commands
+
+    def _execute(self, future: Future, func: Callable, args: tuple, kwargs: Dict) -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            return
+
+        if isinstance(result, _Wait):
+            # A espera começa agora e é reavaliada pelo laço principal
+            result.future = future
+            self._waits.append(result)
+            self._resolve([result])
+        else:
+            future.set_result(result)
+
+    def _resolve(self, batch: List[Union[_Lookup, _Wait]]) -> None:
+        """Uma captura para todas as buscas e esperas do lote"""
+        batch = [item for item in batch if not item.future.done()]
+        if not batch:
+            return
+
+        paths = list(dict.fromkeys(path for item in batch for path in item.paths))
+        min_confidence = min([self.rpa._search_confidence(paths)] + [
+            item.confidence for item in batch if isinstance(item, _Lookup) and item.confidence is not None
+        ])
+
+        try:
+            matches_by_path = self.rpa._find_many_image_matches(paths, min_confidence) if paths else {}
+        except Exception as e:
+            # Esperas tentam de novo no próximo intervalo; buscas avulsas recebem o erro
+            matches_by_path = None
+            error = e
+
+        for item in batch:
+            if isinstance(item, _Wait):
+                self._check_wait(item, matches_by_path or {})
+            elif matches_by_path is None:
+                item.future.set_exception(error)
+            else:
+                item.future.set_result([
+                    match for path in item.paths for match in matches_by_path[path]
+                    if match.score >= (item.confidence if item.confidence is not None else self.rpa._template_confidence(path))
+                ])
+
+    def _check_wait(self, wait: _Wait, matches_by_path: Dict) -> None:
+        elapsed = wait.elapsed()
+        allow_fallback = elapsed > wait.timeout / 2 and not wait.tried_lower_confidence
+        found = None
+
+        for filename, path in zip(wait.filenames, wait.paths):
+            locations, used_fallback = self.rpa._apply_confidence(matches_by_path.get(path, []), allow_fallback=allow_fallback,
+                                                                  image_path=path)
+            wait.tried_lower_confidence = wait.tried_lower_confidence or used_fallback
+            if locations:
+                found = filename
+                break
+
+        if found is not None:
+            result = RPAResult.SUCCESS
+        elif elapsed + wait.interval >= wait.timeout:
+            result = RPAResult.IMAGE_NOT_FOUND
+            print(f"✗ Timeout: Nenhuma das imagens {', '.join(wait.filenames)} foi encontrada em {wait.timeout:.1f} segundos")
+        else:
+            wait.next_due = time.perf_counter() + wait.interval
+            return
+
+        self.rpa._observe_wait(wait.key.split("|"), elapsed,
+                               found_key=self.rpa._wait_key(wait.alias, found) if found is not None else None)
+        self.rpa._record_wait(wait.key, elapsed, found is not None)
+        self._waits.remove(wait)
+        wait.future.set_result(result if wait.single else (result, found))
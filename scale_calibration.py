@@ -0,0 +1,67 @@
+from typing import Iterable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from image_matcher import ImageMatcher, resize_template
+
+# Razões entre as escalas de exibição comuns do Windows (100%, 125%, 150%, 175%, 200%)
+SCALE_CANDIDATES = (0.5, 0.571, 0.6, 0.667, 0.714, 0.75, 0.8, 0.833, 0.857,
+                    1.0, 1.167, 1.2, 1.25, 1.4, 1.5, 1.6, 1.75, 2.0)
+
+# Score mínimo da âncora na escala escolhida
+MIN_ANCHOR_SCORE = 0.8
+
+# Quanto a escala detectada precisa superar a escala 1.0 para ser adotada
+MIN_SCORE_GAIN = 0.05
+
+
+def _best_score(frame: np.ndarray, template: np.ndarray) -> float:
+    if frame.shape[0] < template.shape[0] or frame.shape[1] < template.shape[1]:
+        return -1.0
+    return float(cv2.minMaxLoc(cv2.matchTemplate(frame, template, cv2.TM_CCOEFF_NORMED))[1])
+
+
+def detect_scale(matcher: ImageMatcher, anchor_path: str, frame: np.ndarray,
+                 candidates: Iterable[float] = SCALE_CANDIDATES, refine_step: float = 0.01,
+                 refine_span: float = 0.03) -> Tuple[Optional[float], float]:
+    """
+    Descobre a escala da tela em relação aos templates procurando a âncora em várias escalas.
+
+    Busca primeiro nas escalas comuns e depois refina em passos de `refine_step` ao redor
+    da melhor. Esta busca multiescala é feita uma única vez; depois a escala vai para o
+    ImageMatcher, que redimensiona os templates e segue com busca em escala única.
+
+    Args:
+        matcher: ImageMatcher usado para carregar e converter a âncora (na escala 1.0)
+        anchor_path: Template sempre visível no início da sessão (ex: images/botoes/icon.png)
+        frame: Captura da tela inteira em BGR
+        candidates: Escalas testadas na primeira passada
+
+    Returns:
+        (escala, score): escala None se a âncora não foi encontrada com segurança em nenhuma escala
+    """
+    template = matcher.load_template(anchor_path, scale=1.0)
+    frame = matcher.prepare(frame)
+
+    scores = {scale: _best_score(frame, resize_template(template, scale)) for scale in candidates}
+    best_scale = max(scores, key=scores.get)
+
+    steps = int(round(refine_span / refine_step))
+    for step in range(-steps, steps + 1):
+        scale = round(best_scale + step * refine_step, 3)
+        if scale > 0 and scale not in scores:
+            scores[scale] = _best_score(frame, resize_template(template, scale))
+
+    best_scale = max(scores, key=scores.get)
+    best_score = scores[best_scale]
+    unscaled_score = scores.get(1.0, _best_score(frame, template))
+
+    if best_score < MIN_ANCHOR_SCORE and unscaled_score < MIN_ANCHOR_SCORE:
+        return None, best_score
+
+    # Sem ganho claro, fica na escala original: evita trocar por ruído de interpolação
+    if best_scale != 1.0 and best_score < unscaled_score + MIN_SCORE_GAIN:
+        return 1.0, unscaled_score
+
+    return best_scale, best_score
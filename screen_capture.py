@@ -0,0 +1,313 @@
+import ctypes
+import ctypes.util
+import sys
+import weakref
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+try:
+    import pyautogui as PyAutoGui
+except Exception:
+    # Sem servidor gráfico (ex: session_replay num servidor)
+    PyAutoGui = None
+
+from image_matcher import ImageMatcher
+
+
+class CapturedFrame(NamedTuple):
+    """Captura em BGR junto com a posição do seu canto superior esquerdo na tela"""
+    image: np.ndarray
+    left: int = 0
+    top: int = 0
+
+
+class ScreenCapture:
+    """
+    Interface dos backends de captura de tela.
+
+    grab() devolve a captura em BGR (formato usado pelo ImageMatcher). Backends que
+    reaproveitam buffers podem devolver sempre o mesmo array: quem precisar guardar
+    a captura além da próxima chamada de grab() deve copiá-la.
+    """
+
+    name = "base"
+
+    def grab(self, region: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        raise NotImplementedError
+
+    def clip(self, region: Optional[Tuple[int, int, int, int]]) -> Optional[Tuple[int, int, int, int]]:
+        """Região que grab(region) realmente captura; a origem da captura é o canto dela"""
+        return region
+
+    def close(self) -> None:
+        pass
+
+
+class PyAutoGuiCapture(ScreenCapture):
+    """Captura via pyautogui/pyscreeze (uma nova imagem PIL por chamada)"""
+
+    name = "pyautogui"
+
+    def grab(self, region: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        return ImageMatcher.to_frame(PyAutoGui.screenshot(region=region))
+
+
+class _XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ("shmseg", ctypes.c_ulong),
+        ("shmid", ctypes.c_int),
+        ("shmaddr", ctypes.c_void_p),
+        ("readOnly", ctypes.c_int),
+    ]
+
+
+class _XImage(ctypes.Structure):
+    # Apenas os campos iniciais da struct XImage (Xlib.h), suficientes para ler o layout
+    _fields_ = [
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("xoffset", ctypes.c_int),
+        ("format", ctypes.c_int),
+        ("data", ctypes.c_void_p),
+        ("byte_order", ctypes.c_int),
+        ("bitmap_unit", ctypes.c_int),
+        ("bitmap_bit_order", ctypes.c_int),
+        ("bitmap_pad", ctypes.c_int),
+        ("depth", ctypes.c_int),
+        ("bytes_per_line", ctypes.c_int),
+        ("bits_per_pixel", ctypes.c_int),
+    ]
+
+
+_IPC_PRIVATE = 0
+_IPC_CREAT = 0o1000
+_IPC_RMID = 0
+_Z_PIXMAP = 2
+_ALL_PLANES = 0xFFFFFFFF
+
+
+class _ShmImage:
+    """Segmento de memória compartilhada com o servidor X e as views NumPy sobre ele"""
+
+    def __init__(self, owner: "XShmCapture", width: int, height: int):
+        # Guarda só as bibliotecas e o display (e não o dono) para não criar ciclo com o finalizer
+        self._x11, self._xext, self._libc = owner._x11, owner._xext, owner._libc
+        self._display, self._root = owner._display, owner._root
+        self.width = width
+        self.height = height
+        self.shminfo = _XShmSegmentInfo()
+
+        x11, xext, libc = self._x11, self._xext, self._libc
+
+        self.ximage = xext.XShmCreateImage(
+            owner._display, owner._visual, owner._depth, _Z_PIXMAP, None,
+            ctypes.byref(self.shminfo), width, height
+        )
+        if not self.ximage:
+            raise OSError("XShmCreateImage falhou")
+
+        image = self.ximage.contents
+        if image.bits_per_pixel != 32:
+            x11.XFree(self.ximage)
+            raise OSError(f"Profundidade de cor não suportada: {image.bits_per_pixel} bits por pixel")
+
+        size = image.bytes_per_line * height
+        self.shminfo.shmid = libc.shmget(_IPC_PRIVATE, size, _IPC_CREAT | 0o600)
+        if self.shminfo.shmid < 0:
+            x11.XFree(self.ximage)
+            raise OSError("shmget falhou")
+
+        address = libc.shmat(self.shminfo.shmid, None, 0)
+        if address in (None, ctypes.c_void_p(-1).value):
+            libc.shmctl(self.shminfo.shmid, _IPC_RMID, None)
+            x11.XFree(self.ximage)
+            raise OSError("shmat falhou")
+
+        self.shminfo.shmaddr = address
+        self.shminfo.readOnly = 0
+        image.data = address
+
+        if not xext.XShmAttach(owner._display, ctypes.byref(self.shminfo)):
+            libc.shmdt(ctypes.c_void_p(address))
+            libc.shmctl(self.shminfo.shmid, _IPC_RMID, None)
+            x11.XFree(self.ximage)
+            raise OSError("XShmAttach falhou")
+
+        x11.XSync(owner._display, 0)
+        # O segmento é removido assim que os dois lados se desanexarem
+        libc.shmctl(self.shminfo.shmid, _IPC_RMID, None)
+
+        raw = (ctypes.c_uint8 * size).from_address(address)
+        # BGRX direto da memória compartilhada, sem cópia
+        self.bgrx = np.ctypeslib.as_array(raw).reshape(height, image.bytes_per_line // 4, 4)[:, :width]
+        # Buffer BGR reaproveitado a cada captura, lido diretamente pelo matcher
+        self.bgr = np.empty((height, width, 3), dtype=np.uint8)
+
+    def grab(self, left: int, top: int) -> np.ndarray:
+        ok = self._xext.XShmGetImage(self._display, self._root, self.ximage, left, top, _ALL_PLANES)
+        if not ok:
+            raise OSError("XShmGetImage falhou")
+        cv2.cvtColor(self.bgrx, cv2.COLOR_BGRA2BGR, dst=self.bgr)
+        return self.bgr
+
+    def release(self) -> None:
+        self._xext.XShmDetach(self._display, ctypes.byref(self.shminfo))
+        self._x11.XSync(self._display, 0)
+        self._libc.shmdt(ctypes.c_void_p(self.shminfo.shmaddr))
+        # Os dados pertencem ao segmento compartilhado; XFree libera só a struct
+        self.ximage.contents.data = None
+        self._x11.XFree(self.ximage)
+
+
+class XShmCapture(ScreenCapture):
+    """
+    Captura no Linux/Xvfb via extensão MIT-SHM do X.
+
+    O servidor X escreve direto num segmento de memória compartilhada mapeado como
+    array NumPy, e a conversão para BGR reaproveita sempre o mesmo buffer. Mantém um
+    segmento por tamanho de região, para que capturas de linhas ou janelas também
+    não aloquem nada a cada chamada.
+    """
+
+    name = "xshm"
+    max_cached_sizes = 8
+
+    def __init__(self, display_name: Optional[str] = None):
+        if not sys.platform.startswith("linux"):
+            raise OSError("Captura MIT-SHM disponível apenas no Linux")
+
+        self._x11 = self._load_library("X11")
+        self._xext = self._load_library("Xext")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._declare_prototypes()
+
+        self._display = self._x11.XOpenDisplay(display_name.encode() if display_name else None)
+        if not self._display:
+            raise OSError("Não foi possível abrir o display X")
+
+        if not self._xext.XShmQueryExtension(self._display):
+            self._x11.XCloseDisplay(self._display)
+            raise OSError("Extensão MIT-SHM indisponível no servidor X")
+
+        screen = self._x11.XDefaultScreen(self._display)
+        self._root = self._x11.XRootWindow(self._display, screen)
+        self._visual = self._x11.XDefaultVisual(self._display, screen)
+        self._depth = self._x11.XDefaultDepth(self._display, screen)
+        self.width = self._x11.XDisplayWidth(self._display, screen)
+        self.height = self._x11.XDisplayHeight(self._display, screen)
+
+        self._images: Dict[Tuple[int, int], _ShmImage] = {}
+        self._finalizer = weakref.finalize(self, XShmCapture._release, self._x11, self._display, self._images)
+
+    @staticmethod
+    def _load_library(name: str):
+        path = ctypes.util.find_library(name)
+        if not path:
+            raise OSError(f"Biblioteca lib{name} não encontrada")
+        return ctypes.CDLL(path)
+
+    def _declare_prototypes(self) -> None:
+        x11, xext, libc = self._x11, self._xext, self._libc
+        vp, c_int, c_uint, c_ulong = ctypes.c_void_p, ctypes.c_int, ctypes.c_uint, ctypes.c_ulong
+        image_p = ctypes.POINTER(_XImage)
+        shminfo_p = ctypes.POINTER(_XShmSegmentInfo)
+
+        x11.XOpenDisplay.restype = vp
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x11.XCloseDisplay.argtypes = [vp]
+        x11.XDefaultScreen.argtypes = [vp]
+        x11.XRootWindow.restype = c_ulong
+        x11.XRootWindow.argtypes = [vp, c_int]
+        x11.XDefaultVisual.restype = vp
+        x11.XDefaultVisual.argtypes = [vp, c_int]
+        x11.XDefaultDepth.argtypes = [vp, c_int]
+        x11.XDisplayWidth.argtypes = [vp, c_int]
+        x11.XDisplayHeight.argtypes = [vp, c_int]
+        x11.XSync.argtypes = [vp, c_int]
+        x11.XFree.argtypes = [vp]
+
+        xext.XShmQueryExtension.argtypes = [vp]
+        xext.XShmCreateImage.restype = image_p
+        xext.XShmCreateImage.argtypes = [vp, vp, c_uint, c_int, ctypes.c_char_p, shminfo_p, c_uint, c_uint]
+        xext.XShmAttach.argtypes = [vp, shminfo_p]
+        xext.XShmDetach.argtypes = [vp, shminfo_p]
+        xext.XShmGetImage.argtypes = [vp, c_ulong, image_p, c_int, c_int, c_ulong]
+
+        libc.shmget.restype = c_int
+        libc.shmget.argtypes = [c_int, ctypes.c_size_t, c_int]
+        libc.shmat.restype = vp
+        libc.shmat.argtypes = [c_int, vp, c_int]
+        libc.shmdt.argtypes = [vp]
+        libc.shmctl.argtypes = [c_int, c_int, vp]
+
+    def _image_for(self, width: int, height: int) -> _ShmImage:
+        key = (width, height)
+        image = self._images.get(key)
+
+        if image is None:
+            if len(self._images) >= self.max_cached_sizes:
+                # Descarta o segmento mais antigo (dicts preservam a ordem de inserção)
+                oldest = next(iter(self._images))
+                self._images.pop(oldest).release()
+            image = _ShmImage(self, width, height)
+            self._images[key] = image
+
+        return image
+
+    def clip(self, region: Optional[Tuple[int, int, int, int]]) -> Optional[Tuple[int, int, int, int]]:
+        """Recorta a região à tela: o que fica à esquerda ou acima de 0 sai da largura e da altura"""
+        if region is None:
+            return None
+
+        left, top = int(region[0]), int(region[1])
+        right = min(left + int(region[2]), self.width)
+        bottom = min(top + int(region[3]), self.height)
+        left, top = max(0, left), max(0, top)
+        return left, top, max(0, right - left), max(0, bottom - top)
+
+    def grab(self, region: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        if region is None:
+            left, top, width, height = 0, 0, self.width, self.height
+        else:
+            left, top, width, height = self.clip(region)
+            if not width or not height:
+                return np.zeros((height, width, 3), dtype=np.uint8)
+
+        return self._image_for(width, height).grab(left, top)
+
+    @staticmethod
+    def _release(x11, display, images) -> None:
+        for image in images.values():
+            image.release()
+        images.clear()
+        x11.XCloseDisplay(display)
+
+    def close(self) -> None:
+        self._finalizer()
+
+
+CAPTURE_BACKENDS = {
+    PyAutoGuiCapture.name: PyAutoGuiCapture,
+    XShmCapture.name: XShmCapture,
+}
+
+
+def create_screen_capture(backend: str = "pyautogui") -> ScreenCapture:
+    """
+    Cria o backend de captura configurado, voltando para o pyautogui se ele não estiver disponível.
+
+    Args:
+        backend: "pyautogui" (padrão) ou "xshm" (Linux/Xvfb com MIT-SHM)
+    """
+    capture_class = CAPTURE_BACKENDS.get(backend)
+
+    if capture_class is None:
+        print(f"⚠ Backend de captura desconhecido: {backend}. Usando pyautogui.")
+        return PyAutoGuiCapture()
+
+    try:
+        return capture_class()
+    except OSError as e:
+        print(f"⚠ Backend de captura {backend} indisponível ({e}). Usando pyautogui.")
+        return PyAutoGuiCapture()
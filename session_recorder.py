@@ -0,0 +1,198 @@
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from screen_capture import ScreenCapture
+
+SESSION_MAGIC = b"RPASESS1"
+SESSION_EXTENSION = ".rpasession"
+
+RECORD_META = 0
+RECORD_FRAME = 1
+RECORD_QUERY = 2
+RECORD_INPUT = 3
+
+# tipo, segundos desde o início da sessão, tamanho do conteúdo comprimido
+_RECORD_HEADER = struct.Struct("<BdI")
+# modo, altura, largura, canais, left, top
+_FRAME_HEADER = struct.Struct("<BHHBii")
+
+FRAME_KEY = 0
+FRAME_DELTA = 1
+FRAME_REPEAT = 2
+
+
+class SessionRecorder:
+    """
+    Grava o que o bot viu e fez: capturas de tela, buscas de template e entradas de mouse/teclado.
+
+    Cada registro é comprimido com zlib e guarda o instante relativo ao início da sessão.
+    As capturas são gravadas como XOR em relação à anterior (quase tudo zero entre dois
+    polls da mesma tela), com um quadro completo a cada `keyframe_interval` capturas ou
+    quando o tamanho muda; capturas idênticas viram um registro sem pixels.
+    """
+
+    def __init__(self, path: str, keyframe_interval: int = 30, compression_level: int = 1):
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.compression_level = compression_level
+        self.frame_count = 0
+        self._previous: Optional[np.ndarray] = None
+        self._since_keyframe = 0
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._file = open(path, "wb")
+        self._file.write(SESSION_MAGIC)
+
+    @classmethod
+    def in_folder(cls, folder: str, prefix: str = "sessao", **kwargs) -> "SessionRecorder":
+        """Cria a gravação em um arquivo novo da pasta, nomeado pela data/hora e pelo processo"""
+        filename = f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}{SESSION_EXTENSION}"
+        return cls(os.path.join(folder, filename), **kwargs)
+
+    def _write(self, record_type: int, payload: bytes, level: Optional[int] = None) -> None:
+        data = zlib.compress(payload, self.compression_level if level is None else level)
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(_RECORD_HEADER.pack(record_type, time.perf_counter() - self._started, len(data)))
+            self._file.write(data)
+
+    def _write_json(self, record_type: int, content: Dict[str, Any]) -> None:
+        self._write(record_type, json.dumps(content, ensure_ascii=False, default=str).encode("utf-8"), level=6)
+
+    def record_meta(self, **content) -> None:
+        """Dados da sessão necessários para o replay (configuração, escala, motores por template)"""
+        self._write_json(RECORD_META, content)
+
+    def record_frame(self, image: np.ndarray, left: int = 0, top: int = 0) -> int:
+        """
+        Grava uma captura BGR e devolve o seu índice na sessão.
+
+        A captura é copiada para a comparação com a próxima, pois os backends reaproveitam buffers.
+        """
+        image = np.ascontiguousarray(image)
+        height, width = image.shape[:2]
+        channels = image.shape[2] if image.ndim == 3 else 1
+        previous = self._previous
+
+        if previous is not None and previous.shape == image.shape and self._since_keyframe < self.keyframe_interval:
+            if np.array_equal(previous, image):
+                mode, pixels = FRAME_REPEAT, b""
+            else:
+                mode, pixels = FRAME_DELTA, np.bitwise_xor(previous, image).tobytes()
+            self._since_keyframe += 1
+        else:
+            mode, pixels = FRAME_KEY, image.tobytes()
+            self._since_keyframe = 0
+
+        if mode != FRAME_REPEAT:
+            if previous is not None and previous.shape == image.shape:
+                np.copyto(previous, image)
+            else:
+                self._previous = image.copy()
+
+        self._write(RECORD_FRAME, _FRAME_HEADER.pack(mode, height, width, channels, int(left), int(top)) + pixels)
+        self.frame_count += 1
+        return self.frame_count - 1
+
+    def record_query(self, image_paths: List[str], min_confidence: float, results: Dict[str, list],
+                     elapsed: float, region: Optional[tuple] = None) -> None:
+        """Grava uma busca de templates sobre a última captura gravada, com o resultado e o tempo gasto"""
+        self._write_json(RECORD_QUERY, {
+            "frame": self.frame_count - 1,
+            "imagens": list(image_paths),
+            "min_confidence": min_confidence,
+            "regiao": list(region) if region else None,
+            "resultado": {path: [list(match) for match in matches] for path, matches in results.items()},
+            "ms": round(elapsed * 1000, 3),
+        })
+
+    def record_input(self, kind: str, **details) -> None:
+        """Grava uma entrada de mouse ou teclado (click, double_click, write, press)"""
+        self._write_json(RECORD_INPUT, {"tipo": kind, **details})
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class RecordingCapture(ScreenCapture):
+    """Backend de captura que repassa as capturas de outro backend para o SessionRecorder"""
+
+    def __init__(self, capture: ScreenCapture, recorder: SessionRecorder):
+        self.capture = capture
+        self.recorder = recorder
+        self.name = capture.name
+
+    def grab(self, region: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        image = self.capture.grab(region)
+        region = self.capture.clip(region)
+        left, top = (region[0], region[1]) if region else (0, 0)
+        self.recorder.record_frame(image, left, top)
+        return image
+
+    def clip(self, region: Optional[Tuple[int, int, int, int]]) -> Optional[Tuple[int, int, int, int]]:
+        return self.capture.clip(region)
+
+    def close(self) -> None:
+        self.capture.close()
+
+
+def read_session(path: str) -> Iterator[Tuple[int, float, Any]]:
+    """
+    Lê uma gravação registro a registro, reconstruindo as capturas.
+
+    Returns:
+        Iterador de (tipo, instante, conteúdo): para capturas o conteúdo é
+        (índice, imagem BGR, left, top); para os demais, o dicionário gravado
+    """
+    previous: Optional[np.ndarray] = None
+    frame_index = 0
+
+    with open(path, "rb") as file:
+        if file.read(len(SESSION_MAGIC)) != SESSION_MAGIC:
+            raise ValueError(f"Arquivo de sessão inválido: {path}")
+
+        while True:
+            header = file.read(_RECORD_HEADER.size)
+            if len(header) < _RECORD_HEADER.size:
+                # Fim do arquivo (ou gravação interrompida no meio de um registro)
+                return
+
+            record_type, timestamp, size = _RECORD_HEADER.unpack(header)
+            data = file.read(size)
+            if len(data) < size:
+                return
+            payload = zlib.decompress(data)
+
+            if record_type != RECORD_FRAME:
+                yield record_type, timestamp, json.loads(payload.decode("utf-8"))
+                continue
+
+            mode, height, width, channels, left, top = _FRAME_HEADER.unpack_from(payload)
+            shape = (height, width, channels) if channels > 1 else (height, width)
+
+            if mode == FRAME_KEY:
+                image = np.frombuffer(payload, dtype=np.uint8, offset=_FRAME_HEADER.size).reshape(shape).copy()
+            elif mode == FRAME_DELTA:
+                delta = np.frombuffer(payload, dtype=np.uint8, offset=_FRAME_HEADER.size).reshape(shape)
+                image = np.bitwise_xor(previous, delta)
+            else:
+                image = previous
+
+            previous = image
+            yield record_type, timestamp, (frame_index, image, left, top)
+            frame_index += 1
@@ -0,0 +1,119 @@
+import sys
+import time
+from typing import Dict, Optional
+
+from rpa import RPA, RPAConfig
+from screen_capture import CapturedFrame
+from session_recorder import RECORD_FRAME, RECORD_INPUT, RECORD_META, RECORD_QUERY, read_session
+
+
+def _same_matches(recorded: list, replayed: list, tolerance: int = 1) -> bool:
+    if len(recorded) != len(replayed):
+        return False
+    return all(
+        abs(expected[0] - actual.left) <= tolerance and abs(expected[1] - actual.top) <= tolerance
+        for expected, actual in zip(recorded, replayed)
+    )
+
+
+def replay_session(path: str, config: Optional[RPAConfig] = None, verbose: bool = False) -> Dict:
+    """
+    Reexecuta, sobre as capturas gravadas, todas as buscas de template de uma sessão.
+
+    As capturas fazem o papel da tela: cada busca roda pelo RPA contra a mesma imagem
+    que o bot viu, sem mouse nem teclado. O resultado é comparado com o gravado e os
+    tempos são somados por template, para medir otimizações e detectar regressões.
+
+    Args:
+        path: Arquivo .rpasession gerado com RPAConfig.recording_folder
+        config: Configuração do replay (padrão: a gravada, sem pool e sem nova gravação)
+        verbose: Mostrar cada busca divergente
+
+    Returns:
+        Relatório com contagens, divergências e tempos gravados x reexecutados por template
+    """
+    rpa = None
+    frame: Optional[CapturedFrame] = None
+    templates: Dict[str, Dict] = {}
+    report = {"capturas": 0, "buscas": 0, "divergencias": 0, "entradas": 0,
+              "ms_gravado": 0.0, "ms_replay": 0.0, "duracao_sessao": 0.0, "templates": templates}
+
+    for record_type, timestamp, content in read_session(path):
+        report["duracao_sessao"] = timestamp
+
+        if record_type == RECORD_META:
+            recorded = dict(content.get("config", {}))
+            # Sem pyautogui: a tela é a captura gravada e o tamanho dela vem da gravação
+            recorded.update(recording_folder="", matching_workers=0, scale_anchor="", frame_ring_size=0,
+                            capture_backend="pyautogui", cpu_budget=0)
+            screen_size = tuple(content["tela"]) if content.get("tela") else None
+            rpa = RPA(config or RPAConfig(**recorded), screen_size=screen_size)
+            rpa.matcher.set_scale(content.get("escala", 1.0))
+            rpa.matcher.engine_by_template.update(content.get("motores", {}))
+
+        elif record_type == RECORD_FRAME:
+            _, image, left, top = content
+            frame = CapturedFrame(image, left, top)
+            report["capturas"] += 1
+
+        elif record_type == RECORD_INPUT:
+            report["entradas"] += 1
+
+        elif record_type == RECORD_QUERY and rpa is not None and frame is not None:
+            image_paths = content["imagens"]
+            started = time.perf_counter()
+
+            if content["regiao"] or len(image_paths) == 1:
+                region = tuple(content["regiao"]) if content["regiao"] else None
+                results = {image_paths[0]: rpa._find_all_image_matches(
+                    image_paths[0], content["min_confidence"], haystack=frame, region=region)}
+            else:
+                results = rpa._find_many_image_matches(image_paths, content["min_confidence"], haystack=frame)
+
+            elapsed = (time.perf_counter() - started) * 1000
+            report["buscas"] += 1
+            report["ms_gravado"] += content["ms"]
+            report["ms_replay"] += elapsed
+
+            share = 1 / len(image_paths)
+            for image_path in image_paths:
+                stats = templates.setdefault(image_path, {"buscas": 0, "divergencias": 0,
+                                                          "ms_gravado": 0.0, "ms_replay": 0.0})
+                stats["buscas"] += 1
+                stats["ms_gravado"] += content["ms"] * share
+                stats["ms_replay"] += elapsed * share
+
+                if not _same_matches(content["resultado"].get(image_path, []), results.get(image_path, [])):
+                    stats["divergencias"] += 1
+                    report["divergencias"] += 1
+                    if verbose:
+                        print(f"✗ Divergência em {image_path} (captura {content['frame']}): "
+                              f"gravado {content['resultado'].get(image_path)} x replay {results.get(image_path)}")
+
+    return report
+
+
+def print_report(report: Dict, top: int = 10) -> None:
+    print(f"\n📼 Sessão de {report['duracao_sessao']:.1f}s: {report['capturas']} capturas, "
+          f"{report['buscas']} buscas, {report['entradas']} entradas")
+
+    if report["buscas"]:
+        print(f"⏱ Busca: {report['ms_gravado']:.0f} ms gravados x {report['ms_replay']:.0f} ms no replay")
+
+    if report["divergencias"]:
+        print(f"⚠ {report['divergencias']} resultados diferentes do gravado")
+    else:
+        print("✅ Todos os resultados iguais ao gravado")
+
+    slowest = sorted(report["templates"].items(), key=lambda item: item[1]["ms_replay"], reverse=True)[:top]
+    for image_path, stats in slowest:
+        print(f"  {image_path}: {stats['buscas']} buscas, {stats['ms_gravado']:.0f} ms gravados, "
+              f"{stats['ms_replay']:.0f} ms no replay, {stats['divergencias']} divergências")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python session_replay.py <arquivo.rpasession> [-v]")
+        sys.exit(1)
+
+    print_report(replay_session(sys.argv[1], verbose="-v" in sys.argv[2:]))
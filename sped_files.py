@@ -0,0 +1,116 @@
+import os
+from datetime import date
+from typing import List, NamedTuple, Optional
+
+HEADER_READ_SIZE = 4096  # O registro |0000| é a primeira linha do arquivo
+
+# Posição (após o REG) de DT_INI, DT_FIN, NOME e CNPJ no |0000| de cada leiaute, pelo tipo do bot
+LAYOUTS = {
+    # EFD ICMS/IPI: COD_VER|COD_FIN|DT_INI|DT_FIN|NOME|CNPJ|...
+    "sped_fiscal": (2, 3, 4, 5),
+    # EFD Contribuições: COD_VER|TIPO_ESCRIT|IND_SIT_ESP|NUM_REC_ANTERIOR|DT_INI|DT_FIN|NOME|CNPJ|...
+    "sped_contribuicoes": (4, 5, 6, 7),
+    # ECD: LECD|DT_INI|DT_FIN|NOME|CNPJ|...
+    "sped_contabil": (1, 2, 3, 4),
+    # ECF: LECF|COD_VER|CNPJ|NOME|IND_SIT_INI_PER|SIT_ESPECIAL|PAT_REMAN_CIS|DT_SIT_ESP|DT_INI|DT_FIN|...
+    "sped_ecf": (8, 9, 3, 2),
+}
+
+# Entregues por estabelecimento (EFD ICMS/IPI): cada filial tem o seu arquivo
+PER_ESTABLISHMENT = {"sped_fiscal"}
+
+
+class SpedHeader(NamedTuple):
+    cnpj: str
+    inicio: date
+    fim: date
+    nome: str
+    tipo: Optional[str]  # Tipo do bot correspondente ao leiaute (ver LAYOUTS)
+
+
+def _parse_date(field: str) -> Optional[date]:
+    if len(field) != 8 or not field.isdigit():
+        return None
+    try:
+        return date(int(field[4:]), int(field[2:4]), int(field[:2]))
+    except ValueError:
+        return None
+
+
+def _layout(fields: List[str]) -> str:
+    if fields[0] == "LECD":
+        return "sped_contabil"
+    if fields[0] == "LECF":
+        return "sped_ecf"
+    # As EFDs começam por COD_VER; só na EFD ICMS/IPI o terceiro campo já é a DT_INI
+    return "sped_fiscal" if len(fields) > 2 and _parse_date(fields[2]) else "sped_contribuicoes"
+
+
+def parse_header_line(line: str) -> Optional[SpedHeader]:
+    """
+    Interpreta o registro |0000| dos leiautes EFD ICMS/IPI, EFD Contribuições, ECD e ECF.
+
+    Os campos são lidos pela posição no leiaute identificado (a ECF, por exemplo, traz
+    DT_SIT_ESP antes de DT_INI); None se o registro não tiver datas e CNPJ válidos.
+    """
+    if not line.startswith("|0000|"):
+        return None
+
+    fields = line.strip().strip("|").split("|")[1:]
+    if not fields:
+        return None
+
+    tipo = _layout(fields)
+    positions = LAYOUTS[tipo]
+    if len(fields) <= max(positions):
+        return None
+
+    start_index, end_index, name_index, cnpj_index = positions
+    inicio = _parse_date(fields[start_index])
+    fim = _parse_date(fields[end_index])
+    cnpj = fields[cnpj_index]
+
+    if inicio is None or fim is None or len(cnpj) != 14 or not cnpj.isdigit():
+        return None
+
+    return SpedHeader(cnpj, inicio, fim, fields[name_index], tipo)
+
+
+def read_sped_header(path: str) -> Optional[SpedHeader]:
+    """Lê o |0000| do início do arquivo; None se não for um arquivo SPED em texto"""
+    try:
+        with open(path, "rb") as file:
+            chunk = file.read(HEADER_READ_SIZE)
+    except OSError:
+        return None
+
+    first_line = chunk.split(b"\n", 1)[0].decode("latin-1")
+    return parse_header_line(first_line)
+
+
+def company_key(cnpj: str, tipo: Optional[str]) -> str:
+    """
+    CNPJ que identifica a empresa do arquivo: completo nos leiautes entregues por estabelecimento
+    (a filial não é a matriz), raiz de 8 dígitos nos entregues pela empresa toda
+    """
+    return cnpj if tipo in PER_ESTABLISHMENT else cnpj[:8]
+
+
+def header_matches(header: SpedHeader, cnpj: str, inicio: date, fim: date, tipo: str = None) -> bool:
+    """Arquivo pertence à solicitação: mesma empresa (ver company_key), período dentro do solicitado"""
+    if header.tipo is not None and tipo is not None and header.tipo != tipo:
+        return False
+    layout = header.tipo or tipo
+    if company_key(header.cnpj, layout) != company_key(cnpj, layout):
+        return False
+    return inicio <= header.inicio and header.fim <= fim
+
+
+def list_downloaded_files(folder: str) -> List[str]:
+    """Arquivos completos na pasta de downloads (ignora os ainda sendo gravados)"""
+    if not os.path.isdir(folder):
+        return []
+    return [
+        os.path.join(folder, name) for name in sorted(os.listdir(folder))
+        if os.path.isfile(os.path.join(folder, name)) and not name.endswith((".part", ".tmp", ".crdownload"))
+    ]
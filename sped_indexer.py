@@ -0,0 +1,237 @@
+import argparse
+import mmap
+import os
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from host_cache import HostCache
+from sped_files import SpedHeader, company_key, header_matches, parse_header_line
+
+HEADER_SEARCH_LIMIT = 64 * 1024  # Onde procurar o fim da primeira linha
+TAIL_SIZE = 4096  # Bytes finais lidos para achar o |9999|
+
+
+def inspect_sped_file(path: str) -> Tuple[Optional[SpedHeader], bool]:
+    """
+    Lê só o |0000| e o fim do arquivo por mmap, sem carregar o arquivo (ECD/EFD podem ter GBs).
+
+    Returns:
+        (cabeçalho ou None se não for SPED em texto, True se o arquivo termina no registro |9999|)
+    """
+    with open(path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            return None, False
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            line_end = mapped.find(b"\n", 0, min(size, HEADER_SEARCH_LIMIT))
+            first_line = mapped[:line_end if line_end != -1 else min(size, HEADER_SEARCH_LIMIT)]
+            header = parse_header_line(first_line.decode("latin-1"))
+            if header is None:
+                return None, False
+
+            tail = mapped[max(0, size - TAIL_SIZE):].rstrip(b"\r\n")
+            last_line = tail[tail.rfind(b"\n") + 1:]
+            return header, last_line.startswith(b"|9999|")
+
+
+def _months(start: date, end: date) -> List[date]:
+    months = []
+    current = date(start.year, start.month, 1)
+    while current <= end:
+        months.append(current)
+        current = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+    return months
+
+
+class SpedIndex:
+    """
+    Índice persistente dos arquivos SPED baixados (cache/<hostname>/indice_sped.json).
+
+    Cada arquivo é gravado pelo caminho com tamanho/mtime (para reindexar só o que mudou). As
+    consultas usam um mapa em memória (empresa, tipo) -> caminho -> (início, fim) com os arquivos
+    completos que conferem, onde empresa é o CNPJ de sped_files.company_key. Guarda se o |0000|
+    confere com a empresa, tipo e período de destino e se o arquivo está completo, para
+    auditorias e execuções incrementais.
+    """
+
+    def __init__(self, cache: Optional[HostCache] = None):
+        self.cache = cache or HostCache("indice_sped")
+        self.files: Dict[str, Dict] = self.cache.load().get("arquivos", {})
+        self._by_company: Dict[Tuple[str, Optional[str]], Dict[str, Tuple[date, date]]] = {}
+        self._keys: Dict[str, Tuple[str, Optional[str]]] = {}
+        self._dirty = False
+        for path in self.files:
+            self._update_lookup(path)
+
+    def _update_lookup(self, path: str) -> None:
+        """Atualiza o mapa de consulta com a entrada atual do caminho (ou a retira)"""
+        key = self._keys.pop(path, None)
+        if key is not None:
+            self._by_company[key].pop(path, None)
+            if not self._by_company[key]:
+                del self._by_company[key]
+
+        entry = self.files.get(path)
+        if entry is None or not entry["completo"] or entry.get("confere") is False:
+            return
+
+        key = (company_key(entry["cnpj"], entry["tipo"]), entry["tipo"])
+        self._by_company.setdefault(key, {})[path] = (date.fromisoformat(entry["inicio"]),
+                                                      date.fromisoformat(entry["fim"]))
+        self._keys[path] = key
+
+    def index_file(self, path: str, expected: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Indexa um arquivo (se mudou desde a última vez) e confere com o esperado.
+
+        Args:
+            path: Arquivo SPED
+            expected: {"cnpj", "tipo", "inicio": date, "fim": date} do destino (opcional)
+
+        Returns:
+            Entrada do índice, ou None se não for um arquivo SPED em texto
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        entry = self.files.get(path)
+
+        if entry is None or entry["tamanho"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+            header, complete = inspect_sped_file(path)
+            if header is None:
+                return None
+            entry = {
+                "cnpj": header.cnpj,
+                "tipo": header.tipo,
+                "inicio": header.inicio.isoformat(),
+                "fim": header.fim.isoformat(),
+                "nome": header.nome,
+                "completo": complete,
+                "tamanho": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "indexado_em": datetime.now().isoformat(timespec="seconds"),
+            }
+            self.files[path] = entry
+            self._dirty = True
+
+        if expected is not None:
+            entry["tipo"] = entry["tipo"] or expected.get("tipo")
+            header = SpedHeader(entry["cnpj"], date.fromisoformat(entry["inicio"]),
+                                date.fromisoformat(entry["fim"]), entry["nome"], entry["tipo"])
+            entry["confere"] = header_matches(header, expected["cnpj"], expected["inicio"], expected["fim"],
+                                              expected.get("tipo"))
+            self._dirty = True
+
+        self._update_lookup(path)
+        return entry
+
+    def index_folder(self, folder: str, tipo: Optional[str] = None) -> Dict[str, int]:
+        """Percorre a pasta (recursivo) indexando arquivos novos ou alterados e removendo os apagados"""
+        counts = {"arquivos": 0, "sped": 0}
+        prefix = os.path.abspath(folder) + os.sep
+
+        for path in _walk_files(folder):
+            counts["arquivos"] += 1
+            entry = self.index_file(path)
+            if entry is not None:
+                counts["sped"] += 1
+                if tipo and not entry["tipo"]:
+                    entry["tipo"] = tipo
+                    self._update_lookup(os.path.abspath(path))
+
+        for path in [path for path in self.files if path.startswith(prefix) and not os.path.exists(path)]:
+            del self.files[path]
+            self._update_lookup(path)
+            self._dirty = True
+
+        return counts
+
+    def _ranges(self, cnpj: str, tipo: Optional[str]) -> Dict[str, Tuple[date, date]]:
+        return self._by_company.get((company_key(cnpj, tipo), tipo), {})
+
+    def find(self, cnpj: str, tipo: Optional[str] = None) -> List[Tuple[str, Dict]]:
+        """Arquivos completos da empresa (ver company_key) e, se informado, do tipo"""
+        tipos = [tipo] if tipo is not None else {key[1] for key in self._by_company}
+        return [(path, self.files[path]) for each in tipos for path in self._ranges(cnpj, each)]
+
+    def covered(self, cnpj: str, tipo: str, start: date, end: date) -> bool:
+        """Todos os meses de start a end já têm arquivo completo indexado para a empresa e tipo"""
+        ranges = list(self._ranges(cnpj, tipo).values())
+        return all(
+            any(first <= month <= last or (first.year, first.month) == (month.year, month.month)
+                for first, last in ranges)
+            for month in _months(start, end)
+        )
+
+    def problems(self) -> List[Tuple[str, Dict]]:
+        """Arquivos incompletos ou cujo |0000| não confere com o destino"""
+        return [(path, entry) for path, entry in self.files.items()
+                if not entry["completo"] or entry.get("confere") is False]
+
+    def save(self) -> None:
+        if self._dirty:
+            self.cache.save({"arquivos": self.files})
+            self._dirty = False
+
+
+def _walk_files(folder: str) -> Iterable[str]:
+    for root, _, names in os.walk(folder):
+        for name in names:
+            yield os.path.join(root, name)
+
+
+def verify_moved_files(index: SpedIndex, moved: List[Dict], empresa: Dict, tipo: str,
+                       start: date, end: date) -> List[str]:
+    """
+    Indexa os arquivos movidos por FilesManager.move_files e confere o |0000| com o destino.
+    O índice é gravado por quem o criou (SpedIndex.save), uma vez ao fim da empresa.
+
+    Returns:
+        Mensagens dos arquivos que não conferem ou estão incompletos
+    """
+    expected = {"cnpj": empresa["cnpj"], "tipo": tipo, "inicio": start, "fim": end}
+    messages = []
+
+    for item in moved:
+        path = item["destination"]
+        entry = index.index_file(path, expected)
+        if entry is None:
+            continue
+        if not entry["confere"]:
+            messages.append(f"{os.path.basename(path)}: |0000| de {entry['cnpj']} "
+                            f"{entry['inicio']} a {entry['fim']}, esperado {empresa['cnpj']} {tipo}")
+        if not entry["completo"]:
+            messages.append(f"{os.path.basename(path)}: sem registro |9999| (download incompleto?)")
+
+    return messages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Índice dos arquivos SPED baixados")
+    parser.add_argument("pastas", nargs="*", help="Pastas a (re)indexar; só arquivos novos ou alterados são lidos")
+    parser.add_argument("--tipo", help="Tipo dos arquivos cujo leiaute não se identifica no |0000|")
+    parser.add_argument("--auditoria", action="store_true", help="Lista arquivos incompletos ou que não conferem")
+    parser.add_argument("--cnpj", help="Lista os arquivos indexados da empresa")
+    args = parser.parse_args()
+
+    index = SpedIndex()
+
+    for folder in args.pastas:
+        counts = index.index_folder(folder, args.tipo)
+        print(f"✅ {folder}: {counts['sped']} arquivos SPED de {counts['arquivos']}")
+    index.save()
+
+    if args.cnpj:
+        for path, entry in sorted(index.find(args.cnpj), key=lambda item: (item[1]["tipo"] or "", item[1]["inicio"])):
+            print(f"  {entry['tipo'] or '?'} {entry['inicio']} a {entry['fim']}: {path}")
+
+    if args.auditoria:
+        problems = index.problems()
+        print(f"{'⚠' if problems else '✅'} {len(problems)} arquivos com problema em {len(index.files)} indexados")
+        for path, entry in problems:
+            reason = "incompleto" if not entry["completo"] else "não confere com o destino"
+            print(f"  {path}: {reason}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import statistics
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from host_cache import HostCache
+
+MAX_SAMPLES = 200  # Amostras mantidas por etapa (as mais recentes)
+
+# Estimativas usadas enquanto não há histórico nesta máquina (segundos)
+DEFAULT_STEP_SECONDS = {
+    "abertura": 40.0,
+    "perfil": 25.0,
+    "pesquisa": 20.0,
+    "selecao": 10.0,
+    "download": 60.0,
+    "mover": 1.0,
+    "fechamento": 8.0,
+}
+
+
+class StepTimings:
+    """
+    Histórico de duração das etapas do bot nesta máquina (cache/<hostname>/tempos_etapas.json).
+
+    As etapas são nomeadas "etapa" ou "etapa.tipo" (ex: "download.sped_fiscal"); a estimativa
+    usa o histórico mais específico disponível e cai para a etapa genérica e depois para o padrão.
+    """
+
+    def __init__(self, cache: Optional[HostCache] = None):
+        self.cache = cache or HostCache("tempos_etapas")
+        self.samples: Dict[str, List[float]] = self.cache.load()
+        self._pending: Dict[str, List[float]] = {}
+
+    def record(self, step: str, seconds: float) -> None:
+        self._pending.setdefault(step, []).append(round(seconds, 3))
+        self.samples.setdefault(step, []).append(round(seconds, 3))
+        # A etapa genérica acumula as amostras de todos os tipos
+        if "." in step:
+            self.record(step.split(".", 1)[0], seconds)
+
+    @contextmanager
+    def measure(self, step: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(step, time.perf_counter() - started)
+
+    def save(self) -> None:
+        """Mescla as amostras novas com o que outros processos gravaram desde a leitura"""
+        if not self._pending:
+            return
+
+        stored = self.cache.load()
+        for step, values in self._pending.items():
+            stored[step] = (stored.get(step, []) + values)[-MAX_SAMPLES:]
+
+        self.cache.save(stored)
+        self.samples = stored
+        self._pending = {}
+
+    def estimate(self, step: str) -> float:
+        """Mediana do histórico da etapa (ou da etapa genérica, ou o padrão)"""
+        for key in (step, step.split(".", 1)[0]):
+            values = self.samples.get(key)
+            if values:
+                return statistics.median(values)
+        return DEFAULT_STEP_SECONDS.get(step.split(".", 1)[0], 0.0)
+
+    def has_history(self, step: str) -> bool:
+        return bool(self.samples.get(step) or self.samples.get(step.split(".", 1)[0]))
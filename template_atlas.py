@@ -0,0 +1,203 @@
+import json
+import os
+import struct
+import sys
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from host_cache import HostCache
+from image_matcher import ImageMatcher
+
+ATLAS_MAGIC = b"RPAATLAS"
+ATLAS_VERSION = 1
+# Cada template começa num offset múltiplo deste valor (linhas de cache e leitura alinhada)
+ATLAS_ALIGNMENT = 64
+DEFAULT_ATLAS_PATH = "images.atlas"
+# Metadados calibrados aceitos por template (ver load_metadata)
+METADATA_FIELDS = ("confidence", "regiao")
+
+# magic, versão, tamanho do cabeçalho JSON
+_PREAMBLE = struct.Struct("<8sII")
+
+
+def _atlas_key(images_folder: str, image_path: str) -> str:
+    """Chave do template no atlas: caminho relativo à pasta de imagens, sempre com '/'"""
+    return os.path.relpath(image_path, images_folder).replace(os.sep, "/")
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ATLAS_ALIGNMENT) * ATLAS_ALIGNMENT
+
+
+def load_metadata(path: str) -> Dict[str, Dict]:
+    """
+    Lê os metadados calibrados por template de um JSON no formato
+    {"modais/ok.png": {"confidence": 0.9, "regiao": [left, top, largura, altura]}}.
+
+    A região é relativa à área capturada (janela da aplicação ou tela) e medida na escala dos
+    templates; chaves fora de METADATA_FIELDS são ignoradas.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    return {key: {field: value for field, value in entry.items() if field in METADATA_FIELDS}
+            for key, entry in data.items()}
+
+
+def build_atlas(images_folder: str = "images", output_path: str = DEFAULT_ATLAS_PATH,
+                grayscale: bool = True, metadata: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
+    """
+    Compila todos os PNG da pasta de imagens em um único arquivo para ser mapeado em memória.
+
+    O arquivo tem um cabeçalho JSON (metadados de cada template) seguido dos pixels já
+    decodificados e convertidos (cinza ou BGR), no mesmo formato usado pelo ImageMatcher.
+    O motor calibrado nesta máquina vai junto e serve de ponto de partida para as máquinas
+    que ainda não calibraram (RPA com matching_engine="auto"). O confidence e a região
+    esperada de cada template (ver load_metadata) passam a valer nas buscas do RPA.
+
+    Args:
+        images_folder: Pasta com os templates (subpastas viram o alias)
+        output_path: Arquivo do atlas a gerar
+        grayscale: Gravar os templates em tons de cinza (como o ImageMatcher padrão)
+        metadata: Confidence e região por chave (ex: {"modais/x.png": {"confidence": 0.9, "regiao": [...]}})
+
+    Returns:
+        Dicionário chave -> metadados gravados
+    """
+    matcher = ImageMatcher(grayscale=grayscale)
+    metadata = metadata or {}
+    calibrated = HostCache("motores_de_busca").load().get("templates", {})
+
+    image_paths = []
+    for folder, _, files in os.walk(images_folder):
+        image_paths.extend(os.path.join(folder, filename) for filename in files if filename.lower().endswith(".png"))
+    image_paths.sort()
+
+    entries: Dict[str, Dict] = {}
+    blobs: List[Tuple[int, np.ndarray]] = []
+    offset = 0
+
+    for image_path in image_paths:
+        try:
+            pixels = np.ascontiguousarray(matcher.load_template(image_path))
+        except (ValueError, OSError) as e:
+            print(f"⚠ Template ignorado no atlas: {image_path} ({e})")
+            continue
+
+        key = _atlas_key(images_folder, image_path)
+        alias = os.path.dirname(key)
+        stat = os.stat(image_path)
+        offset = _align(offset)
+
+        entry = {
+            "alias": alias,
+            "arquivo": os.path.basename(key),
+            "offset": offset,
+            "shape": list(pixels.shape),
+            "largura": int(pixels.shape[1]),
+            "altura": int(pixels.shape[0]),
+            "tamanho_origem": stat.st_size,
+            "mtime_origem": stat.st_mtime_ns,
+            "confidence": None,
+            "regiao": None,
+            # Caminhos do cache de calibração usam o separador do sistema
+            "engine": calibrated.get(os.path.relpath(image_path, images_folder), {}).get("engine"),
+        }
+        entry.update(metadata.get(key, {}))
+
+        entries[key] = entry
+        blobs.append((offset, pixels))
+        offset += pixels.nbytes
+
+    header = json.dumps({
+        "grayscale": grayscale,
+        "alinhamento": ATLAS_ALIGNMENT,
+        "templates": entries,
+    }, ensure_ascii=False).encode("utf-8")
+    data_start = _align(_PREAMBLE.size + len(header))
+
+    temporary_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(_PREAMBLE.pack(ATLAS_MAGIC, ATLAS_VERSION, len(header)))
+        file.write(header)
+        for blob_offset, pixels in blobs:
+            file.seek(data_start + blob_offset)
+            file.write(pixels.tobytes())
+        file.truncate(data_start + offset)
+
+    os.replace(temporary_path, output_path)
+    return entries
+
+
+class TemplateAtlas:
+    """
+    Atlas de templates mapeado em memória somente leitura.
+
+    Os templates devolvidos são views sobre o arquivo, sem cópia: vários processos que
+    abrem o mesmo atlas compartilham as mesmas páginas do cache do sistema operacional.
+    Templates alterados depois da compilação (tamanho ou data diferentes) são ignorados,
+    e o ImageMatcher volta a decodificar o PNG.
+    """
+
+    def __init__(self, path: str = DEFAULT_ATLAS_PATH, images_folder: str = "images"):
+        self.path = path
+        self.images_folder = images_folder
+
+        with open(path, "rb") as file:
+            magic, version, header_size = _PREAMBLE.unpack(file.read(_PREAMBLE.size))
+            if magic != ATLAS_MAGIC or version != ATLAS_VERSION:
+                raise ValueError(f"Arquivo de atlas inválido ou de outra versão: {path}")
+            header = json.loads(file.read(header_size).decode("utf-8"))
+
+        self.grayscale: bool = header["grayscale"]
+        self.templates: Dict[str, Dict] = header["templates"]
+        data_start = _align(_PREAMBLE.size + header_size)
+
+        size = os.path.getsize(path) - data_start
+        self._data = np.memmap(path, dtype=np.uint8, mode="r", offset=data_start, shape=(size,)) if size else None
+
+    def __len__(self) -> int:
+        return len(self.templates)
+
+    def info(self, image_path: str) -> Optional[Dict]:
+        """Metadados do template (alias, tamanho, confidence, região, motor), ou None se não estiver no atlas"""
+        return self.templates.get(_atlas_key(self.images_folder, image_path))
+
+    def get(self, image_path: str) -> Optional[np.ndarray]:
+        """Pixels do template como view somente leitura, ou None se ausente ou desatualizado"""
+        entry = self.info(image_path)
+        if entry is None or self._data is None:
+            return None
+
+        try:
+            stat = os.stat(image_path)
+            if stat.st_size != entry["tamanho_origem"] or stat.st_mtime_ns != entry["mtime_origem"]:
+                return None
+        except OSError:
+            # Sem o PNG (ex: distribuição só com o atlas) vale o que foi compilado
+            pass
+
+        shape = tuple(entry["shape"])
+        count = int(np.prod(shape))
+        return self._data[entry["offset"]:entry["offset"] + count].reshape(shape)
+
+
+def open_atlas(path: str, images_folder: str = "images") -> Optional[TemplateAtlas]:
+    """Abre o atlas se ele existir; qualquer problema só desativa o atlas"""
+    if not path or not os.path.exists(path):
+        return None
+
+    try:
+        return TemplateAtlas(path, images_folder)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠ Atlas de templates {path} ignorado: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    images_folder = sys.argv[1] if len(sys.argv) > 1 else "images"
+    output_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_ATLAS_PATH
+    metadata_path = sys.argv[3] if len(sys.argv) > 3 else None
+
+    entries = build_atlas(images_folder, output_path, metadata=load_metadata(metadata_path) if metadata_path else None)
+    print(f"✅ Atlas gerado: {output_path} ({len(entries)} templates, {os.path.getsize(output_path) / 1024:.0f} KB)")
@@ -0,0 +1,123 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+
+from host_cache import HostCache
+from sped_files import LAYOUTS, SpedHeader, header_matches, parse_header_line
+from sped_indexer import SpedIndex
+
+MATRIZ = "12345678000190"
+FILIAL = "12345678000270"
+
+# Um |0000| real de cada leiaute, como gerado pelos PVAs
+HEADER_LINES = {
+    "sped_fiscal": f"|0000|017|0|01012023|31012023|EMPRESA TESTE LTDA|{MATRIZ}||SP|110042490114|3550308|||A|1|\r\n",
+    "sped_contribuicoes": f"|0000|006|0|||01012023|31012023|EMPRESA TESTE LTDA|{MATRIZ}|SP|3550308||00|9|\r\n",
+    "sped_contabil": f"|0000|LECD|01012022|31122022|EMPRESA TESTE LTDA|{MATRIZ}|SP|110042490114|3550308|||0|0|0||0|0||N|N|0|0|1|\n",
+    "sped_ecf": f"|0000|LECF|0009|{MATRIZ}|EMPRESA TESTE LTDA|0|0|||01012022|31122022|N||0||\n",
+}
+
+
+def _write_sped(folder: str, name: str, cnpj: str, start: str, end: str, complete: bool = True) -> str:
+    path = os.path.join(folder, name)
+    with open(path, "w", encoding="latin-1") as file:
+        file.write(f"|0000|017|0|{start}|{end}|EMPRESA TESTE LTDA|{cnpj}||SP|110042490114|3550308|||A|1|\n")
+        file.write("|0001|0|\n")
+        if complete:
+            file.write("|9999|3|\n")
+    return path
+
+
+class ParseHeaderLineTest(unittest.TestCase):
+    def test_layouts(self):
+        self.assertEqual(set(HEADER_LINES), set(LAYOUTS))
+        expected = {
+            "sped_fiscal": (date(2023, 1, 1), date(2023, 1, 31)),
+            "sped_contribuicoes": (date(2023, 1, 1), date(2023, 1, 31)),
+            "sped_contabil": (date(2022, 1, 1), date(2022, 12, 31)),
+            "sped_ecf": (date(2022, 1, 1), date(2022, 12, 31)),
+        }
+        for tipo, line in HEADER_LINES.items():
+            with self.subTest(tipo=tipo):
+                header = parse_header_line(line)
+                self.assertEqual(header, SpedHeader(MATRIZ, *expected[tipo], "EMPRESA TESTE LTDA", tipo))
+
+    def test_not_a_header(self):
+        self.assertIsNone(parse_header_line("|0001|0|"))
+        self.assertIsNone(parse_header_line("|0000|017|0|01132023|31012023|EMPRESA|12345678000190|"))
+        self.assertIsNone(parse_header_line("|0000|017|0|01012023|31012023|EMPRESA|123|"))
+        self.assertIsNone(parse_header_line("PK\x03\x04"))
+
+
+class HeaderMatchesTest(unittest.TestCase):
+    def test_period_and_type(self):
+        header = parse_header_line(HEADER_LINES["sped_contribuicoes"])
+        self.assertTrue(header_matches(header, MATRIZ, date(2023, 1, 1), date(2023, 12, 31), "sped_contribuicoes"))
+        self.assertFalse(header_matches(header, MATRIZ, date(2023, 2, 1), date(2023, 12, 31), "sped_contribuicoes"))
+        self.assertFalse(header_matches(header, MATRIZ, date(2023, 1, 1), date(2023, 12, 31), "sped_fiscal"))
+
+    def test_root_cnpj_for_company_wide_layouts(self):
+        for tipo in ("sped_contribuicoes", "sped_contabil", "sped_ecf"):
+            with self.subTest(tipo=tipo):
+                header = parse_header_line(HEADER_LINES[tipo])
+                self.assertTrue(header_matches(header, FILIAL, date(2022, 1, 1), date(2023, 12, 31), tipo))
+                self.assertFalse(header_matches(header, "87654321000190", date(2022, 1, 1), date(2023, 12, 31), tipo))
+
+    def test_full_cnpj_for_sped_fiscal(self):
+        header = parse_header_line(HEADER_LINES["sped_fiscal"])
+        self.assertTrue(header_matches(header, MATRIZ, date(2023, 1, 1), date(2023, 1, 31), "sped_fiscal"))
+        self.assertFalse(header_matches(header, FILIAL, date(2023, 1, 1), date(2023, 1, 31), "sped_fiscal"))
+        self.assertFalse(header_matches(header, FILIAL, date(2023, 1, 1), date(2023, 1, 31)))
+
+
+class SpedIndexCoveredTest(unittest.TestCase):
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temporary.cleanup)
+        self.folder = os.path.join(self.temporary.name, "sped")
+        os.makedirs(self.folder)
+        self.cache = HostCache("indice_sped", os.path.join(self.temporary.name, "cache"))
+        self.index = SpedIndex(self.cache)
+
+    def test_months_covered(self):
+        _write_sped(self.folder, "jan.txt", MATRIZ, "01012023", "31012023")
+        _write_sped(self.folder, "fev.txt", MATRIZ, "01022023", "28022023")
+        self.index.index_folder(self.folder)
+
+        self.assertTrue(self.index.covered(MATRIZ, "sped_fiscal", date(2023, 1, 1), date(2023, 2, 28)))
+        self.assertTrue(self.index.covered(MATRIZ, "sped_fiscal", date(2023, 1, 15), date(2023, 1, 20)))
+        self.assertFalse(self.index.covered(MATRIZ, "sped_fiscal", date(2023, 1, 1), date(2023, 3, 31)))
+        self.assertFalse(self.index.covered(MATRIZ, "sped_contribuicoes", date(2023, 1, 1), date(2023, 1, 31)))
+
+    def test_incomplete_file_does_not_cover(self):
+        _write_sped(self.folder, "jan.txt", MATRIZ, "01012023", "31012023", complete=False)
+        self.index.index_folder(self.folder)
+
+        self.assertFalse(self.index.covered(MATRIZ, "sped_fiscal", date(2023, 1, 1), date(2023, 1, 31)))
+        self.assertEqual(len(self.index.problems()), 1)
+
+    def test_branch_is_not_covered_by_head_office(self):
+        _write_sped(self.folder, "matriz.txt", MATRIZ, "01012023", "31012023")
+        self.index.index_folder(self.folder)
+
+        self.assertTrue(self.index.covered(MATRIZ, "sped_fiscal", date(2023, 1, 1), date(2023, 1, 31)))
+        self.assertFalse(self.index.covered(FILIAL, "sped_fiscal", date(2023, 1, 1), date(2023, 1, 31)))
+
+    def test_removed_and_reloaded(self):
+        path = _write_sped(self.folder, "jan.txt", MATRIZ, "01012023", "31012023")
+        self.index.index_folder(self.folder)
+        self.index.save()
+
+        reloaded = SpedIndex(self.cache)
+        self.assertTrue(reloaded.covered(MATRIZ, "sped_fiscal", date(2023, 1, 1), date(2023, 1, 31)))
+        self.assertEqual([entry_path for entry_path, _ in reloaded.find(MATRIZ)], [os.path.abspath(path)])
+
+        os.remove(path)
+        reloaded.index_folder(self.folder)
+        self.assertFalse(reloaded.covered(MATRIZ, "sped_fiscal", date(2023, 1, 1), date(2023, 1, 31)))
+        self.assertEqual(reloaded.find(MATRIZ), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
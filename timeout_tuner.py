@@ -0,0 +1,108 @@
+import statistics
+from typing import Dict, List, Optional, Tuple
+
+from host_cache import HostCache
+
+MAX_SAMPLES = 200  # Esperas bem-sucedidas mantidas por template (as mais recentes)
+MIN_SAMPLES = 10  # Abaixo disso usa o timeout fixo informado pelo chamador
+MIN_TIMEOUT = 2.0  # Piso do timeout calibrado (s)
+MAX_TIMEOUT = 900.0  # Teto absoluto do timeout (s)
+MAX_GROWTH = 3.0  # O timeout calibrado não passa de MAX_GROWTH × o timeout fixo do chamador
+MIN_POLL = 0.2  # Intervalo mínimo entre verificações (s)
+
+
+class TimeoutTuner:
+    """
+    Timeouts e intervalos de verificação aprendidos com as esperas desta máquina (cache/<hostname>/esperas.json).
+
+    Cada espera bem-sucedida (_wait_for_image/_wait_for_any_image) registra quanto a imagem
+    demorou. Com histórico suficiente, o timeout passa a ser p99 × margem (entre MIN_TIMEOUT e
+    o teto) e o intervalo de verificação ~1/5 da mediana: uma imagem que não vai aparecer falha
+    rápido e uma etapa lenta deixa de estourar um timeout chutado baixo. Se a espera estoura,
+    a próxima do mesmo template na execução usa o dobro (até o teto), para não depender de uma
+    calibração desatualizada.
+    """
+
+    def __init__(self, margin: float = 1.5, max_poll: float = 1.0, cache: Optional[HostCache] = None):
+        """
+        Args:
+            margin: Multiplicador aplicado ao p99
+            max_poll: Maior intervalo entre verificações (o poll_interval configurado)
+        """
+        self.margin = margin
+        self.max_poll = max_poll
+        self.cache = cache or HostCache("esperas")
+        self.samples: Dict[str, List[float]] = self.cache.load().get("encontradas", {})
+        self._pending: Dict[str, List[float]] = {}
+        self._pending_misses: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}  # Timeouts seguidos nesta execução, por template
+
+    def settings(self, key: str, default_timeout: float) -> Tuple[float, Optional[float]]:
+        """
+        Args:
+            key: Template esperado (ex: "botoes/entrar.png")
+            default_timeout: Timeout fixo do chamador, usado sem histórico e como base do teto
+
+        Returns:
+            (timeout, intervalo de verificação ou None para o padrão)
+        """
+        ceiling = min(MAX_TIMEOUT, max(default_timeout * MAX_GROWTH, MIN_TIMEOUT))
+        values = self.samples.get(key, [])
+        widen = 2 ** self._misses.get(key, 0)
+
+        if len(values) < MIN_SAMPLES:
+            return min(default_timeout * widen, ceiling), None
+
+        p99 = statistics.quantiles(values, n=100, method="inclusive")[98]
+        timeout = min(max(p99 * self.margin, MIN_TIMEOUT) * widen, ceiling)
+        poll = min(max(statistics.median(values) / 5, MIN_POLL), self.max_poll)
+        return timeout, poll
+
+    def record(self, key: str, seconds: float, found: bool) -> None:
+        if found:
+            self._misses.pop(key, None)
+            self._pending.setdefault(key, []).append(round(seconds, 3))
+            self.samples.setdefault(key, []).append(round(seconds, 3))
+        else:
+            self._misses[key] = self._misses.get(key, 0) + 1
+            self._pending_misses[key] = self._pending_misses.get(key, 0) + 1
+
+    def save(self) -> None:
+        """Mescla as esperas novas com o que outros processos gravaram desde a leitura"""
+        if not self._pending and not self._pending_misses:
+            return
+
+        stored = self.cache.load()
+        found = stored.setdefault("encontradas", {})
+        misses = stored.setdefault("timeouts", {})
+        for key, values in self._pending.items():
+            found[key] = (found.get(key, []) + values)[-MAX_SAMPLES:]
+        for key, count in self._pending_misses.items():
+            misses[key] = misses.get(key, 0) + count
+
+        self.cache.save(stored)
+        self.samples = found
+        self._pending = {}
+        self._pending_misses = {}
+
+
+def main() -> None:
+    tuner = TimeoutTuner()
+    misses = tuner.cache.load().get("timeouts", {})
+
+    if not tuner.samples:
+        print("Nenhuma espera registrada nesta máquina ainda.")
+        return
+
+    print(f"{'template':<50} {'amostras':>8} {'mediana':>8} {'p99':>8} {'timeout*':>9} {'poll':>6} {'estouros':>9}")
+    for key, values in sorted(tuner.samples.items()):
+        timeout, poll = tuner.settings(key, MAX_TIMEOUT)
+        p99 = statistics.quantiles(values, n=100, method="inclusive")[98] if len(values) > 1 else values[0]
+        print(f"{key:<50} {len(values):>8} {statistics.median(values):>7.2f}s {p99:>7.2f}s "
+              f"{timeout if poll is not None else float('nan'):>8.1f}s "
+              f"{poll if poll is not None else float('nan'):>5.2f}s {misses.get(key, 0):>9}")
+    print(f"\n* sem teto do chamador; valem o piso de {MIN_TIMEOUT:.0f}s e o teto de {MAX_GROWTH:.0f}× o timeout fixo")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,76 @@
+import asyncio
 import time
 import uuid
 
+import metrics
+
+def _prepare_item(item, item_name_func=None):
+    """Garante um id para o item e resolve o nome exibido nos logs"""
+    if not isinstance(item, dict):
+        item = {"data": item, "id": str(uuid.uuid4())}
+    elif 'id' not in item:
+        item['id'] = str(uuid.uuid4())
+    
+    item_id = item['id']
+    
+    if item_name_func:
+        item_name = item_name_func(item)
+    elif isinstance(item, dict) and 'nome' in item:
+        item_name = item['nome']
+    elif isinstance(item, dict) and 'name' in item:
+        item_name = item['name']
+    else:
+        item_name = str(item_id)[:8]
+    
+    return item, item_id, item_name
+
+def _finish_attempt(item_name, attempt, max_retries, retry_delay, result=None, error=None):
+    """
+    Registra o desfecho de uma tentativa (logs e métricas), igual para for_each e async_for_each.
+    
+    Args:
+        attempt: Tentativa que acabou de rodar (0 é a primeira)
+        result: Retorno de process_func quando não houve erro
+        error: Exceção levantada por process_func, se houve
+    
+    Returns:
+        True se o item deve ser tentado de novo depois de retry_delay segundos
+    """
+    if error is None:
+        if result == "Unfinish":
+            print(f"⏭️ Item {item_name} retornou 'Unfinish' - pulando para próximo")
+            metrics.ITEMS_PROCESSED.inc(resultado="pulado")
+        elif result == "Success":
+            print(f"✅ Item {item_name} processado com sucesso")
+            metrics.ITEMS_PROCESSED.inc(resultado="sucesso")
+        else:
+            print(f"✅ Item {item_name} concluído")
+            metrics.ITEMS_PROCESSED.inc(resultado="sucesso")
+        return False
+    
+    if str(error).startswith("Unfinish:"):
+        message = str(error).replace("Unfinish: ", "")
+        print(f"⏭️ {message} - pulando para próximo item")
+        metrics.ITEMS_PROCESSED.inc(resultado="pulado")
+        return False
+    
+    attempts = attempt + 1
+    print(f"❌ Erro na tentativa {attempts} para item {item_name}: {error}")
+    
+    if attempts > max_retries:
+        print(f"❌ Esgotadas as tentativas para item {item_name} após {max_retries + 1} tentativas")
+        metrics.ITEMS_PROCESSED.inc(resultado="falha")
+        return False
+    
+    print(f"🔄 Tentando novamente em {retry_delay} segundos...")
+    metrics.ITEM_RETRIES.inc()
+    return True
+
 def for_each(items, process_func, max_retries=1, retry_delay=5, item_name_func=None):
     processed_ids = set()
     
     for item in items:
-        if not isinstance(item, dict):
-            item = {"data": item, "id": str(uuid.uuid4())}
-        elif 'id' not in item:
-            item['id'] = str(uuid.uuid4())
-        
-        item_id = item['id']
-        
-        if item_name_func:
-            item_name = item_name_func(item)
-        elif isinstance(item, dict) and 'nome' in item:
-            item_name = item['nome']
-        elif isinstance(item, dict) and 'name' in item:
-            item_name = item['name']
-        else:
-            item_name = str(item_id)[:8]
+        item, item_id, item_name = _prepare_item(item, item_name_func)
         
         if item_id in processed_ids:
             print(f"⏭️ Pulando item {item_name} - já processado nesta execução")
@@ -27,35 +78,66 @@ def for_each(items, process_func, max_retries=1, retry_delay=5, item_name_func=N
             
         processed_ids.add(item_id)
         
-        attempts = 0
-
-        while attempts <= max_retries:
+        attempt = 0
+        
+        while True:
             try:
-                result = process_func(item, attempts == 0)
-                
-                if result == "Unfinish":
-                    print(f"⏭️ Item {item_name} retornou 'Unfinish' - pulando para próximo")
-                    break
-                elif result == "Success":
-                    print(f"✅ Item {item_name} processado com sucesso")
-                    break
-                else:
-                    print(f"✅ Item {item_name} concluído")
-                    break
-                    
+                result, error = process_func(item, attempt == 0), None
             except Exception as e:
-                if str(e).startswith("Unfinish:"):
-                    message = str(e).replace("Unfinish: ", "")
-                    print(f"⏭️ {message} - pulando para próximo item")
-                    break
-                
-                attempts += 1
+                result, error = None, e
+            
+            if not _finish_attempt(item_name, attempt, max_retries, retry_delay, result, error):
+                break
+            
+            attempt += 1
+            time.sleep(retry_delay)
 
-                print(f"❌ Erro na tentativa {attempts} para item {item_name}: {e}")
+async def async_for_each(items, process_func, max_retries=1, retry_delay=5, item_name_func=None, concurrency=1):
+    """
+    Equivalente assíncrono de for_each: mesmas regras de retentativa, "Unfinish" e métricas.
+    
+    Args:
+        process_func: Função async (ou comum, executada numa thread com asyncio.to_thread para
+            não travar o event loop) chamada com (item, primeira_tentativa)
+        concurrency: Itens processados ao mesmo tempo. Com 1 a ordem de for_each é mantida;
+            acima disso só faz sentido se process_func serializa o acesso à tela (ex: AsyncRPA)
+    """
+    processed_ids = set()
+    prepared = []
+    
+    for item in items:
+        item, item_id, item_name = _prepare_item(item, item_name_func)
+        
+        if item_id in processed_ids:
+            print(f"⏭️ Pulando item {item_name} - já processado nesta execução")
+            continue
+        
+        processed_ids.add(item_id)
+        prepared.append((item, item_name))
+    
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    is_coroutine_function = asyncio.iscoroutinefunction(process_func)
+    
+    async def process(item, item_name):
+        async with semaphore:
+            attempt = 0
+            
+            while True:
+                try:
+                    if is_coroutine_function:
+                        result = await process_func(item, attempt == 0)
+                    else:
+                        result = await asyncio.to_thread(process_func, item, attempt == 0)
+                        if asyncio.iscoroutine(result):
+                            result = await result
+                    error = None
+                except Exception as e:
+                    result, error = None, e
                 
-                if attempts > max_retries:
-                    print(f"❌ Esgotadas as tentativas para item {item_name} após {max_retries + 1} tentativas")
-                    break
-                else:
-                    print(f"🔄 Tentando novamente em {retry_delay} segundos...")
-                    time.sleep(retry_delay)
\ No newline at end of file
+                if not _finish_attempt(item_name, attempt, max_retries, retry_delay, result, error):
+                    return
+                
+                attempt += 1
+                await asyncio.sleep(retry_delay)
+    
+    await asyncio.gather(*(process(item, item_name) for item, item_name in prepared))
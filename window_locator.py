@@ -0,0 +1,155 @@
+import ctypes
+import ctypes.util
+import sys
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+try:
+    import pyautogui as PyAutoGui
+except Exception:
+    # Sem servidor gráfico (ex: session_replay num servidor)
+    PyAutoGui = None
+
+
+@dataclass
+class WindowGeometry:
+    title: str
+    left: int
+    top: int
+    width: int
+    height: int
+
+    @property
+    def region(self) -> Tuple[int, int, int, int]:
+        return (self.left, self.top, self.width, self.height)
+
+
+def _find_window_windows(title: str) -> List[WindowGeometry]:
+    """Procura janelas visíveis pelo título usando o pygetwindow (instalado com o pyautogui no Windows)"""
+    windows = []
+    for window in PyAutoGui.getWindowsWithTitle(title):
+        if window.isMinimized or window.width <= 0 or window.height <= 0:
+            continue
+        windows.append(WindowGeometry(window.title, window.left, window.top, window.width, window.height))
+    return windows
+
+
+class _XWindowAttributes(ctypes.Structure):
+    _fields_ = [
+        ("x", ctypes.c_int),
+        ("y", ctypes.c_int),
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("border_width", ctypes.c_int),
+        ("depth", ctypes.c_int),
+        ("visual", ctypes.c_void_p),
+        ("root", ctypes.c_ulong),
+        ("class_", ctypes.c_int),
+        ("bit_gravity", ctypes.c_int),
+        ("win_gravity", ctypes.c_int),
+        ("backing_store", ctypes.c_int),
+        ("backing_planes", ctypes.c_ulong),
+        ("backing_pixel", ctypes.c_ulong),
+        ("save_under", ctypes.c_int),
+        ("colormap", ctypes.c_ulong),
+        ("map_installed", ctypes.c_int),
+        ("map_state", ctypes.c_int),
+        ("all_event_masks", ctypes.c_long),
+        ("your_event_mask", ctypes.c_long),
+        ("do_not_propagate_mask", ctypes.c_long),
+        ("override_redirect", ctypes.c_int),
+        ("screen", ctypes.c_void_p),
+    ]
+
+
+_IS_VIEWABLE = 2
+
+
+def _find_window_x11(title: str) -> List[WindowGeometry]:
+    """Percorre a árvore de janelas do X procurando janelas mapeadas cujo nome contenha o título"""
+    library = ctypes.util.find_library("X11")
+    if not library:
+        return []
+
+    x11 = ctypes.CDLL(library)
+    vp, c_ulong, c_int = ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int
+    x11.XOpenDisplay.restype = vp
+    x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+    x11.XCloseDisplay.argtypes = [vp]
+    x11.XDefaultRootWindow.restype = c_ulong
+    x11.XDefaultRootWindow.argtypes = [vp]
+    x11.XQueryTree.argtypes = [vp, c_ulong, ctypes.POINTER(c_ulong), ctypes.POINTER(c_ulong),
+                               ctypes.POINTER(ctypes.POINTER(c_ulong)), ctypes.POINTER(ctypes.c_uint)]
+    x11.XFetchName.argtypes = [vp, c_ulong, ctypes.POINTER(ctypes.c_char_p)]
+    x11.XGetWindowAttributes.argtypes = [vp, c_ulong, ctypes.POINTER(_XWindowAttributes)]
+    x11.XTranslateCoordinates.argtypes = [vp, c_ulong, c_ulong, c_int, c_int, ctypes.POINTER(c_int),
+                                          ctypes.POINTER(c_int), ctypes.POINTER(c_ulong)]
+    x11.XFree.argtypes = [vp]
+
+    display = x11.XOpenDisplay(None)
+    if not display:
+        return []
+
+    windows = []
+    try:
+        root = x11.XDefaultRootWindow(display)
+        pending = [root]
+
+        while pending:
+            window = pending.pop()
+
+            name = ctypes.c_char_p()
+            if window != root and x11.XFetchName(display, window, ctypes.byref(name)) and name.value:
+                window_title = name.value.decode("latin-1")
+                x11.XFree(name)
+
+                attributes = _XWindowAttributes()
+                if title in window_title and x11.XGetWindowAttributes(display, window, ctypes.byref(attributes)) \
+                        and attributes.map_state == _IS_VIEWABLE:
+                    left, top, child = c_int(), c_int(), c_ulong()
+                    x11.XTranslateCoordinates(display, window, root, 0, 0,
+                                              ctypes.byref(left), ctypes.byref(top), ctypes.byref(child))
+                    windows.append(WindowGeometry(window_title, left.value, top.value,
+                                                  attributes.width, attributes.height))
+                    continue
+
+            root_return, parent_return = c_ulong(), c_ulong()
+            children, count = ctypes.POINTER(c_ulong)(), ctypes.c_uint()
+            if x11.XQueryTree(display, window, ctypes.byref(root_return), ctypes.byref(parent_return),
+                              ctypes.byref(children), ctypes.byref(count)):
+                pending.extend(children[i] for i in range(count.value))
+                if children:
+                    x11.XFree(children)
+    finally:
+        x11.XCloseDisplay(display)
+
+    return windows
+
+
+def find_window(title: str) -> Optional[WindowGeometry]:
+    """
+    Localiza a janela visível cujo título contém o texto informado.
+
+    Havendo várias, retorna a de maior área (normalmente a janela principal, e não um diálogo).
+
+    Args:
+        title: Parte do título da janela (ex: "ReceitanetBX")
+
+    Returns:
+        WindowGeometry em coordenadas de tela, ou None se nenhuma janela for encontrada
+    """
+    try:
+        if sys.platform == "win32":
+            windows = _find_window_windows(title)
+        elif sys.platform.startswith("linux"):
+            windows = _find_window_x11(title)
+        else:
+            windows = []
+    except Exception as e:
+        print(f"Erro ao procurar janela '{title}': {e}")
+        return None
+
+    if not windows:
+        return None
+
+    return max(windows, key=lambda window: window.width * window.height)